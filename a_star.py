@@ -1,28 +1,52 @@
 from graph import Graph
 from scraper import *
+from fetcher import Prefetcher
+from offline_index import OfflineIndex
+from bidirectional import bidirectional_search
+from anytime import anytime_weighted_astar, beam_search
+from multi_target import one_to_many
+from neighbors import GraphProvider, IndexProvider, LinkProvider
+from landmarks import LandmarkHeuristic, Landmarks
+from snapshot import write_provider_snapshot
+from instrumentation import Budget, BudgetExceeded, SearchStats
+from priority_queue import VertexQueue
 
 import time
 import click
-import fasttext
-import fasttext.util
-
-from collections import defaultdict
-from scipy.spatial.distance import cosine
-from heapq import heapify, heappop, heappush
 
 
 class AStar(Graph):
-    def __init__(self, graph_dict: dict) -> None:
+    def __init__(self, graph_dict: dict, prefetcher: Prefetcher = None, provider=None, stats: SearchStats = None, verbose: bool = False) -> None:
+        """
+        Initialize the AStar object
+
+        Args:
+            graph_dict: a fixed graph to search, or an empty dict to search Wikipedia.
+            prefetcher: optional Prefetcher fetching queued articles concurrently.
+            provider: neighbor provider to share with other searches; defaults to one
+                serving graph_dict, or a LinkProvider if graph_dict is empty.
+            stats: SearchStats collecting the counters and hooks of each query.
+            verbose: print every expanded article; ignored if stats is given.
+        """
         super().__init__(graph_dict)
         self.graph = graph_dict
-        self.heuristic_cache = {}
-        self.model = fasttext.load_model('cc.en.300.bin')
-      
-    
+        self.prefetcher = prefetcher
+        self.cost = None
+        self.costs = None
+        self.bound = None
+        self.expanded = 0
+        self.error = None
+        if provider is None:
+            provider = GraphProvider(graph_dict) if graph_dict else LinkProvider()
+        self.provider = provider
+        self.stats = stats if stats is not None else SearchStats(verbose=verbose)
+
     def find_path(self, start, end):
         """
         From a given start article and end article, computes a path of links
-        to traverse across Wikipedia from the start to the end.
+        to traverse across Wikipedia from the start to the end. If a budget of
+        the search stats runs out first, None is returned and the reason is
+        stored in self.error.
 
         Args:
             start (string): Title of the start article.
@@ -31,50 +55,200 @@ class AStar(Graph):
             path (list of strings): A list showing the path from the start article
                 to the end article.
         """
-        # Initialize sets, scores, and queue as before
-        pq = [(0, start)]
-        heapify(pq)
+        # Redirects and variant titles resolve to the article the provider knows them as
+        start, end = self.provider.canonical(start), self.provider.canonical(end)
+        # Initialize sets, scores, and queue; scores only hold nodes reached so far.
+        # Improving a queued node lowers its priority instead of adding a duplicate
+        pq = VertexQueue()
+        pq.push(start, 0)
         visited = set()
         came_from = {start: None}
-        g_score = defaultdict(
-            lambda: float("inf"), {key: float("inf") for key in self.graph}
-        )
-        g_score[start] = 0
-        f_score = defaultdict(
-            lambda: float("inf"), {key: float("inf") for key in self.graph}
-        )
-        end_vector = self.model.get_word_vector(end)
-        f_score[start] = self.find_heuristic(start, end)
+        neighbors = self.provider.for_goal(end)
+        g_score = {start: 0}
 
+        stats = self.stats
         start_time = time.time()
-        while pq:
-            _, curr_node = heappop(pq)
-            if curr_node in visited:
-                continue
-            visited.add(curr_node)
-            print(curr_node)
-
-            if curr_node.lower() == end.lower():
-                print(f"Total time {time.time() - start_time}")
-                print(f"Pages visited {len(visited)}")
-                return self.generate_path(came_from, curr_node)
+        self.error = None
+        with stats.run(start=start, goal=end):
+            pop, push = stats.timed(pq.pop, "heap"), stats.timed(pq.push, "heap")
+            try:
+                while pq:
+                    curr_node, f_score = pop()
+                    stats.pops += 1
+                    if stats.sample_every:
+                        stats.sample(len(pq))
+                    visited.add(curr_node)
+                    if stats.hooks:
+                        stats.emit("expand", {"vertex": curr_node, "distance": g_score[curr_node], "f_score": f_score})
 
-            
-            get_links_and_weights(self, curr_node, end_vector)
+                    if curr_node.lower() == end.lower():
+                        if stats.verbose:
+                            print(f"Total time {time.time() - start_time}")
+                            print(f"Pages visited {len(visited)}")
+                        self.cost = g_score[curr_node]
+                        self.expanded = len(visited)
+                        return self.generate_path(came_from, curr_node)
 
+                    if self.prefetcher:
+                        self.prefetcher.prefetch_queue(curr_node, pq)
 
+                    for neighbor, weight in neighbors.neighbors(curr_node):
+                        if neighbor in visited:
+                            continue
+                        tentative_g_score = g_score[curr_node] + weight
+                        if tentative_g_score < g_score.get(neighbor, float("inf")):
+                            came_from[neighbor] = curr_node
+                            g_score[neighbor] = tentative_g_score
+                            stats.relaxations += 1
+                            # For articles this is the weight just computed for the whole page
+                            h_score = neighbors.heuristic(neighbor)
+                            inserted = push(neighbor, tentative_g_score + h_score)
+                            if inserted:
+                                stats.pushes += 1
+                            elif inserted is False:
+                                stats.decrease_keys += 1
+            except BudgetExceeded as e:
+                # A budget of the stats (see instrumentation.Budget) ran out before the end was reached
+                self.error = str(e)
 
-            for neighbor, weight in self.graph[curr_node].items():
-                tentative_g_score = g_score[curr_node] + weight
-                if tentative_g_score < g_score[neighbor]:
-                    came_from[neighbor] = curr_node
-                    g_score[neighbor] = tentative_g_score
-                    h_score = self.find_heuristic(neighbor, end)
-                    f_score[neighbor] = tentative_g_score + h_score
-                    heappush(pq, (f_score[neighbor], neighbor))
-
+        self.cost = None
+        self.expanded = len(visited)
         return None
     
+    def find_path_bidirectional(self, start, end):
+        """
+        From a given start article and end article, computes a path of links
+        by searching forward from the start and backward over backlinks from
+        the end, guided by the heuristic in both directions. The path is the
+        shortest one only if the heuristic is consistent, such as the
+        landmark heuristic; the cosine distances between Wikipedia articles
+        are not, so there it is found the way find_path finds its path. If a
+        budget of the search stats runs out first, None is returned and the
+        reason is stored in self.error.
+
+        Args:
+            start (string): Title of the start article.
+            end (string): Title of the end article.
+        Returns:
+            path (list of strings): A list showing the path from the start article
+                to the end article.
+        """
+        start, end = self.provider.canonical(start), self.provider.canonical(end)
+        neighbors = self.provider.for_goal(end)
+        # Heuristics towards the start estimate the distance from the start
+        reverse = self.provider.for_goal(start)
+
+        def potential(node):
+            # Average of the forward and backward heuristics keeps both searches consistent
+            return (neighbors.heuristic(node) - reverse.heuristic(node)) / 2
+
+        start_time = time.time()
+        self.error = None
+        with self.stats.run(start=start, goal=end):
+            try:
+                # Search again if the path follows a backlink that is not a link
+                while True:
+                    path, cost, expanded = bidirectional_search(
+                        start, end, neighbors.neighbors, neighbors.predecessors, potential, stats=self.stats
+                    )
+                    if self.provider.confirm_path(path):
+                        break
+            except BudgetExceeded as e:
+                # A budget of the stats (see instrumentation.Budget) ran out before the searches met
+                path, cost, expanded, self.error = [], None, self.stats.pops, str(e)
+        path = self.provider.canonical_path(path)
+        if self.stats.verbose:
+            print(f"Total time {time.time() - start_time}")
+            print(f"Pages visited {expanded}")
+        self.cost = cost if path else None
+        self.expanded = expanded
+        return path or None
+
+    def find_path_anytime(self, start, end, epsilon=3.0):
+        """
+        From a given start article and end article, quickly computes a path
+        with weighted A* and keeps improving it until it is optimal or the
+        budget of the search stats runs out. The suboptimality bound of the
+        path returned is stored in self.bound.
+
+        Args:
+            start (string): Title of the start article.
+            end (string): Title of the end article.
+            epsilon (float): Weight of the heuristic; larger finds a first path sooner.
+        Returns:
+            path (list of strings): A list showing the path from the start article
+                to the end article.
+        """
+        return self.run_bounded(anytime_weighted_astar, start, end, epsilon=epsilon)
+
+    def find_path_beam(self, start, end, width=100):
+        """
+        From a given start article and end article, computes a path with beam
+        search, expanding at most width articles per step. The suboptimality
+        bound of the path returned is stored in self.bound.
+
+        Args:
+            start (string): Title of the start article.
+            end (string): Title of the end article.
+            width (int): Number of articles kept per step.
+        Returns:
+            path (list of strings): A list showing the path from the start article
+                to the end article.
+        """
+        return self.run_bounded(beam_search, start, end, width=width)
+
+    def run_bounded(self, search, start, end, **options):
+        """
+        Run one of the bounded-suboptimal searches of the anytime module.
+        """
+        start, end = self.provider.canonical(start), self.provider.canonical(end)
+        neighbors = self.provider.for_goal(end)
+
+        start_time = time.time()
+        with self.stats.run(start=start, goal=end):
+            path, cost, bound, expanded = search(
+                start, end, neighbors.neighbors, neighbors.heuristic, stats=self.stats, **options
+            )
+        path = self.provider.canonical_path(path)
+        if self.stats.verbose:
+            print(f"Total time {time.time() - start_time}")
+            print(f"Pages visited {expanded}")
+        self.cost = cost if path else None
+        self.bound = bound if path else None
+        self.expanded = expanded
+        return path or None
+
+    def find_paths(self, start, ends, nearest=False):
+        """
+        From a given start article, computes paths to several end articles in
+        a single expansion guided by the heuristic towards the nearest end,
+        so pages and link weights are fetched and computed once for all of them.
+
+        Args:
+            start (string): Title of the start article.
+            ends (list of strings): Titles of the end articles.
+            nearest (bool): Only find the path to the nearest end article.
+        Returns:
+            paths (dict): The path to each end article, an empty list for those
+                not reached; the costs are in self.costs.
+        """
+        start = self.provider.canonical(start)
+        resolved = {end: self.provider.canonical(end) for end in ends}
+        targets = list(dict.fromkeys(resolved.values()))
+        neighbors = self.provider.for_goals(targets)
+
+        start_time = time.time()
+        with self.stats.run(start=start, goal=targets):
+            paths, costs, expanded = one_to_many(
+                start, targets, neighbors.neighbors, neighbors.heuristic, nearest, stats=self.stats
+            )
+        if self.stats.verbose:
+            print(f"Total time {time.time() - start_time}")
+            print(f"Pages visited {expanded}")
+        self.costs = {end: costs[target] for end, target in resolved.items()}
+        self.expanded = expanded
+        return {end: self.provider.canonical_path(paths[target]) for end, target in resolved.items()}
+
     def generate_path(self, came_from, curr_node):
         """
         Generates a list representing the path to traverse.
@@ -98,35 +272,73 @@ class AStar(Graph):
 
         path.reverse()
 
-        return path
-        
-    def find_heuristic(self, start, end):
-        """
-        Given two articles, finds the cosine similarity between them
-        and uses that as a heuristic to measure distance between topics.
+        # Redirects found out about while searching are not steps of the path
+        return self.provider.canonical_path(path)
+
 
-        Args:
-            start (string): The starting article for the heuristic.
-            end (string): The ending article for the heuristic.
-        
-        Returns:
-            heuristic (float32): A value from 1 to 0 which measures how similar
-                the two topics are. A lower value is better.
-        """
-        if (start, end) not in self.heuristic_cache:
-            start_vec = self.model.get_word_vector(start)
-            end_vec = self.model.get_word_vector(end)
-            similarity = 1 - cosine(start_vec, end_vec)
-            heuristic = (1 - similarity) + 1e-5
-            self.heuristic_cache[(start, end)] = heuristic
-        return self.heuristic_cache[(start, end)]
-    
 @click.command()
 @click.option('--start', type=str, help='Title of start article')
-@click.option('--end', type=str, help='Title of end article')
-def main(start, end):
-    a_star = AStar({})
-    path = a_star.find_path(start, end)
+@click.option('--end', type=str, multiple=True, help='Title of end article; repeat to find paths to several articles at once')
+@click.option('--nearest', is_flag=True, help='With several end articles, only find the path to the nearest one')
+@click.option('--prefetch', type=int, default=0, help='Number of queued articles to fetch concurrently (0 to disable)')
+@click.option('--index', type=str, default=None, help='Directory of an offline link index to search instead of scraping')
+@click.option('--bidirectional', is_flag=True, help='Also search backward from the end over backlinks')
+@click.option('--verbose', is_flag=True, help='Print every expanded article')
+@click.option('--timing', is_flag=True, help='Also time the heap operations')
+@click.option('--epsilon', type=float, default=None, help='Find a path quickly with anytime weighted A*, then improve it')
+@click.option('--beam-width', type=int, default=None, help='Use beam search keeping this many articles per step')
+@click.option('--max-nodes', type=int, default=None, help='Stop after expanding this many articles')
+@click.option('--timeout', type=float, default=None, help='Stop after this many seconds')
+@click.option('--landmarks', type=str, default=None, help='Directory of landmarks built by landmarks.py; finds the path with the fewest links in --index')
+@click.option('--save-graph', type=str, default=None, help='Write the links fetched by the search to this graph snapshot')
+def main(start, end, nearest, prefetch, index, bidirectional, verbose, timing, epsilon, beam_width, max_nodes, timeout, landmarks, save_graph):
+    if not start or not end:
+        raise click.UsageError("give a --start and at least one --end")
+    # Searches that only find one path, at most one of which can run
+    modes = [
+        option for option, given in
+        (("--epsilon", epsilon is not None), ("--beam-width", beam_width is not None), ("--bidirectional", bidirectional))
+        if given
+    ]
+    if len(modes) > 1:
+        raise click.UsageError(f"{' and '.join(modes)} are different searches; pick one")
+    if modes and (len(end) > 1 or nearest):
+        raise click.UsageError(f"{modes[0]} searches for a single end article, not with several --end or --nearest")
+    if prefetch and (modes or len(end) > 1 or nearest):
+        raise click.UsageError("--prefetch only applies to the plain A* search for a single end article")
+    if landmarks and save_graph:
+        raise click.UsageError("--save-graph saves fetched links, which --landmarks reads from the index instead")
+    provider = None
+    if index:
+        offline_index = OfflineIndex(index)
+        use_link_source(offline_index)
+        if landmarks:
+            provider = IndexProvider(offline_index, LandmarkHeuristic(Landmarks(landmarks), offline_index.id))
+    elif landmarks:
+        raise click.UsageError("--landmarks needs --index")
+    prefetcher = Prefetcher(width=prefetch, concurrency=prefetch) if prefetch else None
+    hooks = [Budget(max_nodes, timeout)] if max_nodes or timeout else []
+    a_star = AStar({}, prefetcher=prefetcher, provider=provider, stats=SearchStats(hooks, timing=timing, verbose=verbose))
+    if len(end) > 1 or nearest:
+        path = a_star.find_paths(start, list(end), nearest)
+    elif epsilon is not None:
+        path = a_star.find_path_anytime(start, end[0], epsilon)
+    elif beam_width is not None:
+        path = a_star.find_path_beam(start, end[0], beam_width)
+    elif bidirectional:
+        path = a_star.find_path_bidirectional(start, end[0])
+    else:
+        path = a_star.find_path(start, end[0])
+    if prefetcher:
+        prefetcher.close()
+    heuristic_cache.save()
+    if save_graph:
+        write_provider_snapshot(save_graph, a_star.provider)
+    print(a_star.stats.as_dict())
+    if a_star.error:
+        print(f"Stopped early: {a_star.error}")
+    if a_star.bound is not None:
+        print(f"Cost {a_star.cost}, at most {a_star.bound:.3f} times the optimal cost")
     print(f"Discovered Path: {path}")
 
 if __name__ == "__main__":
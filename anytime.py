@@ -0,0 +1,214 @@
+"""
+Bounded-suboptimal searches that return a path early: anytime weighted A*
+and beam search. Both report a suboptimality bound, the ratio between the
+cost of the path found and a lower bound on the optimal cost. The bound is
+exact for admissible heuristics and an estimate otherwise.
+
+Budgets come from the hooks of the SearchStats (see instrumentation.Budget):
+when one runs out, the best path found so far is returned instead of an error.
+"""
+
+from instrumentation import BudgetExceeded, SearchStats
+from priority_queue import VertexQueue
+
+
+def anytime_weighted_astar(start, goal, expand, heuristic, epsilon=3.0, stats=None):
+    """
+    Anytime weighted A*: expand by g + epsilon * h to reach a first path
+    quickly, then keep expanding to improve it, pruning every vertex whose
+    g + h cannot beat the best path. Vertices are reopened when their
+    distance improves. The search ends when nothing is left to prune, which
+    proves the path optimal, or when the budget runs out.
+
+    Every improved path fires a "solution" event with its path, cost and bound.
+
+    Args:
+        start: The starting vertex (source)
+        goal: The target vertex (goal); compared case-insensitively
+        expand: function mapping a vertex to its (neighbor, weight) pairs
+        heuristic: function estimating the distance from a vertex to the goal
+        epsilon: weight of the heuristic; 1 is plain A*, larger finds a first path sooner.
+        stats: SearchStats to count in, fire hooks of and take budgets from.
+
+    Returns:
+        path: List of vertices from start to goal, or an empty list if no path is found.
+        cost: Total weight of the path, or infinity if no path is found.
+        bound: Cost of the path divided by a lower bound on the optimal cost, 1 when optimal.
+        expanded: Number of expansions, counting reopened vertices again.
+    """
+    if stats is None:
+        stats = SearchStats()
+    goal_key = goal.lower()
+    h = {start: heuristic(start)}
+    g_score = {start: 0}
+    came_from = {start: None}
+    # Improving a queued vertex lowers its priority; improving an expanded one queues it again
+    pq = VertexQueue()
+    pq.push(start, epsilon * h[start])
+    best, best_vertex = float("inf"), None
+    expanded = 0
+    # g + h of the vertex being expanded, which bounds the optimal cost like the queued ones
+    expanding = float("inf")
+
+    if start.lower() == goal_key:
+        return [start], 0, 1.0, 0
+
+    try:
+        pop, push = stats.timed(pq.pop, "heap"), stats.timed(pq.push, "heap")
+        while pq:
+            vertex, _ = pq.peek()
+            g = g_score[vertex]
+            # Unable to beat the best path
+            pruned = g + h[vertex] >= best
+            # Fired before the pop, so a vertex the budget stops at stays in the lower bound
+            if not pruned and stats.hooks:
+                stats.emit("expand", {"vertex": vertex, "distance": g})
+            pop()
+            stats.pops += 1
+            if stats.sample_every:
+                stats.sample(len(pq))
+            if pruned:
+                continue
+            expanded += 1
+            expanding = g + h[vertex]
+
+            for neighbor, weight in expand(vertex):
+                tent_dist = g + weight
+                if tent_dist >= g_score.get(neighbor, float("inf")) or tent_dist >= best:
+                    continue
+                g_score[neighbor] = tent_dist
+                came_from[neighbor] = vertex
+                stats.relaxations += 1
+                if neighbor.lower() == goal_key:
+                    best, best_vertex = tent_dist, neighbor
+                    if stats.hooks:
+                        stats.emit("solution", {
+                            "path": generate_path(came_from, neighbor), "cost": best,
+                            "bound": suboptimality(best, pq, g_score, h, expanding),
+                        })
+                    continue
+                if neighbor not in h:
+                    h[neighbor] = heuristic(neighbor)
+                if tent_dist + h[neighbor] < best:
+                    inserted = push(neighbor, tent_dist + epsilon * h[neighbor])
+                    if inserted:
+                        stats.pushes += 1
+                    elif inserted is False:
+                        stats.decrease_keys += 1
+            expanding = float("inf")
+    except BudgetExceeded:
+        pass
+
+    if best_vertex is None:
+        return [], float("inf"), float("inf"), expanded
+    return generate_path(came_from, best_vertex), best, suboptimality(best, pq, g_score, h, expanding), expanded
+
+
+def beam_search(start, goal, expand, heuristic, width=100, stats=None):
+    """
+    Beam search: expand the frontier a layer at a time, keeping only the
+    width vertices with the smallest g + h in each layer, so memory and
+    fetches grow linearly with the depth. Layers continue after the first
+    path is found while some vertex can still beat it. Vertices whose
+    distance improves may enter a later layer again.
+
+    A vertex dropped from a layer is never expanded, so its g + h is kept as
+    a lower bound of the paths through it for the suboptimality bound.
+
+    Args:
+        start: The starting vertex (source)
+        goal: The target vertex (goal); compared case-insensitively
+        expand: function mapping a vertex to its (neighbor, weight) pairs
+        heuristic: function estimating the distance from a vertex to the goal
+        width: maximum number of vertices expanded per layer.
+        stats: SearchStats to count in, fire hooks of and take budgets from.
+
+    Returns:
+        path: List of vertices from start to goal, or an empty list if no path is found.
+        cost: Total weight of the path, or infinity if no path is found.
+        bound: Cost of the path divided by a lower bound on the optimal cost, 1 when optimal.
+        expanded: Number of expansions, counting vertices expanded in several layers again.
+    """
+    if stats is None:
+        stats = SearchStats()
+    goal_key = goal.lower()
+    h = {start: heuristic(start)}
+    g_score = {start: 0}
+    came_from = {start: None}
+    layer = [start]
+    best, best_vertex = float("inf"), None
+    # Smallest g + h of the vertices dropped from a layer
+    dropped = float("inf")
+    expanded = 0
+    remaining, candidates = [], {}
+
+    if start.lower() == goal_key:
+        return [start], 0, 1.0, 0
+
+    try:
+        while layer:
+            candidates = {}
+            for position, vertex in enumerate(layer):
+                # Visible to the lower bound if the budget runs out here
+                remaining = layer[position:]
+                expanded += 1
+                stats.pops += 1
+                if stats.hooks:
+                    stats.emit("expand", {"vertex": vertex, "distance": g_score[vertex]})
+                for neighbor, weight in expand(vertex):
+                    tent_dist = g_score[vertex] + weight
+                    if tent_dist >= g_score.get(neighbor, float("inf")) or tent_dist >= best:
+                        continue
+                    g_score[neighbor] = tent_dist
+                    came_from[neighbor] = vertex
+                    stats.relaxations += 1
+                    if neighbor.lower() == goal_key:
+                        best, best_vertex = tent_dist, neighbor
+                        if stats.hooks:
+                            stats.emit("solution", {"path": generate_path(came_from, neighbor), "cost": best})
+                        continue
+                    if neighbor not in h:
+                        h[neighbor] = heuristic(neighbor)
+                    candidates[neighbor] = tent_dist + h[neighbor]
+            remaining = []
+
+            ranked = sorted((f_score, vertex) for vertex, f_score in candidates.items() if f_score < best)
+            if len(ranked) > width:
+                dropped = min(dropped, ranked[width][0])
+            layer = [vertex for _, vertex in ranked[:width]]
+            stats.pushes += len(layer)
+            if stats.sample_every:
+                stats.sample(len(layer))
+    except BudgetExceeded:
+        # Unexpanded vertices of this layer and the next bound the optimal cost too
+        for vertex in remaining + list(candidates):
+            dropped = min(dropped, g_score[vertex] + h[vertex])
+
+    if best_vertex is None:
+        return [], float("inf"), float("inf"), expanded
+    return generate_path(came_from, best_vertex), best, best / max(min(dropped, best), 1e-12), expanded
+
+
+def suboptimality(best, pq, g_score, h, expanding=float("inf")) -> float:
+    """
+    Bound the suboptimality of a path of cost best found by anytime weighted
+    A*: any better path must pass through a queued vertex or the one being
+    expanded, so the smallest g + h among them bounds the optimal cost from below.
+    """
+    lower = min((g_score[vertex] + h[vertex] for vertex in pq), default=best)
+    lower = min(lower, expanding)
+    return best / max(min(lower, best), 1e-12)
+
+
+def generate_path(came_from, vertex) -> list:
+    """
+    Follow came_from back from a vertex to the start.
+
+    Returns:
+        The path from the start to the vertex.
+    """
+    path = [vertex]
+    while came_from[path[-1]] is not None:
+        path.append(came_from[path[-1]])
+    path.reverse()
+    return path
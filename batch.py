@@ -0,0 +1,171 @@
+"""
+Batch solver: finds paths for many (start, end) pairs on a process pool and
+streams the results as JSONL as they complete.
+
+Run with:
+    python3 batch.py --pairs pairs.jsonl --out results.jsonl --algorithm dijkstra --workers 8 --index index/
+
+Pairs are read from JSONL lines like {"start": "A", "end": "B"}, or from a CSV
+file with start and end columns. Pairs already solved in the output file
+are skipped, so an interrupted run resumes where it stopped; pairs that
+failed with an error are tried again.
+"""
+
+import csv
+import json
+import multiprocessing
+import os
+import time
+
+import click
+
+import scraper
+from a_star import AStar
+from bellman_ford import BellmanFord
+from dijkstra import Dijkstra
+from link_cache import LinkCache
+from neighbors import LinkProvider
+from offline_index import OfflineIndex
+from redirects import RedirectMap
+
+ALGORITHMS = {"dijkstra": Dijkstra, "astar": AStar, "bellman-ford": BellmanFord}
+
+# Set in each worker by init_worker; reused for all the pairs the worker solves
+search = None
+bidirectional_mode = False
+
+
+def read_pairs(path: str) -> list:
+    """
+    Read (start, end) pairs from a JSONL or CSV file.
+
+    Args:
+        path: path of the file; .csv files are read as CSV, anything else as JSONL
+
+    Returns:
+        A list of (start, end) tuples.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            return [(row["start"], row["end"]) for row in csv.DictReader(f)]
+        return [(pair["start"], pair["end"]) for pair in (json.loads(line) for line in f if line.strip())]
+
+
+def read_done(path: str) -> set:
+    """
+    Read the pairs already solved in an output file, ignoring a truncated last
+    line and the pairs that failed with an error, so they are tried again.
+    """
+    done = set()
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if result.get("error") is None:
+                    done.add((result["start"], result["end"]))
+    return done
+
+
+def init_worker(algorithm: str, bidirectional: bool) -> None:
+    """
+    Create the search object of a worker process. The embedding store and
+    offline index were loaded before forking, so workers share them.
+    """
+    global search, bidirectional_mode
+    # SQLite connections must not be shared across a fork
+    scraper.link_cache = LinkCache(scraper.link_cache.path)
+    scraper.backlink_cache = LinkCache(scraper.link_cache.path, table="backlinks")
+    scraper.redirects = RedirectMap(scraper.link_cache.path)
+    search = ALGORITHMS[algorithm]({}, provider=LinkProvider())
+    bidirectional_mode = bidirectional
+
+
+def find_path(search, start: str, end: str, bidirectional: bool = False, epsilon: float = None, beam_width: int = None) -> list:
+    """
+    Run a search object's path query, whichever algorithm it implements.
+    epsilon and beam_width select the anytime and beam searches of AStar.
+
+    Returns:
+        The path, or an empty list if none is found.
+    """
+    if epsilon is not None and isinstance(search, AStar):
+        path = search.find_path_anytime(start, end, epsilon)
+    elif beam_width is not None and isinstance(search, AStar):
+        path = search.find_path_beam(start, end, beam_width)
+    elif bidirectional and isinstance(search, Dijkstra):
+        path = search.find_shortest_path_bidirectional(start, end)
+    elif bidirectional and isinstance(search, AStar):
+        path = search.find_path_bidirectional(start, end)
+    elif isinstance(search, AStar):
+        path = search.find_path(start, end)
+    else:
+        path = search.find_shortest_path(start, end)
+    return path or []
+
+
+def solve(pair: tuple) -> dict:
+    """
+    Find the path for one pair in a worker process.
+
+    Returns:
+        A dictionary with the path, its cost, the number of articles expanded, the elapsed
+        time and the search stats.
+    """
+    start, end = pair
+    start_time = time.time()
+    try:
+        path = find_path(search, start, end, bidirectional_mode)
+        cost, expanded, error = search.cost, search.expanded, None
+    except Exception as e:
+        path, cost, expanded, error = None, None, 0, repr(e)
+    stats = search.stats.as_dict()
+    return {
+        "start": start,
+        "end": end,
+        "path": path or [],
+        "cost": cost,
+        "expanded": expanded,
+        "elapsed": time.time() - start_time,
+        "stats": stats,
+        "error": error,
+    }
+
+
+# Run with: `python3 batch.py --pairs PAIRS --out RESULTS`
+@click.command()
+@click.option('--pairs', type=str, help='JSONL or CSV file of start/end pairs')
+@click.option('--out', type=str, help='JSONL file to append results to')
+@click.option('--algorithm', type=click.Choice(list(ALGORITHMS)), default='dijkstra', help='Search algorithm')
+@click.option('--workers', type=int, default=os.cpu_count(), help='Number of worker processes')
+@click.option('--index', type=str, default=None, help='Directory of an offline link index to search instead of scraping')
+@click.option('--bidirectional', is_flag=True, help='Use the bidirectional search (dijkstra and astar)')
+def main(pairs, out, algorithm, workers, index, bidirectional):
+    if index:
+        scraper.use_link_source(OfflineIndex(index))
+    if scraper.model.table is None:
+        # Load fastText once here so forked workers share it instead of each loading a copy
+        scraper.model.get_word_vector("")
+
+    done = read_done(out)
+    todo = [pair for pair in dict.fromkeys(read_pairs(pairs)) if pair not in done]
+    print(f"{len(done)} pairs already solved, {len(todo)} to go")
+
+    context = multiprocessing.get_context("fork")
+    with context.Pool(workers, initializer=init_worker, initargs=(algorithm, bidirectional)) as pool, \
+            open(out, "a+", encoding="utf-8") as results:
+        # Terminate a line left truncated by an interrupted run
+        if results.tell() > 0:
+            results.seek(results.tell() - 1)
+            if results.read(1) != "\n":
+                results.write("\n")
+        for count, result in enumerate(pool.imap_unordered(solve, todo), 1):
+            results.write(json.dumps(result) + "\n")
+            results.flush()
+            if count % 100 == 0:
+                print(f"{count}/{len(todo)} pairs solved")
+
+if __name__ == "__main__":
+    main()
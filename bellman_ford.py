@@ -1,69 +1,138 @@
 from scraper import *
 from graph import Graph
+from fetcher import Prefetcher
+from offline_index import OfflineIndex
+from neighbors import GraphProvider, LinkProvider
+from instrumentation import BudgetExceeded, SearchStats
 
 import time
 import click
-from collections import defaultdict
+from collections import deque
+from itertools import islice
 
 
 class BellmanFord(Graph):
-    def __init__(self, graph_dict: dict) -> None:
+    def __init__(self, graph_dict: dict, prefetcher: Prefetcher = None, provider=None, stats: SearchStats = None, verbose: bool = False) -> None:
+        """
+        Initialize the BellmanFord object
+
+        Args:
+            graph_dict: a fixed graph to search, or an empty dict to search Wikipedia.
+            prefetcher: optional Prefetcher fetching discovered articles concurrently.
+            provider: neighbor provider to share with other searches; defaults to one
+                serving graph_dict, or a LinkProvider if graph_dict is empty.
+            stats: SearchStats collecting the counters and hooks of each query.
+            verbose: print every expanded vertex; ignored if stats is given.
+        """
         super().__init__(graph_dict)
         self.path = None
-
-    def find_shortest_path(self, start: str, goal: str) -> list:
+        self.cost = None
+        self.expanded = 0
+        self.error = None
+        self.prefetcher = prefetcher
+        if provider is None:
+            provider = GraphProvider(graph_dict) if graph_dict else LinkProvider()
+        self.provider = provider
+        self.stats = stats if stats is not None else SearchStats(verbose=verbose)
+
+    def find_shortest_path(self, start: str, goal: str, bound: float = float("inf"), check_negative_cycles: bool = False) -> list:
         """
-        Compute the shortest path from the start node to the goal node using the Bellman-Ford algorithm.
+        Compute the shortest path from the start node to the goal node using the Bellman-Ford
+        algorithm in its queue-based form (SPFA): only vertices whose distance changed are
+        relaxed again, and each vertex is expanded at most once.
+
+        Since link weights are positive, a vertex whose distance is not below the best known
+        distance to the goal (or the bound) cannot lead to a shorter path, so it is not queued.
+        The search ends when the queue is empty, which settles the goal's distance. If a
+        budget of the search stats runs out first, an empty list is returned and the reason
+        is stored in self.error.
 
         Args:
             start: The starting vertex (source)
             goal: The target vertex (goal)
+            bound: Maximum path cost of interest; paths costing more are not explored.
+            check_negative_cycles: Explore everything reachable without pruning, then check
+                that no edge can still be relaxed. Only useful for graphs with negative weights.
 
         Returns:
             path: List of vertices that make up the shortest path, or an empty list if no path is found.
         """
-        end_vector = model.get_word_vector(goal)
-
-        # Initialize distances to infinity and set the distance of the start node to 0
-        distances = defaultdict(
-            lambda: float("inf"), {key: float("inf") for key in self.graph}
-        )
-        distances[start] = 0
+        # Redirects and variant titles resolve to the article the provider knows them as
+        start, goal = self.provider.canonical(start), self.provider.canonical(goal)
+        neighbors = self.provider.for_goal(goal)
+
+        # Expanded vertices mapped to their (neighbor, weight) pairs; distances only hold
+        # vertices reached so far
+        expanded = {}
+        distances = {start: 0}
         came_from = {start: None}
+        queue = deque([start])
+        queued = {start}
+        times_queued = {start: 1}
+        # Goal vertex reached and its distance, matching the goal's title case-insensitively
+        # like the other searches
+        goal_key = goal.lower()
+        reached, goal_dist = (start, 0) if start.lower() == goal_key else (None, float("inf"))
 
-        get_links_and_weights(self, start, end_vector)
         start_time = time.time()
-        if goal in self.graph:
-            came_from = {start: None, goal: start}
-            print(f"{time.time() - start_time} seconds elapsed")
-            return self.generate_path(came_from, goal)
-
-        while goal not in self.graph:
-            # Relax edges up to (number of vertices - 1) times
-            for _ in range(len(self.graph.copy()) - 1):
-                for vertex in self.graph.copy():
-                    print(vertex)
-                    get_links_and_weights(self, vertex, end_vector)
-                    for neighbor, weight in self.graph[vertex].items():
-                        if distances[vertex] + weight < distances[neighbor]:
-                            distances[neighbor] = distances[vertex] + weight
+        stats = self.stats
+        self.error = None
+        with stats.run(start=start, goal=goal):
+            try:
+                while queue:
+                    vertex = queue.popleft()
+                    queued.discard(vertex)
+                    stats.pops += 1
+                    if stats.sample_every:
+                        stats.sample(len(queue))
+                    if vertex not in expanded:
+                        if self.prefetcher:
+                            self.prefetcher.prefetch([vertex] + [v for v in islice(queue, self.prefetcher.width - 1) if v not in expanded])
+                        if stats.hooks:
+                            stats.emit("expand", {"vertex": vertex, "distance": distances[vertex]})
+                        expanded[vertex] = neighbors.neighbors(vertex)
+
+                    for neighbor, weight in expanded[vertex]:
+                        tent_dist = distances[vertex] + weight
+                        if tent_dist < distances.get(neighbor, float("inf")):
+                            distances[neighbor] = tent_dist
                             came_from[neighbor] = vertex
-                if goal in self.graph:
-                    print(f"{time.time() - start_time} seconds elapsed")
-                    return self.generate_path(came_from, goal)
-
-            # Check for negative weight cycles
-            for vertex in self.graph:
-                for neighbor, weight in self.graph[vertex].items():
-                    if distances[vertex] + weight < distances[neighbor]:
-                        raise ValueError(
-                            "Graph contains a negative weight cycle"
-                        )
-
-        if distances[goal] == float("inf"):
+                            stats.relaxations += 1
+                            at_goal = neighbor.lower() == goal_key
+                            if at_goal and tent_dist < goal_dist:
+                                reached, goal_dist = neighbor, tent_dist
+                            if check_negative_cycles:
+                                prune = False
+                            else:
+                                prune = at_goal or tent_dist >= min(bound, goal_dist)
+                            if not prune and neighbor not in queued:
+                                queue.append(neighbor)
+                                queued.add(neighbor)
+                                stats.pushes += 1
+                                times_queued[neighbor] = times_queued.get(neighbor, 0) + 1
+                                # Queued more often than there are vertices means a negative cycle
+                                if times_queued[neighbor] > len(distances):
+                                    raise ValueError("Graph contains a negative weight cycle")
+            except BudgetExceeded as e:
+                # A budget of the stats (see instrumentation.Budget) ran out before the goal's distance was settled
+                self.error = str(e)
+
+            if check_negative_cycles and not self.error:
+                for vertex, edges in expanded.items():
+                    for neighbor, weight in edges:
+                        if distances[vertex] + weight < distances[neighbor]:
+                            raise ValueError(
+                                "Graph contains a negative weight cycle"
+                            )
+
+        self.expanded = len(expanded)
+        if stats.verbose:
+            print(f"{time.time() - start_time} seconds elapsed")
+        if reached is None or goal_dist > bound or self.error:
+            self.cost = None
             return []  # No path found
-        print(f"{time.time() - start_time} seconds elapsed")
-        return self.generate_path(came_from, goal)
+        self.cost = goal_dist
+        return self.generate_path(came_from, reached)
 
     def generate_path(self, came_from: dict, curr_node: str):
         """
@@ -82,6 +151,8 @@ class BellmanFord(Graph):
             path.append(curr_node)
 
         path.reverse()
+        # Redirects found out about while searching are not steps of the path
+        path = self.provider.canonical_path(path)
         self.path = path
         return path
 
@@ -89,9 +160,21 @@ class BellmanFord(Graph):
 @click.command()
 @click.option('--start', type=str, help='Name of starting page')
 @click.option('--end', type=str, help='Name of goal page')
-def main(start,end):
-    bf = BellmanFord({})
-    result = bf.find_shortest_path(start=start, goal=end)
+@click.option('--prefetch', type=int, default=0, help='Number of pages to fetch concurrently (0 to disable)')
+@click.option('--index', type=str, default=None, help='Directory of an offline link index to search instead of scraping')
+@click.option('--bound', type=float, default=float("inf"), help='Maximum path cost to explore')
+@click.option('--check-negative-cycles', is_flag=True, help='Explore without pruning and check for negative cycles')
+@click.option('--verbose', is_flag=True, help='Print every expanded page')
+def main(start, end, prefetch, index, bound, check_negative_cycles, verbose):
+    if index:
+        use_link_source(OfflineIndex(index))
+    prefetcher = Prefetcher(width=prefetch, concurrency=prefetch) if prefetch else None
+    bf = BellmanFord({}, prefetcher=prefetcher, verbose=verbose)
+    result = bf.find_shortest_path(start=start, goal=end, bound=bound, check_negative_cycles=check_negative_cycles)
+    if prefetcher:
+        prefetcher.close()
+    heuristic_cache.save()
+    print(bf.stats.as_dict())
     print(result)
 
 if __name__ == "__main__":
@@ -0,0 +1,222 @@
+"""
+Reproducible benchmark of the search algorithms. Runs fully offline: graphs
+are TEST_GRAPH, synthetic scale-free graphs written as offline indexes, and
+optionally a recorded offline wiki index, with a deterministic stand-in for
+the fastText model.
+
+Run with:
+    python3 benchmark.py --sizes 1000,10000,100000 --queries 20 --out bench.json
+"""
+
+import hashlib
+import json
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import click
+import numpy as np
+
+import a_star
+import dijkstra
+import scraper
+from batch import read_pairs
+from bellman_ford import BellmanFord
+from graph import TEST_GRAPH
+from heuristic_cache import HeuristicCache
+from neighbors import GraphProvider, LinkProvider
+from offline_index import IndexBuilder, OfflineIndex
+
+ALGORITHMS = ["dijkstra", "dijkstra-bidirectional", "astar", "astar-bidirectional", "bellman-ford"]
+
+
+class HashEmbeddings:
+    def __init__(self, dimension: int = 300) -> None:
+        """
+        Initialize the HashEmbeddings object, a deterministic stand-in for the
+        fastText model: each title gets a fixed pseudo-random vector seeded by
+        a hash of the title.
+        """
+        self.dimension = dimension
+
+    def get_word_vector(self, title: str):
+        """
+        Get the vector of a title.
+        """
+        seed = int.from_bytes(hashlib.blake2b(title.encode("utf-8"), digest_size=8).digest(), "little")
+        return np.random.default_rng(seed).standard_normal(self.dimension).astype(np.float32)
+
+    def get_word_vectors(self, titles: list):
+        """
+        Get the vectors of several titles as one matrix.
+        """
+        return np.stack([self.get_word_vector(title) for title in titles])
+
+
+def scale_free_edges(num_nodes: int, links_per_node: int = 4, seed: int = 0):
+    """
+    Generate a directed scale-free graph by preferential attachment: each new
+    node links to existing nodes picked in proportion to their degree, and
+    each of those links back with probability one half.
+
+    Returns:
+        A generator of (source, target) node number pairs.
+    """
+    rng = random.Random(seed)
+    # Every node appears here once per edge it touches, so a uniform pick is degree-proportional
+    endpoints = list(range(links_per_node))
+    for node in range(links_per_node, num_nodes):
+        targets = {rng.choice(endpoints) for _ in range(links_per_node)}
+        for target in targets:
+            yield node, target
+            if rng.random() < 0.5:
+                yield target, node
+            endpoints.append(target)
+        endpoints.extend([node] * len(targets))
+
+
+def build_scale_free_index(num_nodes: int, directory: str, seed: int = 0) -> None:
+    """
+    Write a synthetic scale-free graph with titles "Q<number>" as an offline index.
+    """
+    builder = IndexBuilder()
+    nodes = [builder.node(f"Q{node}") for node in range(num_nodes)]
+    for source, target in scale_free_edges(num_nodes, seed=seed):
+        builder.add_edge(nodes[source], nodes[target])
+    builder.write(directory)
+
+
+def run_query(algorithm: str, provider, start: str, end: str) -> dict:
+    """
+    Run one query with a fresh search object on a shared provider.
+
+    Returns:
+        A dictionary with the path cost and length, articles expanded, queue pushes and pops.
+    """
+    if algorithm.startswith("dijkstra"):
+        search = dijkstra.Dijkstra({}, provider=provider)
+        run = search.find_shortest_path_bidirectional if algorithm.endswith("bidirectional") else search.find_shortest_path
+    elif algorithm.startswith("astar"):
+        search = a_star.AStar({}, provider=provider)
+        run = search.find_path_bidirectional if algorithm.endswith("bidirectional") else search.find_path
+    else:
+        search = BellmanFord({}, provider=provider)
+        run = search.find_shortest_path
+
+    path = run(start, end)
+    return {
+        "cost": search.cost,
+        "path_length": len(path) if path else 0,
+        "expanded": search.expanded,
+        "heap_pushes": search.stats.pushes,
+        "heap_pops": search.stats.pops,
+    }
+
+
+def benchmark_graph(name: str, make_provider, pairs: list, algorithms: list) -> list:
+    """
+    Benchmark each algorithm on each pair. Every query gets a fresh provider,
+    so nothing learned by one query speeds up the next, and runs twice: once
+    timed, once under tracemalloc for its peak memory.
+    """
+    results = []
+    for algorithm in algorithms:
+        for start, end in pairs:
+            start_time = time.perf_counter()
+            result = run_query(algorithm, make_provider(), start, end)
+            wall_time = time.perf_counter() - start_time
+
+            tracemalloc.start()
+            run_query(algorithm, make_provider(), start, end)
+            _, peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results.append({
+                "graph": name, "algorithm": algorithm, "start": start, "end": end,
+                "wall_time": wall_time, "peak_memory": peak_memory, **result,
+            })
+            print(f"{name} {algorithm} {start} -> {end}: {wall_time:.4f}s, {result['expanded']} expanded")
+    return results
+
+
+def summarize(results: list) -> list:
+    """
+    Aggregate the results per graph and algorithm, with medians for regression tracking.
+    """
+    groups = {}
+    for result in results:
+        groups.setdefault((result["graph"], result["algorithm"]), []).append(result)
+    return [
+        {
+            "graph": graph,
+            "algorithm": algorithm,
+            "queries": len(group),
+            "median_wall_time": statistics.median(r["wall_time"] for r in group),
+            "median_expanded": statistics.median(r["expanded"] for r in group),
+            "median_heap_pushes": statistics.median(r["heap_pushes"] for r in group),
+            "median_heap_pops": statistics.median(r["heap_pops"] for r in group),
+            "max_peak_memory": max(r["peak_memory"] for r in group),
+            "total_cost": sum(r["cost"] for r in group if r["cost"] is not None),
+        }
+        for (graph, algorithm), group in groups.items()
+    ]
+
+
+# Run with: `python3 benchmark.py --out bench.json`
+@click.command()
+@click.option('--sizes', type=str, default='1000,10000', help='Comma separated node counts of the synthetic graphs')
+@click.option('--queries', type=int, default=10, help='Number of random pairs per graph')
+@click.option('--algorithms', type=str, default=','.join(ALGORITHMS), help='Comma separated algorithms to run')
+@click.option('--max-bellman-ford-nodes', type=int, default=100000, help='Skip Bellman-Ford on larger graphs')
+@click.option('--index', type=str, default=None, help='Recorded offline wiki index to benchmark as well')
+@click.option('--pairs', type=str, default=None, help='JSONL or CSV start/end pairs for --index; random pairs otherwise')
+@click.option('--seed', type=int, default=0, help='Seed of the graphs and pairs')
+@click.option('--out', type=str, default='bench.json', help='JSON file to write the results to')
+def main(sizes, queries, algorithms, max_bellman_ford_nodes, index, pairs, seed, out):
+    scraper.use_model(HashEmbeddings())
+    algorithms = algorithms.split(',')
+    rng = random.Random(seed)
+    results = []
+
+    test_nodes = sorted(TEST_GRAPH)
+    test_pairs = [tuple(rng.sample(test_nodes, 2)) for _ in range(queries)]
+    results += benchmark_graph("TEST_GRAPH", lambda: GraphProvider(TEST_GRAPH), test_pairs, algorithms)
+
+    graphs = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in map(int, sizes.split(',')):
+            path = os.path.join(directory, f"scale_free_{size}")
+            build_scale_free_index(size, path, seed)
+            graph_pairs = [(f"Q{rng.randrange(size)}", f"Q{rng.randrange(size)}") for _ in range(queries)]
+            graphs.append((f"scale_free_{size}", size, OfflineIndex(path), graph_pairs))
+
+        if index:
+            wiki = OfflineIndex(index)
+            if pairs:
+                wiki_pairs = read_pairs(pairs)[:queries]
+            else:
+                wiki_pairs = [(wiki.title(rng.randrange(len(wiki))), wiki.title(rng.randrange(len(wiki)))) for _ in range(queries)]
+            graphs.append(("wiki", len(wiki), wiki, wiki_pairs))
+
+        for name, size, offline_index, graph_pairs in graphs:
+            scraper.use_link_source(offline_index)
+            graph_algorithms = [a for a in algorithms if a != "bellman-ford" or size <= max_bellman_ford_nodes]
+            make_provider = lambda: LinkProvider(HeuristicCache(scraper.model))
+            results += benchmark_graph(name, make_provider, graph_pairs, graph_algorithms)
+        scraper.use_link_source(None)
+
+    report = {
+        "environment": {"python": platform.python_version(), "machine": platform.machine(), "seed": seed},
+        "summary": summarize(results),
+        "results": results,
+    }
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {out}")
+
+if __name__ == "__main__":
+    main()
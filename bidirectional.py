@@ -0,0 +1,95 @@
+"""
+Bidirectional search: a forward search over outgoing links from the start
+and a backward search over backlinks from the goal, meeting in the middle
+"""
+
+from instrumentation import SearchStats
+from priority_queue import VertexQueue
+
+
+def bidirectional_search(start, goal, forward, backward, potential=None, stats=None):
+    """
+    Compute the shortest path from start to goal by alternately expanding the
+    smaller of the forward and backward frontiers. The search stops once the
+    best known meeting point cannot be improved, i.e. when the smallest keys
+    of both queues add up to at least its cost.
+
+    With a potential function the search becomes bidirectional A*: the
+    forward queue is keyed by g + potential and the backward one by
+    g - potential, which keeps the stopping criterion valid for consistent
+    potentials. With an inconsistent one the search may stop before finding
+    the shortest path, and returns the best one it met.
+
+    Args:
+        start: The starting vertex (source)
+        goal: The target vertex (goal)
+        forward: function mapping a vertex to its (neighbor, weight) pairs
+        backward: function mapping a vertex to its (predecessor, weight) pairs
+        potential: optional function estimating how much closer a vertex is to the
+            goal than to the start; None gives bidirectional Dijkstra.
+        stats: SearchStats to count pops, pushes and relaxations in and fire the
+            "expand" hooks of; events carry the side, 0 forward and 1 backward.
+
+    Returns:
+        path: List of vertices from start to goal, or an empty list if no path is found.
+        cost: Total weight of the path, or infinity if no path is found.
+        expanded: Number of vertices expanded by both searches together.
+    """
+    if start == goal:
+        return [start], 0, 0
+    if potential is None:
+        potential = lambda vertex: 0
+    if stats is None:
+        stats = SearchStats()
+
+    expand = (forward, backward)
+    signs = (1, -1)
+    distances = ({start: 0}, {goal: 0})
+    came_from = ({start: None}, {goal: None})
+    visited = (set(), set())
+    queues = (VertexQueue(), VertexQueue())
+    queues[0].push(start, potential(start))
+    queues[1].push(goal, -potential(goal))
+    pops = [stats.timed(queue.pop, "heap") for queue in queues]
+    pushes = [stats.timed(queue.push, "heap") for queue in queues]
+
+    best, meeting = float("inf"), None
+    while queues[0] and queues[1]:
+        if queues[0].peek()[1] + queues[1].peek()[1] >= best:
+            break
+        side = 0 if len(queues[0]) <= len(queues[1]) else 1
+        vertex, key = pops[side]()
+        stats.pops += 1
+        if stats.sample_every:
+            stats.sample(len(queues[0]) + len(queues[1]))
+        visited[side].add(vertex)
+        if stats.hooks:
+            stats.emit("expand", {"vertex": vertex, "key": key, "side": side})
+
+        dist, other = distances[side], distances[1 - side]
+        for neighbor, weight in expand[side](vertex):
+            tent_dist = dist[vertex] + weight
+            if neighbor not in visited[side] and tent_dist < dist.get(neighbor, float("inf")):
+                dist[neighbor] = tent_dist
+                came_from[side][neighbor] = vertex
+                stats.relaxations += 1
+                inserted = pushes[side](neighbor, tent_dist + signs[side] * potential(neighbor))
+                if inserted:
+                    stats.pushes += 1
+                elif inserted is False:
+                    stats.decrease_keys += 1
+            if neighbor in other and dist[neighbor] + other[neighbor] < best:
+                best = dist[neighbor] + other[neighbor]
+                meeting = neighbor
+
+    expanded = len(visited[0]) + len(visited[1])
+    if meeting is None:
+        return [], best, expanded
+
+    path = [meeting]
+    while came_from[0][path[-1]] is not None:
+        path.append(came_from[0][path[-1]])
+    path.reverse()
+    while came_from[1][path[-1]] is not None:
+        path.append(came_from[1][path[-1]])
+    return path, best, expanded
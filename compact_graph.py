@@ -0,0 +1,229 @@
+"""
+Declaration of the CompactAdjacency Class, a memory-efficient replacement
+for the dict-of-dicts adjacency of Graph
+"""
+
+from array import array
+from bisect import bisect_left
+from itertools import repeat
+
+
+class NeighborView:
+    def __init__(self, adjacency, vertex: int) -> None:
+        """
+        Initialize the NeighborView object, a dict-like view of the
+        outgoing edges of one vertex.
+
+        Args:
+            adjacency: the CompactAdjacency the vertex belongs to
+            vertex: id of the vertex
+        """
+        self.adjacency = adjacency
+        self.vertex = vertex
+
+    def items(self):
+        """
+        Iterate over (title, weight) pairs, like dict.items().
+        """
+        targets = self.adjacency.targets[self.vertex]
+        if targets is None:
+            return iter(())
+        titles = self.adjacency.titles
+        weights = self.adjacency.weights[self.vertex]
+        return zip(map(titles.__getitem__, targets), repeat(1) if weights is None else weights)
+
+    def __setitem__(self, title: str, weight: float):
+        """
+        When called as view[title] = weight
+        """
+        self.adjacency.add_edge_id(self.vertex, self.adjacency.intern(title), weight)
+
+    def __getitem__(self, title: str):
+        """
+        When called as view[title]
+        """
+        target = self.adjacency.ids.get(title)
+        position = None if target is None else self.adjacency.position(self.vertex, target)
+        if position is None:
+            raise KeyError(title)
+        weights = self.adjacency.weights[self.vertex]
+        return 1 if weights is None else weights[position]
+
+    def __iter__(self):
+        """
+        When called in for loop
+        """
+        return (title for title, _ in self.items())
+
+    def __len__(self):
+        """
+        When called in len()
+        """
+        targets = self.adjacency.targets[self.vertex]
+        return 0 if targets is None else len(targets)
+
+
+class CompactAdjacency:
+    def __init__(self, graph_dict: dict = None, weighted: bool = True) -> None:
+        """
+        Initialize the CompactAdjacency object. Titles are interned to integer
+        vertex ids and each vertex keeps its edges in two typed arrays, int32
+        targets and float32 weights, instead of a dict of Python floats.
+        Vertices without outgoing edges store no arrays at all.
+
+        Args:
+            graph_dict: optional dict-of-dicts graph to copy in; Example: {v1: {v2: 1, v3: 2}}
+            weighted: store the weights; without them, every edge weighs 1.
+        """
+        self.weighted = weighted
+        self.ids = {}
+        self.titles = []
+        self.targets = []
+        self.weights = []
+        # Index of the vertex currently receiving edges, so repeated links are updated in O(1)
+        self.open_vertex = None
+        self.open_index = {}
+        # Positions of the edges of a vertex sorted by target, built when an edge is first looked up
+        self.orders = {}
+
+        for vertex, neighbors in (graph_dict or {}).items():
+            self[vertex] = neighbors
+
+    def intern(self, title: str) -> int:
+        """
+        Get the id of a vertex, adding the vertex if needed.
+        """
+        vertex = self.ids.get(title)
+        if vertex is None:
+            # Append before publishing the id, so readers never see a missing vertex
+            self.titles.append(title)
+            self.targets.append(None)
+            self.weights.append(None)
+            vertex = self.ids[title] = len(self.titles) - 1
+        return vertex
+
+    def add_edge(self, v1: str, v2: str, w: float) -> None:
+        """
+        Add an edge from v1 to v2 with weight w, replacing any existing one
+
+        Args:
+            v1: name of vertex 1
+            v2: name of vertex 2
+            w: weight of the edge
+        """
+        self.add_edge_id(self.intern(v1), self.intern(v2), w)
+
+    def add_edge_id(self, source: int, target: int, w: float) -> None:
+        """
+        Add an edge between two vertex ids, replacing any existing one.
+        """
+        if self.open_vertex != source:
+            self.open_vertex = source
+            targets = self.targets[source]
+            self.open_index = {} if targets is None else {t: i for i, t in enumerate(targets)}
+            if targets is None:
+                self.targets[source] = array("i")
+                self.weights[source] = array("f") if self.weighted else None
+
+        position = self.open_index.get(target)
+        if position is None:
+            self.open_index[target] = len(self.targets[source])
+            self.targets[source].append(target)
+            if self.weighted:
+                self.weights[source].append(w)
+            self.orders.pop(source, None)
+        elif self.weighted:
+            self.weights[source][position] = w
+
+    def set_neighbor_ids(self, vertex: int, targets) -> None:
+        """
+        Replace the edges of a vertex with edges to the given vertex ids, in
+        one array; a vertex set to no edges keeps an empty one, unlike a vertex
+        never set. Only for adjacencies without weights.
+        """
+        if self.open_vertex == vertex:
+            self.open_vertex = None
+        self.orders.pop(vertex, None)
+        self.targets[vertex] = array("i", targets)
+
+    def neighbor_ids(self, vertex: int):
+        """
+        Get the ids of the vertices a vertex has edges to, or None if its
+        edges were never set.
+        """
+        return self.targets[vertex]
+
+    def position(self, source: int, target: int):
+        """
+        Get the position of the edge from source to target in the arrays of
+        source, by binary search over the edges sorted by target.
+
+        Returns:
+            The position, or None if there is no such edge.
+        """
+        targets = self.targets[source]
+        if targets is None:
+            return None
+        order = self.orders.get(source)
+        if order is None:
+            order = self.orders[source] = array("i", sorted(range(len(targets)), key=targets.__getitem__))
+        index = bisect_left(order, target, key=targets.__getitem__)
+        if index < len(order) and targets[order[index]] == target:
+            return order[index]
+        return None
+
+    def items(self):
+        """
+        Iterate over (title, neighbors) pairs, like dict.items().
+        """
+        return ((title, NeighborView(self, vertex)) for vertex, title in enumerate(self.titles))
+
+    def copy(self):
+        """
+        Copy into a regular dict-of-dicts graph.
+        """
+        return {title: dict(neighbors.items()) for title, neighbors in self.items()}
+
+    def __getitem__(self, title: str):
+        """
+        When called as adjacency[title]
+        """
+        return NeighborView(self, self.ids[title])
+
+    def __setitem__(self, title: str, neighbors: dict):
+        """
+        When called as adjacency[title] = {neighbor: weight}; replaces the edges of the vertex
+        """
+        vertex = self.intern(title)
+        self.targets[vertex] = None
+        self.weights[vertex] = None
+        self.orders.pop(vertex, None)
+        if self.open_vertex == vertex:
+            self.open_vertex = None
+        for neighbor, weight in neighbors.items():
+            self.add_edge_id(vertex, self.intern(neighbor), weight)
+
+    def __contains__(self, title: str):
+        """
+        When called with `in`
+        """
+        return title in self.ids
+
+    def __iter__(self):
+        """
+        When called in for loop
+        """
+        return iter(self.titles)
+
+    def __len__(self):
+        """
+        When called in len()
+        """
+        return len(self.titles)
+
+    def __str__(self):
+        """
+        When called in print()
+        """
+        return str(self.copy())
+
@@ -0,0 +1,231 @@
+"""
+Background breadth-first crawler that fills the link cache ahead of the
+searches, so searches around the crawled topics rarely wait for Wikipedia.
+Pages are fetched a batch at a time by a Prefetcher, within its concurrency
+and rate limits, and the frontier is checkpointed so a stopped crawl resumes
+where it left off.
+
+Run with:
+    python3 crawler.py --seed "Kevin Bacon" --seed "Albert Einstein" --max-depth 2 --checkpoint crawl.json
+"""
+
+import json
+import os
+import time
+from collections import deque
+
+import click
+import requests
+
+import scraper
+from fetcher import Prefetcher
+
+
+class Crawler:
+    def __init__(self, seeds: list, checkpoint: str = None, max_depth: int = None, max_pages: int = None,
+                 concurrency: int = 8, rate: float = 10.0, batch_size: int = 64, retries: int = 2,
+                 checkpoint_every: int = 1000, verbose: bool = False) -> None:
+        """
+        Initialize the Crawler object. Articles are deduplicated by their
+        canonical title. If the checkpoint file exists, the crawl resumes
+        from it and the seeds are ignored.
+
+        Args:
+            seeds: titles of the articles to crawl outward from
+            checkpoint: JSON file the frontier is saved to, or None to keep it in memory only.
+            max_depth: number of links to follow away from the seeds, or None for no limit.
+            max_pages: number of articles to crawl in this run, or None for no limit.
+            concurrency: maximum number of requests in flight at once.
+            rate: maximum number of requests started per second.
+            batch_size: number of articles fetched together.
+            retries: number of times an article that failed to fetch is queued again.
+            checkpoint_every: number of crawled articles between checkpoints.
+            verbose: print the progress at every checkpoint.
+        """
+        self.checkpoint = checkpoint
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.rate = rate
+        self.batch_size = batch_size
+        self.retries = retries
+        self.checkpoint_every = checkpoint_every
+        self.verbose = verbose
+        self.prefetcher = Prefetcher(width=batch_size, concurrency=concurrency, rate=rate)
+        # (title, depth, attempts) entries; the batch being crawled is kept apart until it is done
+        self.frontier = deque()
+        self.batch = []
+        self.seen = set()
+        self.crawled = 0
+        self.failed = 0
+        if checkpoint is not None and os.path.exists(checkpoint):
+            self.load()
+        else:
+            for seed in seeds:
+                self.enqueue(seed, 0)
+
+    def enqueue(self, title: str, depth: int) -> None:
+        """
+        Queue an article, unless it was queued before under any spelling of
+        its title or any known redirect to it.
+        """
+        key = scraper.canonical_title(title)
+        if self.see(key):
+            self.frontier.append((key, depth, 0))
+
+    def see(self, key: str) -> bool:
+        """
+        Mark a canonical title as seen.
+
+        Returns:
+            True if it was not seen before.
+        """
+        if key in self.seen:
+            return False
+        self.seen.add(key)
+        return True
+
+    def crawl(self) -> int:
+        """
+        Crawl until the frontier is empty or max_pages articles are crawled.
+        The frontier is saved at every checkpoint and when the crawl stops,
+        also on errors and interruptions.
+
+        Returns:
+            The number of articles crawled in this run.
+        """
+        if scraper.link_source is not None:
+            raise RuntimeError("links come from an offline source, there is nothing to crawl")
+        crawled = 0
+        start_time = time.time()
+        try:
+            while self.frontier and (self.max_pages is None or crawled < self.max_pages):
+                size = self.batch_size if self.max_pages is None else min(self.batch_size, self.max_pages - crawled)
+                self.batch = [self.frontier.popleft() for _ in range(min(size, len(self.frontier)))]
+                done = self.crawl_batch()
+                crawled += done
+                if (self.crawled - done) // self.checkpoint_every != self.crawled // self.checkpoint_every:
+                    self.save()
+                    if self.verbose:
+                        print(f"{self.crawled} crawled, {len(self.frontier)} queued, {self.failed} failed, "
+                              f"{crawled / (time.time() - start_time):.1f} articles/s")
+        finally:
+            self.save()
+            self.prefetcher.close()
+        return crawled
+
+    def crawl_batch(self) -> int:
+        """
+        Fetch the articles of the current batch and queue their links.
+
+        Returns:
+            The number of articles crawled.
+        """
+        # Redirects found out about since they were queued are crawled as their
+        # articles, unless those were queued under their own titles
+        batch = []
+        for title, depth, attempts in self.batch:
+            key = scraper.canonical_title(title)
+            if key == title or self.see(key):
+                batch.append((key, depth, attempts))
+        self.batch = batch
+
+        # The API path is synchronous, so only pages are fetched ahead
+        self.prefetcher.prefetch([title for title, _, _ in self.batch])
+        done = 0
+        while self.batch:
+            title, depth, attempts = self.batch[0]
+            links = self.fetch(title)
+            self.batch.pop(0)
+            if links is None:
+                if attempts < self.retries:
+                    self.frontier.append((title, depth, attempts + 1))
+                else:
+                    self.failed += 1
+                continue
+            key = scraper.canonical_title(title)
+            if key != title and not self.see(key):
+                # Found out to be a redirect to an article queued or crawled already
+                continue
+            done += 1
+            self.crawled += 1
+            if self.max_depth is None or depth < self.max_depth:
+                for link in links:
+                    self.enqueue(link, depth + 1)
+        return done
+
+    def fetch(self, title: str):
+        """
+        Get the links of an article from the link cache, where the prefetcher
+        put them. Articles it could not fetch, including error pages such as
+        404 and 5xx responses that are never cached, are left to a later retry
+        rather than fetched again right away, except through the API.
+
+        Returns:
+            The linked titles, or None if the article could not be fetched.
+        """
+        links = scraper.link_cache.get(scraper.canonical_title(title))
+        if links is not None or not scraper.links_from_api:
+            if links is None:
+                # Retried by the prefetcher when the title comes up again
+                self.prefetcher.fetched.discard(title)
+            return links
+        time.sleep(1 / self.rate if self.rate else 0)
+        try:
+            return scraper.get_links(title)
+        except requests.RequestException:
+            return None
+
+    def save(self) -> None:
+        """
+        Write the frontier, the seen titles and the counters to the checkpoint file.
+        """
+        if self.checkpoint is None:
+            return
+        state = {
+            "frontier": self.batch + list(self.frontier),
+            "seen": sorted(self.seen),
+            "crawled": self.crawled,
+            "failed": self.failed,
+        }
+        temporary = self.checkpoint + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(temporary, self.checkpoint)
+
+    def load(self) -> None:
+        """
+        Read the state written by save.
+        """
+        with open(self.checkpoint, encoding="utf-8") as f:
+            state = json.load(f)
+        self.frontier = deque(tuple(entry) for entry in state["frontier"])
+        self.seen = set(state["seen"])
+        self.crawled = state["crawled"]
+        self.failed = state["failed"]
+
+
+# Run with: `python3 crawler.py --seed TITLE --max-depth DEPTH --checkpoint FILE`
+@click.command()
+@click.option('--seed', type=str, multiple=True, help='Title of an article to crawl from; may be repeated')
+@click.option('--seeds-file', type=str, default=None, help='File with one seed title per line')
+@click.option('--checkpoint', type=str, default=None, help='JSON file to save the frontier to and resume from')
+@click.option('--max-depth', type=int, default=None, help='Number of links to follow away from the seeds')
+@click.option('--max-pages', type=int, default=None, help='Number of articles to crawl in this run')
+@click.option('--concurrency', type=int, default=8, help='Number of requests in flight at once')
+@click.option('--rate', type=float, default=10.0, help='Requests started per second')
+@click.option('--verbose', is_flag=True, help='Print the progress at every checkpoint')
+def main(seed, seeds_file, checkpoint, max_depth, max_pages, concurrency, rate, verbose):
+    seeds = list(seed)
+    if seeds_file:
+        with open(seeds_file, encoding="utf-8") as f:
+            seeds += [line.strip() for line in f if line.strip()]
+    crawler = Crawler(seeds, checkpoint, max_depth, max_pages, concurrency, rate, verbose=verbose)
+    try:
+        crawler.crawl()
+    except KeyboardInterrupt:
+        print("Interrupted, the frontier is saved")
+    queued = len(crawler.batch) + len(crawler.frontier)
+    print(f"{crawler.crawled} articles crawled, {queued} queued, {crawler.failed} failed")
+
+if __name__ == "__main__":
+    main()
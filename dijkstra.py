@@ -1,20 +1,48 @@
 from scraper import *
 from graph import Graph
+from fetcher import Prefetcher
+from offline_index import OfflineIndex
+from bidirectional import bidirectional_search
+from multi_target import many_to_one, one_to_many
+from neighbors import GraphProvider, LinkProvider
+from instrumentation import BudgetExceeded, SearchStats
+from priority_queue import VertexQueue
+from snapshot import write_provider_snapshot
 
 import time
 import click
-from collections import defaultdict
-from heapq import heapify, heappop, heappush
 
 class Dijkstra(Graph):
-    def __init__(self, graph_dict: dict) -> None:
+    def __init__(self, graph_dict: dict, prefetcher: Prefetcher = None, provider=None, stats: SearchStats = None, verbose: bool = False) -> None:
+        """
+        Initialize the Dijkstra object
+
+        Args:
+            graph_dict: a fixed graph to search, or an empty dict to search Wikipedia.
+            prefetcher: optional Prefetcher fetching queued articles concurrently.
+            provider: neighbor provider to share with other searches; defaults to one
+                serving graph_dict, or a LinkProvider if graph_dict is empty.
+            stats: SearchStats collecting the counters and hooks of each query.
+            verbose: print every expanded vertex; ignored if stats is given.
+        """
         super().__init__(graph_dict)
         self.path = None
+        self.cost = None
+        self.costs = None
+        self.expanded = 0
+        self.error = None
+        self.prefetcher = prefetcher
+        if provider is None:
+            provider = GraphProvider(graph_dict) if graph_dict else LinkProvider()
+        self.provider = provider
+        self.stats = stats if stats is not None else SearchStats(verbose=verbose)
 
     def find_shortest_path(self, start: str, goal: str) -> list:
         """
         Compute the shortest path from the start node to the goal node using Dijkstra's algorithm.
-        
+        If a budget of the search stats runs out first, an empty list is returned and the
+        reason is stored in self.error.
+
         Args:
             start: The starting vertex (source)
             goal: The target vertex (goal)
@@ -22,46 +50,169 @@ class Dijkstra(Graph):
         Returns:
             path: List of vertices that make up the shortest path, or a dictionary with distances if no path is found.
         """
-        end_vector = model.get_word_vector(goal)
+        # Redirects and variant titles resolve to the article the provider knows them as
+        start, goal = self.provider.canonical(start), self.provider.canonical(goal)
+        neighbors = self.provider.for_goal(goal)
 
         visited = set()  # Keep track of visited nodes
-        distances = defaultdict(lambda: float("inf"), {key: float("inf") for key in self.graph})
-        distances[start] = 0  # Start node has distance 0
+        distances = {start: 0}  # Only nodes reached so far; others are at infinity
 
-        # Priority queue to store (distance, vertex), initially with just the start vertex
-        pq = [(0, start)]
-        heapify(pq)
+        # Priority queue of vertices by distance, initially with just the start vertex;
+        # improving a queued vertex lowers its priority instead of adding a duplicate
+        pq = VertexQueue()
+        pq.push(start, 0)
 
         # Track the path: which node we came from to get to each node
         came_from = {start: None}
         
+        stats = self.stats
         start_time = time.time()
-        while pq:
-            cur_dist, cur_node = heappop(pq)
-            print(cur_node)
-            # If the goal is reached, generate and return the path
-            if cur_node.lower() == goal.lower():
-                print(f"{time.time() - start_time} seconds elapsed")
-                print(f"{len(visited)} articles visited")
-                return self.generate_path(came_from, cur_node)
-
-            if cur_node in visited:
-                continue
-
-            visited.add(cur_node)
-            get_links_and_weights(self, cur_node, end_vector)
-
-            # Process all neighbors of the current node
-            for neighbor, weight in self.graph[cur_node].items():
-                if neighbor not in visited:
-                    # Calculate the tentative distance to this neighbor
-                    tent_dist = cur_dist + weight
-                    if tent_dist < distances[neighbor]:
-                        came_from[neighbor] = cur_node # type: ignore
-                        distances[neighbor] = tent_dist
-                        heappush(pq, (tent_dist, neighbor))
+        self.error = None
+        with stats.run(start=start, goal=goal):
+            pop, push = stats.timed(pq.pop, "heap"), stats.timed(pq.push, "heap")
+            try:
+                while pq:
+                    cur_node, cur_dist = pop()
+                    stats.pops += 1
+                    if stats.sample_every:
+                        stats.sample(len(pq))
+                    visited.add(cur_node)
+                    if stats.hooks:
+                        stats.emit("expand", {"vertex": cur_node, "distance": cur_dist})
+                    # If the goal is reached, generate and return the path
+                    if cur_node.lower() == goal.lower():
+                        if stats.verbose:
+                            print(f"{time.time() - start_time} seconds elapsed")
+                            print(f"{len(visited)} articles visited")
+                        self.cost = cur_dist
+                        self.expanded = len(visited)
+                        return self.generate_path(came_from, cur_node)
+
+                    if self.prefetcher:
+                        self.prefetcher.prefetch_queue(cur_node, pq)
+
+                    # Process all neighbors of the current node, expanding it only now
+                    for neighbor, weight in neighbors.neighbors(cur_node):
+                        if neighbor not in visited:
+                            # Calculate the tentative distance to this neighbor
+                            tent_dist = cur_dist + weight
+                            if tent_dist < distances.get(neighbor, float("inf")):
+                                came_from[neighbor] = cur_node # type: ignore
+                                distances[neighbor] = tent_dist
+                                stats.relaxations += 1
+                                inserted = push(neighbor, tent_dist)
+                                if inserted:
+                                    stats.pushes += 1
+                                elif inserted is False:
+                                    stats.decrease_keys += 1
+            except BudgetExceeded as e:
+                # A budget of the stats (see instrumentation.Budget) ran out before the goal was reached
+                self.error = str(e)
+        self.cost = None
+        self.expanded = len(visited)
         return []
 
+    def find_shortest_path_bidirectional(self, start: str, goal: str) -> list:
+        """
+        Compute the shortest path from the start node to the goal node by searching
+        forward over links from the start and backward over backlinks from the goal.
+        If a budget of the search stats runs out first, an empty list is returned and
+        the reason is stored in self.error.
+
+        Args:
+            start: The starting vertex (source)
+            goal: The target vertex (goal)
+
+        Returns:
+            path: List of vertices that make up the shortest path, or an empty list if no path is found.
+        """
+        start, goal = self.provider.canonical(start), self.provider.canonical(goal)
+        neighbors = self.provider.for_goal(goal)
+
+        start_time = time.time()
+        self.error = None
+        with self.stats.run(start=start, goal=goal):
+            try:
+                # Search again if the path follows a backlink that is not a link
+                while True:
+                    path, cost, expanded = bidirectional_search(start, goal, neighbors.neighbors, neighbors.predecessors, stats=self.stats)
+                    if self.provider.confirm_path(path):
+                        break
+            except BudgetExceeded as e:
+                # A budget of the stats (see instrumentation.Budget) ran out before the searches met
+                path, cost, expanded, self.error = [], None, self.stats.pops, str(e)
+        path = self.provider.canonical_path(path)
+        if self.stats.verbose:
+            print(f"{time.time() - start_time} seconds elapsed")
+            print(f"{expanded} articles visited")
+        self.path = path
+        self.cost = cost if path else None
+        self.expanded = expanded
+        return path
+
+    def find_shortest_paths(self, start: str, goals: list, nearest: bool = False) -> dict:
+        """
+        Compute the shortest paths from the start node to several goal nodes
+        in a single expansion, so pages and link weights are fetched and
+        computed once for all of them. On Wikipedia, the weight of a link is
+        then the distance of the linked article to the nearest goal.
+
+        Args:
+            start: The starting vertex (source)
+            goals: The target vertices
+            nearest: only find the path to the nearest goal
+
+        Returns:
+            paths: Path to each goal, an empty list for goals not reached; the costs are in self.costs.
+        """
+        start = self.provider.canonical(start)
+        resolved = {goal: self.provider.canonical(goal) for goal in goals}
+        targets = list(dict.fromkeys(resolved.values()))
+        neighbors = self.provider.for_goals(targets)
+
+        start_time = time.time()
+        with self.stats.run(start=start, goal=targets):
+            paths, costs, expanded = one_to_many(start, targets, neighbors.neighbors, nearest=nearest, stats=self.stats)
+        if self.stats.verbose:
+            print(f"{time.time() - start_time} seconds elapsed")
+            print(f"{expanded} articles visited")
+        self.costs = {goal: costs[target] for goal, target in resolved.items()}
+        self.expanded = expanded
+        return {goal: self.provider.canonical_path(paths[target]) for goal, target in resolved.items()}
+
+    def find_shortest_paths_to(self, starts: list, goal: str) -> dict:
+        """
+        Compute the shortest paths from several start nodes to the goal node
+        in a single expansion backward over backlinks from the goal, searching
+        again until every path found only follows links.
+
+        Args:
+            starts: The starting vertices
+            goal: The target vertex (goal)
+
+        Returns:
+            paths: Path from each start, an empty list for starts not reached; the costs are in self.costs.
+        """
+        goal = self.provider.canonical(goal)
+        resolved = {start: self.provider.canonical(start) for start in starts}
+        sources = list(dict.fromkeys(resolved.values()))
+        neighbors = self.provider.for_goal(goal)
+
+        start_time = time.time()
+        with self.stats.run(start=sources, goal=goal):
+            # Search again if a path follows a backlink that is not a link; every path is
+            # checked, so the wrong backlinks of all of them are dropped at once
+            while True:
+                paths, costs, expanded = many_to_one(sources, goal, neighbors.predecessors, stats=self.stats)
+                if all([self.provider.confirm_path(path) for path in paths.values()]):
+                    break
+        if self.stats.verbose:
+            print(f"{time.time() - start_time} seconds elapsed")
+            print(f"{expanded} articles visited")
+        self.costs = {start: costs[source] for start, source in resolved.items()}
+        self.expanded = expanded
+        return {start: self.provider.canonical_path(paths[source]) for start, source in resolved.items()}
+
     def generate_path(self, came_from: dict, curr_node: str):
         """
         Generate the path from start to goal after running Dijkstra's algorithm.
@@ -79,17 +230,52 @@ class Dijkstra(Graph):
             path.append(curr_node)
 
         path.reverse()  # Reverse the path to get it from start to goal
+        # Redirects found out about while searching are not steps of the path
+        path = self.provider.canonical_path(path)
         self.path = path
         return path
 
 
 # Run main function with: `python3 dijkstra.py --start "START" --end "END"`
 @click.command()
-@click.option('--start', type=str, help='Name of starting page')
-@click.option('--end', type=str, help='Name of goal page')
-def main(start,end):
-    dijk_dynamic = Dijkstra({})
-    result = dijk_dynamic.find_shortest_path(start=start, goal=end)
+@click.option('--start', type=str, multiple=True, help='Name of starting page; repeat to find paths from several pages at once')
+@click.option('--end', type=str, multiple=True, help='Name of goal page; repeat to find paths to several pages at once')
+@click.option('--nearest', is_flag=True, help='With several goal pages, only find the path to the nearest one')
+@click.option('--prefetch', type=int, default=0, help='Number of queued pages to fetch concurrently (0 to disable)')
+@click.option('--index', type=str, default=None, help='Directory of an offline link index to search instead of scraping')
+@click.option('--bidirectional', is_flag=True, help='Also search backward from the goal over backlinks')
+@click.option('--verbose', is_flag=True, help='Print every expanded page')
+@click.option('--timing', is_flag=True, help='Also time the heap operations')
+@click.option('--save-graph', type=str, default=None, help='Write the links fetched by the search to this graph snapshot')
+def main(start, end, nearest, prefetch, index, bidirectional, verbose, timing, save_graph):
+    if not start or not end:
+        raise click.UsageError("give at least one --start and one --end")
+    if len(start) > 1 and len(end) > 1:
+        raise click.UsageError("give several starting pages or several goal pages, not both")
+    if len(start) > 1 and nearest:
+        raise click.UsageError("--nearest picks among several goal pages, from a single starting page")
+    if bidirectional and (len(start) > 1 or len(end) > 1 or nearest):
+        raise click.UsageError("--bidirectional searches from a single starting page to a single goal page")
+    if prefetch and (bidirectional or len(start) > 1 or len(end) > 1 or nearest):
+        raise click.UsageError("--prefetch only applies to the forward search from a single starting page to a single goal page")
+    if index:
+        use_link_source(OfflineIndex(index))
+    prefetcher = Prefetcher(width=prefetch, concurrency=prefetch) if prefetch else None
+    dijk_dynamic = Dijkstra({}, prefetcher=prefetcher, stats=SearchStats(timing=timing, verbose=verbose))
+    if len(end) > 1 or nearest:
+        result = dijk_dynamic.find_shortest_paths(start[0], list(end), nearest)
+    elif len(start) > 1:
+        result = dijk_dynamic.find_shortest_paths_to(list(start), end[0])
+    elif bidirectional:
+        result = dijk_dynamic.find_shortest_path_bidirectional(start=start[0], goal=end[0])
+    else:
+        result = dijk_dynamic.find_shortest_path(start=start[0], goal=end[0])
+    if prefetcher:
+        prefetcher.close()
+    heuristic_cache.save()
+    if save_graph:
+        write_provider_snapshot(save_graph, dijk_dynamic.provider)
+    print(dijk_dynamic.stats.as_dict())
     print(result)
 
 if __name__ == "__main__":
@@ -0,0 +1,135 @@
+"""
+Embedding store: title vectors precomputed into a memory-mapped matrix,
+with the fastText model loaded lazily only for titles that are not in it.
+
+Precompute with:
+    python3 embeddings.py --titles titles.txt --out embeddings/
+    python3 embeddings.py --index index/ --out embeddings/
+"""
+
+import os
+
+import click
+import numpy as np
+
+from offline_index import OfflineIndex, TitleTable, write_title_table
+
+MODEL_PATH = "cc.en.300.bin"
+
+
+def load_fasttext(path: str = MODEL_PATH):
+    """
+    Load the fastText model, downloading it first if needed.
+    """
+    import fasttext
+    import fasttext.util
+
+    if path == MODEL_PATH:
+        fasttext.util.download_model('en', if_exists='ignore')
+    print("Loading word embeddings")
+    model = fasttext.load_model(path)
+    print("Done loading word embeddings")
+    return model
+
+
+class EmbeddingStore:
+    def __init__(self, directory: str = None, model_path: str = MODEL_PATH) -> None:
+        """
+        Initialize the EmbeddingStore object. The precomputed vectors are
+        memory mapped, so startup is immediate and processes using the same
+        store share the vectors through the page cache.
+
+        Args:
+            directory: directory written by precompute, or None to always use fastText.
+            model_path: fastText model used for titles missing from the store.
+        """
+        self.model_path = model_path
+        self.model = None
+        self.table = None
+        self.vectors = None
+        if directory is not None:
+            self.table = TitleTable(directory)
+            self.vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+
+    def get_word_vector(self, title: str):
+        """
+        Get the embedding of a title, with the same interface as a fastText model.
+
+        Args:
+            title: title of the article
+
+        Returns:
+            A float32 vector.
+        """
+        row = self.table.id(title) if self.table is not None else None
+        if row is not None:
+            return self.vectors[row].astype(np.float32)
+        if self.model is None:
+            self.model = load_fasttext(self.model_path)
+        return self.model.get_word_vector(title)
+
+    def get_word_vectors(self, titles: list):
+        """
+        Get the embeddings of several titles as one matrix.
+
+        Args:
+            titles: titles of the articles
+
+        Returns:
+            A float32 matrix with one row per title.
+        """
+        if self.table is None:
+            return np.stack([self.get_word_vector(title) for title in titles])
+
+        rows = [self.table.id(title) for title in titles]
+        matrix = np.empty((len(titles), self.vectors.shape[1]), dtype=np.float32)
+        found = [i for i, row in enumerate(rows) if row is not None]
+        if found:
+            # One gather from the memory-mapped matrix for every stored title
+            matrix[found] = self.vectors[[rows[i] for i in found]]
+        for i, row in enumerate(rows):
+            if row is None:
+                matrix[i] = self.get_word_vector(titles[i])
+        return matrix
+
+
+def precompute(titles: list, directory: str, model_path: str = MODEL_PATH, dtype: str = "float16") -> None:
+    """
+    Compute the embeddings of the given titles and write them as a store.
+
+    Args:
+        titles: titles to embed
+        directory: directory to write the store to
+        model_path: fastText model to embed with
+        dtype: float16 halves the size of the store, float32 keeps full precision
+    """
+    os.makedirs(directory, exist_ok=True)
+    model = load_fasttext(model_path)
+    vectors = np.lib.format.open_memmap(
+        os.path.join(directory, "vectors.npy"), mode="w+", dtype=dtype,
+        shape=(len(titles), model.get_dimension()),
+    )
+    for row, title in enumerate(titles):
+        vectors[row] = model.get_word_vector(title)
+    vectors.flush()
+    write_title_table(directory, titles)
+
+
+# Run with: `python3 embeddings.py --titles TITLES_FILE --out DIR`
+@click.command()
+@click.option('--titles', type=str, help='File with one article title per line')
+@click.option('--index', type=str, help='Offline link index whose titles to embed, instead of --titles')
+@click.option('--out', type=str, help='Directory to write the store to')
+@click.option('--dtype', type=click.Choice(['float16', 'float32']), default='float16', help='Precision of the stored vectors')
+def main(titles, index, out, dtype):
+    if index:
+        offline_index = OfflineIndex(index)
+        title_list = [offline_index.title(node) for node in range(len(offline_index))]
+    else:
+        with open(titles, encoding="utf-8") as f:
+            title_list = list(dict.fromkeys(line.rstrip("\n") for line in f if line.strip()))
+    precompute(title_list, out, dtype=dtype)
+    print(f"{len(title_list)} titles embedded")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Concurrent prefetching of article links over a pooled HTTP client
+"""
+
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+import instrumentation
+import scraper
+
+
+class RateLimiter:
+    def __init__(self, rate: float) -> None:
+        """
+        Initialize the RateLimiter object
+
+        Args:
+            rate: maximum number of requests started per second; 0 disables the limit.
+        """
+        self.interval = 1 / rate if rate else 0
+        self.next_time = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        """
+        Sleep until the next request is allowed to start.
+        """
+        async with self.lock:
+            now = time.monotonic()
+            if self.next_time > now:
+                await asyncio.sleep(self.next_time - now)
+                now = self.next_time
+            self.next_time = now + self.interval
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hold off every request for a number of seconds, e.g. when the server asks to slow down.
+        """
+        self.next_time = max(self.next_time, time.monotonic() + seconds)
+
+
+class Prefetcher:
+    def __init__(self, width: int = 8, concurrency: int = 8, rate: float = 20.0, base_url: str = None) -> None:
+        """
+        Initialize the Prefetcher object
+
+        Args:
+            width: number of queued articles fetched together when the search needs an uncached one.
+            concurrency: maximum number of requests in flight at once.
+            rate: maximum number of requests started per second against each host.
+            base_url: site to fetch from; defaults to scraper.WIKI_URL, point it at a stub server for testing.
+        """
+        self.width = width
+        self.concurrency = concurrency
+        self.rate = rate
+        self.base_url = base_url
+        self.fetched = set()
+        self.loop = asyncio.new_event_loop()
+        self.session = None
+        self.semaphore = None
+        self.limiters = {}
+
+    def prefetch(self, titles: list) -> None:
+        """
+        Fetch the links of the given articles concurrently and store them in
+        the link cache, so the search finds them there when it pops them.
+        Articles already fetched or cached are skipped.
+
+        Args:
+            titles: titles of the articles, most urgent first
+        """
+        if scraper.link_source is not None or scraper.links_from_api:
+            return
+        todo = []
+        for title in titles:
+            if title not in self.fetched and title not in todo:
+                self.fetched.add(title)
+                if scraper.canonical_title(title) not in scraper.link_cache:
+                    todo.append(title)
+        if todo:
+            # Parsing happens on the event loop too, so parse time is also part of http here
+            with instrumentation.phase("http"):
+                self.loop.run_until_complete(self._fetch_all(todo))
+
+    def prefetch_queue(self, node: str, queue) -> None:
+        """
+        Called by the searches right before expanding a node. If the node is
+        not cached yet, fetch it together with the next best entries of the
+        priority queue; the queue itself is never reordered, and only looked
+        at when there is something to fetch.
+
+        Args:
+            node: title of the node about to be expanded
+            queue: the search's VertexQueue, without the node; its entries are never expanded yet.
+        """
+        if node in self.fetched or scraper.link_source is not None or scraper.links_from_api:
+            return
+        if scraper.canonical_title(node) in scraper.link_cache:
+            self.fetched.add(node)
+            return
+        self.prefetch([node] + queue.first(self.width - 1))
+
+    def close(self) -> None:
+        """
+        Close the HTTP session and the event loop.
+        """
+        if self.session is not None:
+            self.loop.run_until_complete(self.session.close())
+        self.loop.close()
+
+    async def _fetch_all(self, titles: list) -> None:
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+            timeout = aiohttp.ClientTimeout(total=scraper.REQUEST_TIMEOUT)
+            self.session = aiohttp.ClientSession(connector=connector, headers=scraper.HEADERS, timeout=timeout)
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+        await asyncio.gather(*(self._fetch(title) for title in titles))
+
+    async def _fetch(self, title: str) -> None:
+        url = (self.base_url or scraper.WIKI_URL) + "/wiki/" + title.replace(" ", "_")
+        host = urlsplit(url).netloc
+        if host not in self.limiters:
+            self.limiters[host] = RateLimiter(self.rate)
+
+        async with self.semaphore:
+            await self.limiters[host].wait()
+            try:
+                async with self.session.get(url) as response:
+                    if response.status in (429, 503):
+                        # Told to slow down: back off this host and leave the article unfetched
+                        retry_after = response.headers.get("Retry-After", "")
+                        self.limiters[host].pause(float(retry_after) if retry_after.isdigit() else 5.0)
+                    if response.status != 200:
+                        # Error pages are not articles without links; never cache them
+                        self.fetched.discard(title)
+                        return
+                    html = await response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                # Leave it to the synchronous path to retry and report
+                self.fetched.discard(title)
+                return
+        instrumentation.count("pages_fetched")
+        scraper.store_page(title, html)
@@ -2,6 +2,8 @@
 Declaration of the Graph Class
 """
 
+from collections import deque
+
 import networkx as nx
 from matplotlib import pyplot as plt
 import numpy as np
@@ -38,9 +40,20 @@ class Graph:
         self.graph[v1][v2] = w
 
 
-    def visualize(self):
+    def visualize(self, seeds: list = None, max_vertices: int = None):
+        """
+        Draw the graph, or only the part of it around some seed vertices,
+        since drawing a crawled graph in full is neither fast nor readable.
+
+        Args:
+            seeds: vertices the drawn part is grown from; defaults to the first vertex.
+            max_vertices: number of vertices drawn, or None to draw the whole graph.
+        """
+        graph = self.graph
+        if max_vertices is not None:
+            graph = sample_subgraph(graph, seeds, max_vertices)
         G = nx.Graph()
-        for vertex, neighbors in self.graph.items():
+        for vertex, neighbors in graph.items():
             for neighbor, weight in neighbors.items():
                 G.add_edge(vertex, neighbor, weight=weight)
         pos = nx.spring_layout(G)
@@ -76,6 +89,42 @@ class Graph:
         """
         return len(self.graph)
 
+def sample_subgraph(graph_dict, seeds: list = None, max_vertices: int = 200) -> dict:
+    """
+    Get the subgraph induced by the first max_vertices vertices reached by a
+    breadth-first search from the seeds. Only the edges of the sampled
+    vertices are read, so this works on large lazily loaded graphs too.
+
+    Args:
+        graph_dict: any dict-of-dicts graph, such as a GraphSnapshot
+        seeds: vertices to start from; defaults to the first vertex of the graph.
+        max_vertices: maximum number of vertices kept
+
+    Returns:
+        The subgraph as a dict-of-dicts.
+    """
+    if seeds is None:
+        seeds = [next(iter(graph_dict), None)]
+    seeds = [seed for seed in seeds if seed in graph_dict]
+    sampled = dict.fromkeys(seeds[:max_vertices])
+    queue = deque(sampled)
+    edges = {}
+    while queue:
+        vertex = queue.popleft()
+        edges[vertex] = dict(graph_dict[vertex].items())
+        for neighbor in edges[vertex]:
+            if len(sampled) >= max_vertices:
+                break
+            if neighbor not in sampled:
+                sampled[neighbor] = None
+                if neighbor in graph_dict:
+                    queue.append(neighbor)
+    return {
+        vertex: {neighbor: weight for neighbor, weight in edges.get(vertex, {}).items() if neighbor in sampled}
+        for vertex in sampled
+    }
+
+
 TEST_GRAPH = {
                 "Node0": {"Node9": 7.7, "Node47": 7.7, "Node4": 7.1, "Node19": 6.0, "Node35": 1.8},
                 "Node1": {"Node17": 9.2, "Node9": 7.9, "Node32": 6.9},
@@ -0,0 +1,248 @@
+"""
+Shared, size-bounded cache of the A* heuristic (the cosine distance between
+an article title and the goal), optionally saved across runs
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import instrumentation
+
+
+class HeuristicCache:
+    def __init__(self, model, path: str = None, max_entries: int = 1000000, max_goals: int = 256) -> None:
+        """
+        Initialize the HeuristicCache object. Titles are interned to integer
+        ids and each entry is keyed by (goal id, title id) packed into one
+        int, in least recently used order. An id is freed for reuse once no
+        entry refers to it, so memory stays bounded by max_entries. Each
+        goal's vector is normalized once, so a missing heuristic costs one
+        dot product.
+
+        Args:
+            model: embeddings with get_word_vector and get_word_vectors, such as an EmbeddingStore.
+            path: .npz file the cache is loaded from and saved to, or None to keep it in memory only.
+            max_entries: maximum number of heuristics kept; the least recently used ones are evicted first.
+            max_goals: maximum number of normalized goal vectors kept.
+        """
+        self.model = model
+        self.path = path
+        self.max_entries = max_entries
+        self.max_goals = max_goals
+        self.ids = {}
+        self.titles = []
+        # Number of entries referring to each id, and the ids no entry refers to anymore
+        self.refs = []
+        self.free = []
+        self.entries = OrderedDict()
+        self.goals = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def get(self, title: str, goal: str) -> float:
+        """
+        Get the heuristic of one article towards a goal.
+        """
+        return self.get_many([title], goal)[0]
+
+    def get_many(self, titles: list, goal: str) -> list:
+        """
+        Get the heuristics of several articles towards a goal, computing the
+        missing ones in one batch.
+
+        Args:
+            titles: titles of the articles
+            goal: title of the goal article
+
+        Returns:
+            One heuristic per title: cosine distance to the goal plus 1e-5.
+        """
+        goal_vector = self.goal_vector(goal)
+        with self.lock:
+            goal_key = self.intern(goal) << 32
+            keys = [goal_key | self.intern(title) for title in titles]
+            values = [self.entries.get(key) for key in keys]
+            missing = [i for i, value in enumerate(values) if value is None]
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+            for key, value in zip(keys, values):
+                if value is not None:
+                    self.entries.move_to_end(key)
+
+        if missing:
+            # Embedding lookups may load fastText, so they run outside the lock
+            computed = self.compute([titles[i] for i in missing], goal_vector)
+            with self.lock:
+                # Interned again, since ids evicted meanwhile may have been reused
+                goal_key = self.intern(goal) << 32
+                for i, value in zip(missing, computed):
+                    values[i] = value
+                    self.insert(goal_key | self.intern(titles[i]), value)
+                self.evict()
+        return values
+
+    def get_nearest(self, titles: list, goals: list) -> list:
+        """
+        Get the heuristics of several articles towards the nearest of several
+        goals. Titles missing for some goal are embedded once for all goals.
+
+        Args:
+            titles: titles of the articles
+            goals: titles of the goal articles
+
+        Returns:
+            One heuristic per title: the smallest cosine distance to a goal plus 1e-5.
+        """
+        if len(goals) == 1:
+            return self.get_many(titles, goals[0])
+        goal_vectors = [self.goal_vector(goal) for goal in goals]
+        with self.lock:
+            title_keys = [self.intern(title) for title in titles]
+            goal_keys = [self.intern(goal) << 32 for goal in goals]
+            values = [[self.entries.get(goal_key | key) for key in title_keys] for goal_key in goal_keys]
+            missing = [i for i in range(len(titles)) if any(row[i] is None for row in values)]
+            self.misses += len(missing) * len(goals)
+            self.hits += (len(titles) - len(missing)) * len(goals)
+
+        if missing:
+            with instrumentation.phase("embed"):
+                vectors = self.model.get_word_vectors([titles[i] for i in missing])
+            with self.lock:
+                # Interned again, since ids evicted meanwhile may have been reused
+                title_keys = {i: self.intern(titles[i]) for i in missing}
+                for goal, goal_vector, row in zip(goals, goal_vectors, values):
+                    goal_key = self.intern(goal) << 32
+                    for i, value in zip(missing, self.weigh(vectors, goal_vector)):
+                        row[i] = value
+                        self.insert(goal_key | title_keys[i], value)
+                self.evict()
+        return [min(column) for column in zip(*values)]
+
+    def goal_vector(self, goal: str):
+        """
+        Get the normalized embedding of a goal, computing it only the first time.
+        """
+        with self.lock:
+            vector = self.goals.get(goal)
+            if vector is not None:
+                self.goals.move_to_end(goal)
+                return vector
+
+        with instrumentation.phase("embed"):
+            vector = self.model.get_word_vector(goal).astype(np.float32)
+        norm = np.linalg.norm(vector)
+        # A zero vector is unrelated to everything rather than producing NaN
+        vector = vector / norm if norm > 0 else np.zeros_like(vector)
+        with self.lock:
+            self.goals[goal] = vector
+            if len(self.goals) > self.max_goals:
+                self.goals.popitem(last=False)
+        return vector
+
+    def compute(self, titles: list, goal_vector) -> list:
+        """
+        Compute the heuristics of articles towards a normalized goal vector,
+        without touching the cache. Equal to scraper.weigh_links.
+        """
+        with instrumentation.phase("embed"):
+            return self.weigh(self.model.get_word_vectors(titles), goal_vector)
+
+    def weigh(self, vectors, goal_vector) -> list:
+        """
+        Compute the heuristics of embedding vectors towards a normalized goal vector.
+        """
+        norms = np.linalg.norm(vectors, axis=1)
+        dots = vectors @ goal_vector
+        similarity = np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+        return ((1 - similarity) + 1e-5).tolist()
+
+    def intern(self, title: str) -> int:
+        """
+        Get the id of a title, adding it if needed, under a freed id if there is one.
+        """
+        node = self.ids.get(title)
+        if node is None:
+            if self.free:
+                node = self.free.pop()
+                self.titles[node] = title
+            else:
+                node = len(self.titles)
+                self.titles.append(title)
+                self.refs.append(0)
+            self.ids[title] = node
+        return node
+
+    def insert(self, key: int, value: float) -> None:
+        """
+        Store a heuristic under a packed (goal id, title id) key.
+        """
+        if key not in self.entries:
+            self.refs[key >> 32] += 1
+            self.refs[key & 0xFFFFFFFF] += 1
+        self.entries[key] = value
+
+    def evict(self) -> None:
+        """
+        Drop the least recently used heuristics beyond max_entries, and the
+        titles no remaining heuristic refers to.
+        """
+        while len(self.entries) > self.max_entries:
+            key, _ = self.entries.popitem(last=False)
+            self.evictions += 1
+            for node in (key >> 32, key & 0xFFFFFFFF):
+                self.refs[node] -= 1
+                if self.refs[node] == 0:
+                    del self.ids[self.titles[node]]
+                    self.titles[node] = None
+                    self.free.append(node)
+
+    def save(self) -> None:
+        """
+        Write the cache to its path, least recently used entries first. Only
+        titles still referenced by an entry are written.
+        """
+        if self.path is None:
+            return
+        # Titles are read along with the keys, since evicted ids are reused
+        with self.lock:
+            keys = np.fromiter(self.entries.keys(), dtype=np.int64, count=len(self.entries))
+            values = np.fromiter(self.entries.values(), dtype=np.float32, count=len(self.entries))
+            used, inverse = np.unique(np.concatenate([keys >> 32, keys & 0xFFFFFFFF]), return_inverse=True)
+            used_titles = [self.titles[node] for node in used.tolist()]
+        goals, titles = np.split(inverse.astype(np.int64), 2)
+        temporary = self.path + ".tmp"
+        with open(temporary, "wb") as f:
+            np.savez(
+                f,
+                titles=np.array(used_titles, dtype=object),
+                keys=(goals << 32) | titles,
+                values=values,
+            )
+        os.replace(temporary, self.path)
+
+    def load(self) -> None:
+        """
+        Read the cache written by save, keeping the most recently used entries.
+        """
+        with np.load(self.path, allow_pickle=True) as data:
+            titles = data["titles"].tolist()
+            keys = data["keys"].tolist()
+            values = data["values"].tolist()
+        with self.lock:
+            remap = [self.intern(title) for title in titles]
+            for key, value in zip(keys, values):
+                self.insert(remap[key >> 32] << 32 | remap[key & 0xFFFFFFFF], value)
+            self.evict()
+
+    def __len__(self):
+        """
+        When called in len()
+        """
+        return len(self.entries)
@@ -0,0 +1,183 @@
+"""
+Instrumentation of the searches: counters, time spent per phase, frontier
+size samples and hooks to attach a profiler or metrics exporter.
+
+A search resets its SearchStats at the start of each query and makes it the
+current one, so the scraper and caches can attribute page fetches and time
+to the query without it being passed around. Everything beyond incrementing
+a few counters is opt-in.
+"""
+
+import contextlib
+import contextvars
+import time
+
+COUNTERS = ["pops", "pushes", "decrease_keys", "relaxations", "pages_fetched", "cache_hits", "backlinks_truncated"]
+PHASES = ["http", "parse", "embed", "heap"]
+
+# Stats of the query running in this thread or task, if any
+current = contextvars.ContextVar("search_stats", default=None)
+
+
+class SearchStats:
+    def __init__(self, hooks: list = None, sample_every: int = 0, timing: bool = False, verbose: bool = False) -> None:
+        """
+        Initialize the SearchStats object
+
+        Args:
+            hooks: functions called as hook(event, stats, data) on "start", "expand" and
+                "finish" events; "expand" fires once per expanded vertex.
+            sample_every: record the frontier size every this many pops; 0 disables sampling.
+            timing: also time the heap operations, which costs a clock read per push and pop.
+                The other phases are timed per page, so always.
+            verbose: print every expanded vertex, and the time taken and number of
+                vertices expanded by each query.
+        """
+        self.hooks = list(hooks or [])
+        self.verbose = verbose
+        if verbose:
+            self.hooks.append(print_expansions)
+        self.sample_every = sample_every
+        self.timing = timing
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Clear the counters, timers and samples before a new query.
+        """
+        for counter in COUNTERS:
+            setattr(self, counter, 0)
+        self.timers = dict.fromkeys(PHASES, 0.0)
+        self.frontier = []
+        self.elapsed = 0.0
+
+    @contextlib.contextmanager
+    def run(self, **data):
+        """
+        Reset the stats and make them the current ones for the duration of a
+        query, firing the "start" and "finish" hooks around it.
+        """
+        self.reset()
+        token = current.set(self)
+        self.emit("start", data)
+        start_time = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.elapsed = time.perf_counter() - start_time
+            current.reset(token)
+            self.emit("finish", data)
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """
+        Add the time spent in the block to a phase.
+        """
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[name] += time.perf_counter() - start_time
+
+    def timed(self, function, name: str):
+        """
+        Wrap a function so the time spent in it is added to a phase, if timing
+        is enabled; otherwise return it unchanged.
+        """
+        if not self.timing:
+            return function
+
+        def wrapper(*args):
+            start_time = time.perf_counter()
+            result = function(*args)
+            self.timers[name] += time.perf_counter() - start_time
+            return result
+        return wrapper
+
+    def sample(self, size: int) -> None:
+        """
+        Record the frontier size if a sample is due. Called once per pop.
+        """
+        if self.sample_every and self.pops % self.sample_every == 0:
+            self.frontier.append((self.pops, size))
+
+    def emit(self, event: str, data: dict) -> None:
+        """
+        Call the hooks with an event.
+        """
+        for hook in self.hooks:
+            hook(event, self, data)
+
+    def as_dict(self) -> dict:
+        """
+        Get the counters, timers and samples as a JSON serializable dictionary.
+        """
+        stats = {counter: getattr(self, counter) for counter in COUNTERS}
+        stats["timers"] = dict(self.timers)
+        stats["elapsed"] = self.elapsed
+        if self.sample_every:
+            stats["frontier"] = list(self.frontier)
+        return stats
+
+
+class BudgetExceeded(Exception):
+    """
+    Raised by a Budget hook to stop a search.
+    """
+
+
+class Budget:
+    def __init__(self, max_nodes: int = None, timeout: float = None) -> None:
+        """
+        Initialize the Budget object, a hook that stops a search with
+        BudgetExceeded once it has expanded too many vertices or run too long.
+
+        Args:
+            max_nodes: maximum number of "expand" events, or None for no limit.
+            timeout: maximum number of seconds per query, or None for no limit.
+        """
+        self.max_nodes = max_nodes
+        self.timeout = timeout
+        self.expanded = 0
+        self.deadline = None
+
+    def __call__(self, event: str, stats: SearchStats, data: dict) -> None:
+        """
+        When called as a hook
+        """
+        if event == "start":
+            self.expanded = 0
+            self.deadline = time.monotonic() + self.timeout if self.timeout is not None else None
+        elif event == "expand":
+            self.expanded += 1
+            if self.max_nodes is not None and self.expanded > self.max_nodes:
+                raise BudgetExceeded(f"node budget of {self.max_nodes} exceeded")
+            if self.deadline is not None and time.monotonic() > self.deadline:
+                raise BudgetExceeded(f"timeout of {self.timeout} seconds exceeded")
+
+
+def print_expansions(event: str, stats: SearchStats, data: dict) -> None:
+    """
+    Hook printing every expanded vertex, as the searches used to.
+    """
+    if event == "expand":
+        print(data["vertex"])
+
+
+def count(counter: str, amount: int = 1) -> None:
+    """
+    Increase a counter of the current query, if any.
+    """
+    stats = current.get()
+    if stats is not None:
+        setattr(stats, counter, getattr(stats, counter) + amount)
+
+
+def phase(name: str):
+    """
+    Time a block as a phase of the current query, if any.
+    """
+    stats = current.get()
+    if stats is None:
+        return contextlib.nullcontext()
+    return stats.phase(name)
@@ -0,0 +1,225 @@
+"""
+Landmark (ALT) heuristic for graphs whose edge weights do not depend on the
+goal: hop counts over an offline index, or a fixed weighted graph such as
+TEST_GRAPH. The shortest distances from and to k landmark vertices are
+computed once and memory mapped; by the triangle inequality they bound the
+distance between any two vertices from below, so the heuristic is
+admissible and consistent and costs O(k) per vertex.
+
+The link weights of the Wikipedia searches are cosine distances to the goal,
+which change with every goal, so landmarks cannot be precomputed for them.
+
+Run with:
+    python3 landmarks.py --index index/ --count 16 --out landmarks/
+"""
+
+import os
+
+import click
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from offline_index import OfflineIndex
+
+
+def index_matrices(index) -> tuple:
+    """
+    Get the forward and reverse adjacency matrices of an OfflineIndex, sharing
+    its memory mapped CSR arrays. Every link has weight 1, so distances are
+    hop counts.
+
+    Returns:
+        The (forward, backward) pair of scipy CSR matrices.
+    """
+    size = len(index)
+    forward = csr_matrix(
+        (np.ones(len(index.targets), dtype=np.float32), index.targets, index.offsets), shape=(size, size)
+    )
+    backward = csr_matrix(
+        (np.ones(len(index.in_sources), dtype=np.float32), index.in_sources, index.in_offsets), shape=(size, size)
+    )
+    return forward, backward
+
+
+def graph_matrices(graph_dict) -> tuple:
+    """
+    Get the forward and reverse adjacency matrices of a dict-of-dicts graph.
+
+    Args:
+        graph_dict: the graph; Example: {v1: {v2: 1, v3: 2}}
+
+    Returns:
+        The (forward, backward) pair of scipy CSR matrices, and the list of
+        vertices in the order of their ids.
+    """
+    vertices = list(dict.fromkeys(
+        [vertex for vertex in graph_dict] + [target for neighbors in graph_dict.values() for target in neighbors]
+    ))
+    ids = {vertex: node for node, vertex in enumerate(vertices)}
+    sources, targets, weights = [], [], []
+    for source, neighbors in graph_dict.items():
+        for target, weight in neighbors.items():
+            sources.append(ids[source])
+            targets.append(ids[target])
+            weights.append(weight)
+    size = len(vertices)
+    forward = csr_matrix((np.array(weights, dtype=np.float32), (sources, targets)), shape=(size, size))
+    return forward, forward.T.tocsr(), vertices
+
+
+def build_landmarks(forward, backward, directory: str, count: int = 16, unweighted: bool = False) -> list:
+    """
+    Pick landmarks and write their distances. Landmarks are picked farthest
+    first: the first is the vertex farthest from the vertex with the most
+    links, and each next one maximizes its round-trip distance to the
+    closest landmark picked so far, so they end up on the edges of the
+    graph, where their bounds are tightest. Once every vertex left is out of
+    round-trip reach of all landmarks, such as in another component, the
+    next one is its best linked vertex instead. Each landmark takes one
+    Dijkstra pass over the whole graph in each direction.
+
+    Args:
+        forward: CSR matrix of the edge weights
+        backward: its transpose, as a CSR matrix
+        directory: directory to write the landmarks to
+        count: number of landmarks
+        unweighted: whether all edges weigh 1; hop counts are then stored as
+            float16, which is exact up to 2048 hops.
+
+    Returns:
+        The ids of the landmarks, all distinct.
+    """
+    size = forward.shape[0]
+    count = min(count, size)
+    dtype = np.float16 if unweighted else np.float32
+    os.makedirs(directory, exist_ok=True)
+    # One row per vertex, so the distances of a vertex are contiguous
+    from_landmarks = np.lib.format.open_memmap(
+        os.path.join(directory, "from_landmarks.npy"), mode="w+", dtype=dtype, shape=(size, count)
+    )
+    to_landmarks = np.lib.format.open_memmap(
+        os.path.join(directory, "to_landmarks.npy"), mode="w+", dtype=dtype, shape=(size, count)
+    )
+
+    degrees = np.diff(forward.indptr) + np.diff(backward.indptr)
+    seed = int(np.argmax(degrees))
+    distances = dijkstra(forward, indices=seed, unweighted=unweighted)
+    # Round-trip distance of every vertex to its closest landmark, infinite if none is in reach
+    closest = np.full(size, np.inf)
+    picked = np.zeros(size, dtype=bool)
+    # The same, but -1 for vertices picked or out of reach, which are never the farthest
+    spread = np.where(np.isfinite(distances), distances, -1.0)
+    landmarks = []
+    for i in range(count):
+        if spread.max() < 0:
+            landmark = int(np.argmax(np.where(picked, -1, degrees)))
+        else:
+            landmark = int(np.argmax(spread))
+        landmarks.append(landmark)
+        picked[landmark] = True
+        outgoing = dijkstra(forward, indices=landmark, unweighted=unweighted)
+        incoming = dijkstra(backward, indices=landmark, unweighted=unweighted)
+        if unweighted and max(outgoing[np.isfinite(outgoing)].max(), incoming[np.isfinite(incoming)].max()) > 2048:
+            raise ValueError("hop counts beyond 2048 do not fit in float16")
+        from_landmarks[:, i] = outgoing
+        to_landmarks[:, i] = incoming
+        closest = np.minimum(closest, outgoing + incoming)
+        spread = np.where(np.isfinite(closest) & ~picked, closest, -1.0)
+
+    from_landmarks.flush()
+    to_landmarks.flush()
+    np.save(os.path.join(directory, "landmarks.npy"), np.array(landmarks, dtype=np.int64))
+    return landmarks
+
+
+class Landmarks:
+    def __init__(self, directory: str) -> None:
+        """
+        Initialize the Landmarks object. The distances are memory mapped, so
+        loading takes constant time and only the rows of the vertices a
+        search reaches are read.
+
+        Args:
+            directory: directory written by build_landmarks
+        """
+        self.landmarks = np.load(os.path.join(directory, "landmarks.npy"))
+        self.from_landmarks = np.load(os.path.join(directory, "from_landmarks.npy"), mmap_mode="r")
+        self.to_landmarks = np.load(os.path.join(directory, "to_landmarks.npy"), mmap_mode="r")
+
+    def lower_bounds(self, nodes, goal: int):
+        """
+        Bound the distances from several vertices to a goal from below. For
+        every landmark L, d(v, goal) >= d(L, goal) - d(L, v) and
+        d(v, goal) >= d(v, L) - d(goal, L); the largest of these bounds wins.
+        An infinite bound means the goal cannot be reached from the vertex.
+
+        Args:
+            nodes: ids of the vertices
+            goal: id of the goal
+
+        Returns:
+            float32 array of one lower bound per vertex.
+        """
+        from_vertex = self.from_landmarks[nodes].astype(np.float32)
+        to_vertex = self.to_landmarks[nodes].astype(np.float32)
+        from_goal = self.from_landmarks[goal].astype(np.float32)
+        to_goal = self.to_landmarks[goal].astype(np.float32)
+        # Terms whose subtrahend is infinite say nothing; the other branch of where may be NaN
+        with np.errstate(invalid="ignore"):
+            forward = np.where(np.isfinite(from_vertex), from_goal - from_vertex, 0)
+            backward = np.where(np.isfinite(to_goal), to_vertex - to_goal, 0)
+        bounds = np.maximum(forward, backward).max(axis=1, initial=0)
+        return bounds
+
+    def lower_bound(self, node: int, goal: int) -> float:
+        """
+        Bound the distance from one vertex to a goal from below.
+        """
+        return float(self.lower_bounds([node], goal)[0])
+
+    def __len__(self):
+        """
+        When called in len(); number of landmarks
+        """
+        return len(self.landmarks)
+
+
+class LandmarkHeuristic:
+    def __init__(self, landmarks: Landmarks, node_id) -> None:
+        """
+        Initialize the LandmarkHeuristic object, a (vertex, goal) -> estimated
+        distance function for GraphProvider or IndexProvider.
+
+        Args:
+            landmarks: the Landmarks
+            node_id: function mapping a vertex to its id, or None if it is
+                unknown, such as OfflineIndex.id or dict.get.
+        """
+        self.landmarks = landmarks
+        self.node_id = node_id
+
+    def __call__(self, vertex, goal) -> float:
+        """
+        When called as heuristic(vertex, goal); unknown vertices are bounded by 0
+        """
+        node = self.node_id(vertex)
+        goal_node = self.node_id(goal)
+        if node is None or goal_node is None:
+            return 0
+        return self.landmarks.lower_bound(node, goal_node)
+
+
+# Run with: `python3 landmarks.py --index DIR --out DIR`
+@click.command()
+@click.option('--index', type=str, help='Directory of the offline link index')
+@click.option('--count', type=int, default=16, help='Number of landmarks')
+@click.option('--out', type=str, help='Directory to write the landmarks to')
+def main(index, count, out):
+    offline_index = OfflineIndex(index)
+    forward, backward = index_matrices(offline_index)
+    landmarks = build_landmarks(forward, backward, out, count, unweighted=True)
+    print(f"{len(landmarks)} landmarks: {[offline_index.title(node) for node in landmarks]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Persistent on-disk cache of the outgoing links of Wikipedia articles
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+
+def normalize_title(title: str) -> str:
+    """
+    Normalize an article title the way Wikipedia does, so "united_States" and
+    "United States" share a cache entry.
+
+    Args:
+        title: raw article title, taken from a URL or an anchor title attribute
+
+    Returns:
+        The normalized title.
+    """
+    title = " ".join(title.replace("_", " ").split())
+    return title[:1].upper() + title[1:]
+
+
+class LinkCache:
+    def __init__(self, path: str = "link_cache.sqlite3", ttl: float = 7 * 24 * 3600, max_entries: int = 200000, table: str = "links") -> None:
+        """
+        Initialize the LinkCache object
+
+        Args:
+            path: location of the SQLite database; the same file can be shared by several processes.
+            ttl: seconds after which a cached link list is considered stale and must be refetched.
+            max_entries: maximum number of articles kept; the least recently used ones are evicted first.
+            table: name of the table, so outgoing links and backlinks can share one database file.
+        """
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        # One connection is shared by the threads of a process, one statement at a time
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {self.table} (
+                title TEXT PRIMARY KEY,
+                links TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self.db.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_accessed ON {self.table} (accessed_at)")
+        self.db.commit()
+
+    def get(self, title: str):
+        """
+        Look up the cached links of an article.
+
+        Args:
+            title: title of the article
+
+        Returns:
+            The list of linked titles, or None if the article is missing or stale.
+        """
+        key = normalize_title(title)
+        with self.lock:
+            row = self.db.execute(
+                f"SELECT links, fetched_at FROM {self.table} WHERE title = ?", (key,)
+            ).fetchone()
+            now = time.time()
+            if row is None or now - row[1] > self.ttl:
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self.db:
+                self.db.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE title = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, title: str, links: list) -> None:
+        """
+        Store the links of an article, evicting the least recently used
+        articles if the cache is full.
+
+        Args:
+            title: title of the article
+            links: list of linked titles
+        """
+        key = normalize_title(title)
+        now = time.time()
+        with self.lock:
+            with self.db:
+                self.db.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (title, links, fetched_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(links), now, now),
+                )
+            # Eviction scans the access index, so only do it every so often
+            self._puts += 1
+            if self._puts % 256 == 0:
+                self.evict()
+
+    def evict(self) -> None:
+        """
+        Drop the least recently used articles beyond max_entries.
+        """
+        with self.lock, self.db:
+            self.db.execute(
+                f"""
+                DELETE FROM {self.table} WHERE title IN (
+                    SELECT title FROM {self.table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+
+    def __contains__(self, title: str):
+        """
+        When called with `in`; only fresh entries count
+        """
+        with self.lock:
+            row = self.db.execute(
+                f"SELECT fetched_at FROM {self.table} WHERE title = ?", (normalize_title(title),)
+            ).fetchone()
+        return row is not None and time.time() - row[0] <= self.ttl
+
+    def __len__(self):
+        """
+        When called in len()
+        """
+        with self.lock:
+            return self.db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
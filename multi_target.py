@@ -0,0 +1,108 @@
+"""
+Multi-target searches: one expansion from a start that settles several
+goals (one-to-many), or one backward expansion from a goal that settles
+several starts (many-to-one), instead of a search per pair that each
+re-expands the same neighborhood.
+"""
+
+from anytime import generate_path
+from instrumentation import BudgetExceeded, SearchStats
+from priority_queue import VertexQueue
+
+
+def one_to_many(start, goals, expand, heuristic=None, nearest=False, stats=None):
+    """
+    Compute the shortest paths from start to every goal in one expansion,
+    stopping once all goals are settled, or the first one if nearest is set.
+    Dijkstra without a heuristic; with one it is A*, whose heuristic must
+    estimate the distance to the nearest goal, which keeps it admissible
+    (and consistent, if each goal's heuristic is) for every goal.
+
+    A budget running out (see instrumentation.Budget) ends the search with
+    the goals settled so far.
+
+    Args:
+        start: The starting vertex (source)
+        goals: The target vertices; compared case-insensitively
+        expand: function mapping a vertex to its (neighbor, weight) pairs
+        heuristic: optional function estimating the distance from a vertex to the nearest goal.
+        nearest: stop at the first goal settled, i.e. the nearest one.
+        stats: SearchStats to count in, fire hooks of and take budgets from.
+
+    Returns:
+        paths: {goal: list of vertices from start to goal}; empty lists for goals not reached.
+        costs: {goal: total weight of its path}; infinity for goals not reached.
+        expanded: Number of vertices expanded.
+    """
+    if heuristic is None:
+        heuristic = lambda vertex: 0
+    if stats is None:
+        stats = SearchStats()
+    remaining = {}
+    for goal in goals:
+        remaining.setdefault(goal.lower(), []).append(goal)
+    paths = {goal: [] for goal in goals}
+    costs = {goal: float("inf") for goal in goals}
+
+    pq = VertexQueue()
+    pq.push(start, heuristic(start))
+    pop, push = stats.timed(pq.pop, "heap"), stats.timed(pq.push, "heap")
+    distances = {start: 0}
+    came_from = {start: None}
+    visited = set()
+    try:
+        while pq and remaining:
+            vertex, key = pop()
+            stats.pops += 1
+            if stats.sample_every:
+                stats.sample(len(pq))
+            visited.add(vertex)
+            if stats.hooks:
+                stats.emit("expand", {"vertex": vertex, "distance": distances[vertex], "key": key})
+
+            for goal in remaining.pop(vertex.lower(), []):
+                paths[goal] = generate_path(came_from, vertex)
+                costs[goal] = distances[vertex]
+                if nearest:
+                    remaining.clear()
+            if not remaining:
+                break
+
+            for neighbor, weight in expand(vertex):
+                if neighbor in visited:
+                    continue
+                tent_dist = distances[vertex] + weight
+                if tent_dist < distances.get(neighbor, float("inf")):
+                    distances[neighbor] = tent_dist
+                    came_from[neighbor] = vertex
+                    stats.relaxations += 1
+                    inserted = push(neighbor, tent_dist + heuristic(neighbor))
+                    if inserted:
+                        stats.pushes += 1
+                    elif inserted is False:
+                        stats.decrease_keys += 1
+    except BudgetExceeded:
+        pass
+    return paths, costs, len(visited)
+
+
+def many_to_one(starts, goal, predecessors, stats=None):
+    """
+    Compute the shortest paths from every start to goal with one Dijkstra
+    expansion backward from the goal, stopping once all starts are settled.
+
+    Args:
+        starts: The starting vertices; compared case-insensitively
+        goal: The target vertex (goal)
+        predecessors: function mapping a vertex to its (predecessor, weight) pairs,
+            the weight being that of the link from the predecessor to the vertex.
+        stats: SearchStats to count in, fire hooks of and take budgets from.
+
+    Returns:
+        paths: {start: list of vertices from start to goal}; empty lists for starts not reached.
+        costs: {start: total weight of its path}; infinity for starts not reached.
+        expanded: Number of vertices expanded.
+    """
+    paths, costs, expanded = one_to_many(goal, starts, predecessors, stats=stats)
+    return {start: path[::-1] for start, path in paths.items()}, costs, expanded
+
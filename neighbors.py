@@ -0,0 +1,395 @@
+"""
+Neighbor providers: where the searches get the weighted neighbors of a
+vertex from. A provider is shared across queries; each query asks it for a
+per-goal view that expands vertices lazily, only when they are popped.
+"""
+
+import threading
+from array import array
+
+import scraper
+from compact_graph import CompactAdjacency
+
+
+class LinkProvider:
+    def __init__(self, heuristics=None) -> None:
+        """
+        Initialize the LinkProvider object, which expands articles with
+        scraper.get_links (link cache, offline index or live site). The
+        links of every expanded article are kept in a CompactAdjacency
+        without weights, shared by all the queries run on this provider,
+        which may run in several threads at once.
+
+        Args:
+            heuristics: HeuristicCache the link weights come from; defaults to
+                scraper.heuristic_cache, shared by the whole process.
+        """
+        if heuristics is None:
+            heuristics = scraper.heuristic_cache
+        self.heuristics = heuristics
+        self.graph = CompactAdjacency(weighted=False)
+        self.in_links = {}
+        # Ids of titles found out to be redirects only when expanded, mapped to their articles' ids
+        self.aliases = {}
+        self.expanded = 0
+        self.lock = threading.Lock()
+
+    def intern(self, title: str) -> int:
+        """
+        Get the id of a title, adding it if needed. Every title known to lead
+        to the same article, such as a redirect, gets the id of its canonical title.
+        """
+        node = self.graph.ids.get(title)
+        if node is None:
+            canonical = scraper.canonical_title(title)
+            with self.lock:
+                node = self.graph.ids[title] = self.graph.intern(canonical)
+        return node
+
+    def article(self, title: str) -> str:
+        """
+        Get the title of the article a title is known to lead to, without fetching anything.
+        """
+        return self.graph.titles[self.intern(title)]
+
+    def canonical(self, title: str) -> str:
+        """
+        Get the canonical title of an article, fetching it if needed; the
+        searches resolve their start and goal with this.
+        """
+        return scraper.resolve_title(title)
+
+    def resolve(self, nodes: array) -> array:
+        """
+        Replace the ids of redirects found out about since the ids were stored
+        with the ids of their articles.
+        """
+        if self.aliases and not self.aliases.keys().isdisjoint(nodes):
+            nodes = array("i", dict.fromkeys(self.aliases.get(node, node) for node in nodes))
+        return nodes
+
+    def links(self, title: str) -> list:
+        """
+        Get the titles linked from an article, fetching them only the first
+        time. A redirect links to its article and nowhere else.
+        """
+        node = self.intern(title)
+        if self.graph.neighbor_ids(node) is None:
+            links = scraper.get_links(title)
+            canonical = self.intern(scraper.canonical_title(title))
+            links = dict.fromkeys(map(self.intern, links))
+            with self.lock:
+                if canonical != node:
+                    # Found out to be a redirect only now: from here on the title and the
+                    # links stored to it lead to its article, which gets the page's links
+                    self.graph.ids[title] = canonical
+                    self.aliases[node] = canonical
+                    node = canonical
+                if self.graph.neighbor_ids(node) is None:
+                    self.expanded += 1
+                    self.graph.set_neighbor_ids(node, links)
+        if self.graph.titles[node] != title:
+            return [self.graph.titles[node]]
+
+        stored = self.graph.neighbor_ids(node)
+        links = self.resolve(stored)
+        if links is not stored:
+            with self.lock:
+                self.graph.set_neighbor_ids(node, links)
+        return list(map(self.graph.titles.__getitem__, links))
+
+    def backlinks(self, title: str) -> list:
+        """
+        Get the titles linking to an article, fetching them only the first time.
+        """
+        node = self.intern(title)
+        if node not in self.in_links:
+            sources = dict.fromkeys(map(self.intern, scraper.get_backlinks(title)))
+            # Backlinks an expanded article's own links already refute are dropped
+            expanded = self.graph.neighbor_ids
+            self.in_links[node] = array(
+                "i", (source for source in sources if expanded(source) is None or node in self.resolve(expanded(source)))
+            )
+        return list(map(self.graph.titles.__getitem__, self.resolve(self.in_links[node])))
+
+    def confirm_path(self, path: list) -> bool:
+        """
+        Check that every step of a path found partly over backlinks is a link
+        of the article it leaves from. The API's backlinks include links that
+        are not in the body content, so the backward graph is not exactly the
+        reverse of the forward one; backlinks found wrong are dropped, so the
+        next search avoids them.
+
+        Returns:
+            True if the path only follows links.
+        """
+        confirmed = True
+        for source, target in zip(path, path[1:]):
+            if target not in self.links(source):
+                node, source = self.intern(target), self.intern(source)
+                self.in_links[node] = array("i", (link for link in self.in_links.get(node, []) if link != source))
+                confirmed = False
+        return confirmed
+
+    def canonical_path(self, path: list) -> list:
+        """
+        Replace the redirects in a path with their articles, dropping the
+        step from a redirect found out about during the search to its article.
+        """
+        articles = []
+        for title in path:
+            article = self.article(title)
+            if not articles or articles[-1] != article:
+                articles.append(article)
+        return articles
+
+    def for_goal(self, goal: str):
+        """
+        Get the view of this provider used by one query towards goal.
+        """
+        return LinkNeighbors(self, goal)
+
+    def for_goals(self, goals: list):
+        """
+        Get the view of this provider used by one query towards the nearest of several goals.
+        """
+        return LinkNeighbors(self, goals[0], goals)
+
+    def __len__(self):
+        """
+        When called in len(); number of expanded articles
+        """
+        return self.expanded
+
+
+class LinkNeighbors:
+    def __init__(self, provider: LinkProvider, goal: str, goals: list = None) -> None:
+        """
+        Initialize the LinkNeighbors object, the per-query view of a
+        LinkProvider. The weight of a link into an article is the cosine
+        distance between the article and the goal plus 1e-5, which is also
+        the article's heuristic, so both come from one sparse map filled a
+        page at a time from the provider's heuristic cache. With several
+        goals, it is the distance to the nearest one, so a single search
+        serves them all.
+
+        Args:
+            provider: the shared provider
+            goal: title of the goal article
+            goals: titles of several goal articles, for multi-target queries; defaults to [goal].
+        """
+        self.provider = provider
+        self.goal = goal
+        self.goals = goals or [goal]
+        self.weights = {}
+
+    def weigh(self, titles: list) -> list:
+        """
+        Get the weights of links into the given articles, looking the
+        missing ones up in one batch.
+        """
+        missing = [title for title in dict.fromkeys(titles) if title not in self.weights]
+        if missing:
+            self.weights.update(zip(missing, self.provider.heuristics.get_nearest(missing, self.goals)))
+        return [self.weights[title] for title in titles]
+
+    def neighbors(self, title: str) -> list:
+        """
+        Get the (neighbor, weight) pairs of an article.
+        """
+        links = self.provider.links(title)
+        if self.provider.article(title) != title:
+            # A redirect found out about while it was queued: a free step to its article
+            return [(links[0], 0)]
+        return list(zip(links, self.weigh(links)))
+
+    def predecessors(self, title: str) -> list:
+        """
+        Get the (predecessor, weight) pairs of an article, i.e. its backlinks
+        and the weight of their link into it.
+        """
+        weight = self.weigh([title])[0]
+        return [(link, weight) for link in self.provider.backlinks(title)]
+
+    def heuristic(self, title: str) -> float:
+        """
+        Estimate the distance from an article to the nearest goal.
+        """
+        return self.weigh([title])[0]
+
+
+class GraphProvider:
+    def __init__(self, graph_dict, heuristic=None) -> None:
+        """
+        Initialize the GraphProvider object, which serves a fixed graph such as
+        TEST_GRAPH. Any dict-of-dicts works, including a CompactAdjacency.
+
+        Args:
+            graph_dict: the graph; Example: {v1: {v2: 1, v3: 2}}
+            heuristic: optional function (vertex, goal) -> estimated distance; defaults to 0.
+        """
+        self.graph = graph_dict
+        self.heuristic = heuristic
+        self.reverse = None
+
+    def canonical(self, vertex: str) -> str:
+        """
+        Get the canonical name of a vertex; a fixed graph has no redirects.
+        """
+        return vertex
+
+    def confirm_path(self, path: list) -> bool:
+        """
+        Check that a path found partly over predecessors only follows edges;
+        always true, as the predecessors are the reverse of the graph.
+        """
+        return True
+
+    def canonical_path(self, path: list) -> list:
+        """
+        Get a path with its redirects replaced; a fixed graph has none.
+        """
+        return path
+
+    def for_goal(self, goal: str):
+        """
+        Get the view of this provider used by one query towards goal.
+        """
+        return GraphNeighbors(self, goal)
+
+    def for_goals(self, goals: list):
+        """
+        Get the view of this provider used by one query towards the nearest of several goals.
+        """
+        return GraphNeighbors(self, goals[0], goals)
+
+    def __len__(self):
+        """
+        When called in len()
+        """
+        return len(self.graph)
+
+
+class GraphNeighbors:
+    def __init__(self, provider: GraphProvider, goal: str, goals: list = None) -> None:
+        """
+        Initialize the GraphNeighbors object, the per-query view of a
+        GraphProvider; goals are several goals for multi-target queries.
+        """
+        self.provider = provider
+        self.goal = goal
+        self.goals = goals or [goal]
+
+    def neighbors(self, vertex: str) -> list:
+        """
+        Get the (neighbor, weight) pairs of a vertex.
+        """
+        if vertex not in self.provider.graph:
+            return []
+        return list(self.provider.graph[vertex].items())
+
+    def predecessors(self, vertex: str) -> list:
+        """
+        Get the (predecessor, weight) pairs of a vertex. The reverse graph is
+        built once, the first time it is needed.
+        """
+        if self.provider.reverse is None:
+            reverse = {}
+            for source, neighbors in self.provider.graph.items():
+                for target, weight in neighbors.items():
+                    reverse.setdefault(target, []).append((source, weight))
+            self.provider.reverse = reverse
+        return self.provider.reverse.get(vertex, [])
+
+    def heuristic(self, vertex: str) -> float:
+        """
+        Estimate the distance from a vertex to the nearest goal.
+        """
+        if self.provider.heuristic is None:
+            return 0
+        return min(self.provider.heuristic(vertex, goal) for goal in self.goals)
+
+
+class IndexProvider:
+    def __init__(self, index, heuristic=None) -> None:
+        """
+        Initialize the IndexProvider object, which serves an OfflineIndex with
+        every link weighing 1, so path costs are hop counts. Unlike the
+        cosine weights of LinkProvider, these do not depend on the goal, so
+        they can be bounded by a LandmarkHeuristic.
+
+        Args:
+            index: the OfflineIndex
+            heuristic: optional function (title, goal) -> estimated number of hops; defaults to 0.
+        """
+        self.index = index
+        self.heuristic = heuristic
+
+    def canonical(self, title: str) -> str:
+        """
+        Get the canonical title of an article, through the redirects of the index.
+        """
+        return self.index.canonical(title)
+
+    def confirm_path(self, path: list) -> bool:
+        """
+        Check that a path found partly over backlinks only follows links;
+        always true, as the index stores the backlinks as the reverse of the links.
+        """
+        return True
+
+    def canonical_path(self, path: list) -> list:
+        """
+        Get a path with its redirects replaced; the index resolves them to
+        their articles when it is built, so there are none.
+        """
+        return path
+
+    def for_goal(self, goal: str):
+        """
+        Get the view of this provider used by one query towards goal.
+        """
+        return IndexNeighbors(self, goal)
+
+    def for_goals(self, goals: list):
+        """
+        Get the view of this provider used by one query towards the nearest of several goals.
+        """
+        return IndexNeighbors(self, goals[0], goals)
+
+    def __len__(self):
+        """
+        When called in len()
+        """
+        return len(self.index)
+
+
+class IndexNeighbors:
+    def __init__(self, provider: IndexProvider, goal: str, goals: list = None) -> None:
+        """
+        Initialize the IndexNeighbors object, the per-query view of an
+        IndexProvider; goals are several goals for multi-target queries.
+        """
+        self.provider = provider
+        self.goal = goal
+        self.goals = goals or [goal]
+
+    def neighbors(self, title: str) -> list:
+        """
+        Get the (neighbor, weight) pairs of an article.
+        """
+        return [(link, 1) for link in self.provider.index.links(title)]
+
+    def predecessors(self, title: str) -> list:
+        """
+        Get the (predecessor, weight) pairs of an article.
+        """
+        return [(link, 1) for link in self.provider.index.backlinks(title)]
+
+    def heuristic(self, title: str) -> float:
+        """
+        Estimate the number of hops from an article to the nearest goal.
+        """
+        if self.provider.heuristic is None:
+            return 0
+        return min(self.provider.heuristic(title, goal) for goal in self.goals)
@@ -0,0 +1,436 @@
+"""
+Offline link graph built from Wikipedia dumps and stored as memory-mapped
+CSR (compressed sparse row) arrays, so searches can run without scraping.
+
+Build with:
+    python3 offline_index.py --page page.sql.gz --pagelinks pagelinks.sql.gz --out index/
+    python3 offline_index.py --links links.tsv.gz --out index/
+"""
+
+import gzip
+import os
+import re
+import tempfile
+
+import click
+import numpy as np
+
+from link_cache import normalize_title
+
+# Tokens of an INSERT statement: a quoted string, NULL, a number or a parenthesis
+_TOKEN = re.compile(r"'((?:[^'\\]|\\.)*)'|(NULL)|([-+0-9.eE]+)|(\()|(\))")
+_ESCAPE = re.compile(r"\\(.)")
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "0": "\0"}
+
+CHUNK_EDGES = 1 << 22
+
+
+def open_text(path: str):
+    """
+    Open a plain or gzip compressed text file for streaming.
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, encoding="utf-8", errors="replace")
+
+
+def iter_sql_rows(path: str):
+    """
+    Stream the rows of the INSERT statements of a MediaWiki SQL dump, one
+    statement line at a time.
+
+    Args:
+        path: path of the .sql or .sql.gz dump
+
+    Returns:
+        A generator of tuples, with strings unescaped and numbers as ints.
+    """
+    with open_text(path) as dump:
+        for line in dump:
+            if not line.startswith("INSERT INTO"):
+                continue
+            row = None
+            for match in _TOKEN.finditer(line, line.index(" VALUES ")):
+                string, null, number, opening, closing = match.groups()
+                if opening:
+                    row = []
+                elif closing:
+                    yield tuple(row)
+                    row = None
+                elif row is None:
+                    continue
+                elif string is not None:
+                    row.append(_ESCAPE.sub(lambda m: _ESCAPES.get(m.group(1), m.group(1)), string))
+                elif null:
+                    row.append(None)
+                else:
+                    row.append(int(number) if number.lstrip("-+").isdigit() else float(number))
+
+
+def encode_title_table(titles: list) -> tuple:
+    """
+    Encode a title table: the concatenated UTF-8 bytes of the titles, their
+    offsets, and the ids sorted by title for binary search lookup.
+
+    Args:
+        titles: titles in id order
+
+    Returns:
+        The (titles, title_offsets, title_order) arrays.
+    """
+    encoded = [title.encode("utf-8") for title in titles]
+    title_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(title) for title in encoded], out=title_offsets[1:])
+    order = sorted(range(len(encoded)), key=encoded.__getitem__)
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), title_offsets, np.array(order, dtype=np.int32)
+
+
+def write_title_table(directory: str, titles: list) -> None:
+    """
+    Write a title table encoded by encode_title_table.
+
+    Args:
+        directory: directory to write titles.npy, title_offsets.npy and title_order.npy to
+        titles: titles in id order
+    """
+    for name, array in zip(["titles.npy", "title_offsets.npy", "title_order.npy"], encode_title_table(titles)):
+        np.save(os.path.join(directory, name), array)
+
+
+class TitleTable:
+    def __init__(self, directory: str = None, arrays: tuple = None) -> None:
+        """
+        Initialize the TitleTable object from the memory-mapped files written
+        by write_title_table.
+
+        Args:
+            directory: directory containing the title table
+            arrays: the (titles, title_offsets, title_order) arrays to use
+                instead of a directory, such as views into a graph snapshot.
+        """
+        def load(name):
+            return np.load(os.path.join(directory, name), mmap_mode="r")
+
+        if arrays is None:
+            arrays = load("titles.npy"), load("title_offsets.npy"), load("title_order.npy")
+        self.titles, self.title_offsets, self.title_order = arrays
+
+    def title(self, node: int) -> str:
+        """
+        Get the title of an id.
+        """
+        return self._title_bytes(node).decode("utf-8")
+
+    def id(self, title: str):
+        """
+        Get the id of an exact title by binary search over the sorted title order.
+
+        Returns:
+            The id, or None if the title is not in the table.
+        """
+        key = title.encode("utf-8")
+        low, high = 0, len(self.title_order)
+        while low < high:
+            mid = (low + high) // 2
+            if self._title_bytes(self.title_order[mid]) < key:
+                low = mid + 1
+            else:
+                high = mid
+        if low < len(self.title_order) and self._title_bytes(self.title_order[low]) == key:
+            return int(self.title_order[low])
+        return None
+
+    def _title_bytes(self, node) -> bytes:
+        return self.titles[self.title_offsets[node]:self.title_offsets[node + 1]].tobytes()
+
+    def __len__(self):
+        """
+        When called in len()
+        """
+        return len(self.title_offsets) - 1
+
+
+class IndexBuilder:
+    def __init__(self) -> None:
+        """
+        Initialize the IndexBuilder object. Titles are interned to int32 node
+        ids and edges are spilled to a temporary file as they stream in.
+        """
+        self.ids = {}
+        self.titles = []
+        self.edge_file = tempfile.TemporaryFile()
+        self.buffer = []
+        self.num_edges = 0
+        self.redirects = {}
+
+    def node(self, title: str) -> int:
+        """
+        Get the node id of a title, assigning a new one if needed.
+        """
+        title = normalize_title(title)
+        if title not in self.ids:
+            self.ids[title] = len(self.titles)
+            self.titles.append(title)
+        return self.ids[title]
+
+    def add_edge(self, source: int, target: int) -> None:
+        """
+        Record a link from node source to node target.
+        """
+        self.buffer.append(source)
+        self.buffer.append(target)
+        if len(self.buffer) >= 2 * CHUNK_EDGES:
+            self._flush()
+
+    def read_page_dump(self, path: str) -> dict:
+        """
+        Read the articles (namespace 0) of a page table dump.
+
+        Returns:
+            A dictionary mapping page ids to node ids.
+        """
+        page_ids = {}
+        for row in iter_sql_rows(path):
+            page_id, namespace, title = row[0], row[1], row[2]
+            if namespace == 0:
+                page_ids[page_id] = self.node(title)
+        return page_ids
+
+    def read_pagelinks_dump(self, path: str, page_ids: dict, linktarget_path: str = None) -> None:
+        """
+        Read the links between articles of a pagelinks table dump. Dumps
+        since MediaWiki 1.43 refer to link targets by id, which are resolved
+        with the linktarget table dump.
+        """
+        targets = None
+        if linktarget_path:
+            targets = {}
+            for lt_id, namespace, title in iter_sql_rows(linktarget_path):
+                if namespace == 0:
+                    targets[lt_id] = self.node(title)
+
+        for row in iter_sql_rows(path):
+            source = page_ids.get(row[0])
+            if source is None:
+                continue
+            if targets is not None:
+                # (pl_from, pl_from_namespace, pl_target_id)
+                target = targets.get(row[2])
+            elif row[1] == 0:
+                # (pl_from, pl_namespace, pl_title, pl_from_namespace)
+                target = self.node(row[2])
+            else:
+                continue
+            if target is not None:
+                self.add_edge(source, target)
+
+    def read_redirect_dump(self, path: str, page_ids: dict) -> None:
+        """
+        Read the redirects between articles of a redirect table dump. Links
+        to a redirect are written as links to the article it leads to, and
+        looking a redirect up finds that article.
+        """
+        # (rd_from, rd_namespace, rd_title, rd_interwiki, rd_fragment)
+        for row in iter_sql_rows(path):
+            source = page_ids.get(row[0])
+            if source is not None and row[1] == 0 and not (len(row) > 3 and row[3]):
+                self.redirects[source] = self.node(row[2])
+
+    def canonical_ids(self):
+        """
+        Get the id every node resolves to through the redirects, following
+        redirects to redirects; nodes in a redirect cycle resolve to themselves.
+        """
+        canonical = np.arange(len(self.titles), dtype=np.int32)
+        for source in self.redirects:
+            target, hops = source, 0
+            while target in self.redirects and hops < 8:
+                target, hops = self.redirects[target], hops + 1
+            if target not in self.redirects:
+                canonical[source] = target
+        return canonical
+
+    def read_link_list(self, path: str) -> None:
+        """
+        Read a link list file with one "source<TAB>target" title pair per line.
+        """
+        with open_text(path) as links:
+            for line in links:
+                source, _, target = line.rstrip("\n").partition("\t")
+                if target:
+                    self.add_edge(self.node(source), self.node(target))
+
+    def write(self, directory: str) -> None:
+        """
+        Write the index to a directory as .npy files that are memory mapped
+        when loaded.
+        """
+        self._flush()
+        os.makedirs(directory, exist_ok=True)
+        num_nodes = len(self.titles)
+
+        write_title_table(directory, self.titles)
+        canonical = None
+        if self.redirects:
+            canonical = self.canonical_ids()
+            np.save(os.path.join(directory, "canonical.npy"), canonical)
+        # Outgoing links, then the same edges reversed for backlinks
+        for prefix, reverse in (("", False), ("in_", True)):
+            offsets, targets = self._build_csr(os.path.join(directory, prefix + "targets.npy"), num_nodes, reverse, canonical)
+            np.save(os.path.join(directory, prefix + "offsets.npy"), offsets)
+            targets.flush()
+
+    def _flush(self) -> None:
+        if self.buffer:
+            np.array(self.buffer, dtype=np.int32).tofile(self.edge_file)
+            self.num_edges += len(self.buffer) // 2
+            self.buffer = []
+
+    def _edge_chunks(self, reverse: bool = False, canonical=None):
+        self.edge_file.seek(0)
+        while True:
+            chunk = np.fromfile(self.edge_file, dtype=np.int32, count=2 * CHUNK_EDGES)
+            if not len(chunk):
+                return
+            sources, targets = chunk[0::2], chunk[1::2]
+            if canonical is not None:
+                # Links into redirects go to their articles; a redirect's own link to its article is dropped
+                targets = canonical[targets]
+                keep = canonical[sources] != targets
+                sources, targets = sources[keep], targets[keep]
+            if reverse:
+                yield targets, sources
+            else:
+                yield sources, targets
+
+    def _build_csr(self, path: str, num_nodes: int, reverse: bool = False, canonical=None):
+        # First pass counts degrees, second pass scatters targets into place
+        degrees = np.zeros(num_nodes, dtype=np.int64)
+        for sources, _ in self._edge_chunks(reverse, canonical):
+            degrees += np.bincount(sources, minlength=num_nodes)
+        offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(degrees, out=offsets[1:])
+
+        targets = np.lib.format.open_memmap(path, mode="w+", dtype=np.int32, shape=(int(offsets[-1]),))
+        cursor = offsets[:-1].copy()
+        for sources, chunk_targets in self._edge_chunks(reverse, canonical):
+            order = np.argsort(sources, kind="stable")
+            sources, chunk_targets = sources[order], chunk_targets[order]
+            # Rank of each edge among the edges of the same source in this chunk
+            starts = np.flatnonzero(np.r_[True, sources[1:] != sources[:-1]])
+            rank = np.arange(len(sources)) - np.repeat(starts, np.diff(np.r_[starts, len(sources)]))
+            targets[cursor[sources] + rank] = chunk_targets
+            cursor += np.bincount(sources, minlength=num_nodes)
+        return offsets, targets
+
+
+class OfflineIndex:
+    def __init__(self, directory: str) -> None:
+        """
+        Initialize the OfflineIndex object. All arrays are memory mapped, so
+        loading takes constant time regardless of the graph size.
+
+        Args:
+            directory: directory written by IndexBuilder.write
+        """
+        self.table = TitleTable(directory)
+        self.offsets = np.load(os.path.join(directory, "offsets.npy"), mmap_mode="r")
+        self.targets = np.load(os.path.join(directory, "targets.npy"), mmap_mode="r")
+        self.in_offsets = np.load(os.path.join(directory, "in_offsets.npy"), mmap_mode="r")
+        self.in_sources = np.load(os.path.join(directory, "in_targets.npy"), mmap_mode="r")
+        # Written only for indexes built with a redirect dump
+        canonical_path = os.path.join(directory, "canonical.npy")
+        self.canonical_ids = np.load(canonical_path, mmap_mode="r") if os.path.exists(canonical_path) else None
+
+    def title(self, node: int) -> str:
+        """
+        Get the title of a node id.
+        """
+        return self.table.title(node)
+
+    def id(self, title: str):
+        """
+        Get the node id of a title; for a redirect, the id of the article it leads to.
+
+        Returns:
+            The node id, or None if the title is not in the index.
+        """
+        node = self.table.id(normalize_title(title))
+        if node is not None and self.canonical_ids is not None:
+            node = int(self.canonical_ids[node])
+        return node
+
+    def canonical(self, title: str) -> str:
+        """
+        Get the canonical title of an article, or the normalized title if it is not in the index.
+        """
+        node = self.id(title)
+        return normalize_title(title) if node is None else self.title(node)
+
+    def neighbor_ids(self, node: int):
+        """
+        Get the node ids linked from a node, as a read-only array view.
+        """
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+
+    def backlink_ids(self, node: int):
+        """
+        Get the node ids linking to a node, as a read-only array view.
+        """
+        return self.in_sources[self.in_offsets[node]:self.in_offsets[node + 1]]
+
+    def links(self, title: str) -> list:
+        """
+        Get the titles of the articles linked from an article, the same way
+        scraper.get_links does from the live site.
+        """
+        node = self.id(title)
+        if node is None:
+            return []
+        # A link to an article and one to a redirect to it are the same link
+        return [self.title(target) for target in dict.fromkeys(self.neighbor_ids(node).tolist())]
+
+    def backlinks(self, title: str) -> list:
+        """
+        Get the titles of the articles linking to an article.
+        """
+        node = self.id(title)
+        if node is None:
+            return []
+        return [self.title(source) for source in dict.fromkeys(self.backlink_ids(node).tolist())]
+
+    def __contains__(self, title: str):
+        """
+        When called with `in`
+        """
+        return self.id(title) is not None
+
+    def __len__(self):
+        """
+        When called in len()
+        """
+        return len(self.table)
+
+
+# Run with: `python3 offline_index.py --page PAGE_DUMP --pagelinks PAGELINKS_DUMP --out DIR`
+@click.command()
+@click.option('--page', type=str, help='page table SQL dump (.sql or .sql.gz)')
+@click.option('--pagelinks', type=str, help='pagelinks table SQL dump (.sql or .sql.gz)')
+@click.option('--linktarget', type=str, help='linktarget table SQL dump, for dumps since MediaWiki 1.43')
+@click.option('--redirect', type=str, help='redirect table SQL dump, to resolve links into redirects')
+@click.option('--links', type=str, help='link list file with "source<TAB>target" lines, instead of SQL dumps')
+@click.option('--out', type=str, help='Directory to write the index to')
+def main(page, pagelinks, linktarget, redirect, links, out):
+    builder = IndexBuilder()
+    if links:
+        builder.read_link_list(links)
+    else:
+        page_ids = builder.read_page_dump(page)
+        builder.read_pagelinks_dump(pagelinks, page_ids, linktarget)
+        if redirect:
+            builder.read_redirect_dump(redirect, page_ids)
+    builder.write(out)
+    print(f"{len(builder.titles)} articles, {builder.num_edges} links")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Indexed binary heap for the search frontiers: every item is in the heap at
+most once and its priority can be decreased in place, so the heap never
+holds stale duplicates.
+"""
+
+import heapq
+
+
+class IndexedHeap:
+    def __init__(self) -> None:
+        """
+        Initialize the IndexedHeap object. Items are small non-negative
+        integers, such as vertex ids interned per query; positions and
+        priorities are kept in lists indexed by item. Ties between equal
+        priorities go to the smaller item, so pop order is deterministic.
+        """
+        self.heap = []
+        self.positions = []
+        self.priorities = []
+
+    def push(self, item: int, priority: float):
+        """
+        Insert an item, or lower its priority if it is already queued.
+
+        Args:
+            item: id of the item
+            priority: its priority; smaller is popped first
+
+        Returns:
+            True if the item was inserted, False if its priority was lowered, and
+            None if it was already queued with a priority no higher than this one.
+        """
+        positions = self.positions
+        if item >= len(positions):
+            grow = item + 1 - len(positions)
+            positions.extend([-1] * grow)
+            self.priorities.extend([0.0] * grow)
+
+        position = positions[item]
+        if position >= 0:
+            if priority >= self.priorities[item]:
+                return None
+            self.priorities[item] = priority
+            self._sift_up(position)
+            return False
+
+        self.priorities[item] = priority
+        self.heap.append(item)
+        positions[item] = len(self.heap) - 1
+        self._sift_up(len(self.heap) - 1)
+        return True
+
+    def pop(self) -> tuple:
+        """
+        Remove the item with the smallest priority.
+
+        Returns:
+            The (item, priority) pair.
+        """
+        heap = self.heap
+        top = heap[0]
+        last = heap.pop()
+        self.positions[top] = -1
+        if heap:
+            heap[0] = last
+            self.positions[last] = 0
+            self._sift_down(0)
+        return top, self.priorities[top]
+
+    def peek(self) -> tuple:
+        """
+        Get the (item, priority) pair with the smallest priority without removing it.
+        """
+        top = self.heap[0]
+        return top, self.priorities[top]
+
+    def first(self, count: int) -> list:
+        """
+        Get the count items with the smallest priorities, in order, by walking
+        the heap best first from the root: the next smallest item is always a
+        child of one already taken, so only their children are compared, in
+        O(count log count).
+        """
+        heap, priorities = self.heap, self.priorities
+        size = len(heap)
+        items = []
+        # Slots whose parent was taken, ordered like the heap orders its items
+        frontier = [(priorities[heap[0]], heap[0], 0)] if size else []
+        while frontier and len(items) < count:
+            _, item, position = heapq.heappop(frontier)
+            items.append(item)
+            for child_position in (2 * position + 1, 2 * position + 2):
+                if child_position < size:
+                    child = heap[child_position]
+                    heapq.heappush(frontier, (priorities[child], child, child_position))
+        return items
+
+    def priority(self, item: int) -> float:
+        """
+        Get the priority of a queued item.
+        """
+        if item not in self:
+            raise KeyError(item)
+        return self.priorities[item]
+
+    def _sift_up(self, position: int) -> None:
+        heap, positions, priorities = self.heap, self.positions, self.priorities
+        item = heap[position]
+        key = priorities[item]
+        while position > 0:
+            parent_position = (position - 1) >> 1
+            parent = heap[parent_position]
+            parent_key = priorities[parent]
+            if parent_key < key or (parent_key == key and parent < item):
+                break
+            heap[position] = parent
+            positions[parent] = position
+            position = parent_position
+        heap[position] = item
+        positions[item] = position
+
+    def _sift_down(self, position: int) -> None:
+        heap, positions, priorities = self.heap, self.positions, self.priorities
+        size = len(heap)
+        item = heap[position]
+        key = priorities[item]
+        while True:
+            child_position = 2 * position + 1
+            if child_position >= size:
+                break
+            child = heap[child_position]
+            child_key = priorities[child]
+            right_position = child_position + 1
+            if right_position < size:
+                right = heap[right_position]
+                right_key = priorities[right]
+                if right_key < child_key or (right_key == child_key and right < child):
+                    child_position, child, child_key = right_position, right, right_key
+            if key < child_key or (key == child_key and item < child):
+                break
+            heap[position] = child
+            positions[child] = position
+            position = child_position
+        heap[position] = item
+        positions[item] = position
+
+    def __iter__(self):
+        """
+        When iterated over; yields the queued items in heap order
+        """
+        return iter(self.heap)
+
+    def __contains__(self, item: int):
+        """
+        When called with `in`; only items still queued count
+        """
+        return 0 <= item < len(self.positions) and self.positions[item] >= 0
+
+    def __len__(self):
+        """
+        When called in len()
+        """
+        return len(self.heap)
+
+
+class VertexQueue:
+    def __init__(self) -> None:
+        """
+        Initialize the VertexQueue object, an IndexedHeap of arbitrary
+        vertices such as article titles. Vertices are interned to ids in the
+        order they are first pushed, which is also how ties are broken.
+        """
+        self.heap = IndexedHeap()
+        self.ids = {}
+        self.vertices = []
+
+    def push(self, vertex, priority: float):
+        """
+        Insert a vertex, or lower its priority if it is already queued.
+
+        Returns:
+            True if the vertex was inserted, False if its priority was lowered, and
+            None if it was already queued with a priority no higher than this one.
+        """
+        item = self.ids.get(vertex)
+        if item is None:
+            item = self.ids[vertex] = len(self.vertices)
+            self.vertices.append(vertex)
+        return self.heap.push(item, priority)
+
+    def pop(self) -> tuple:
+        """
+        Remove the vertex with the smallest priority.
+
+        Returns:
+            The (vertex, priority) pair.
+        """
+        item, priority = self.heap.pop()
+        return self.vertices[item], priority
+
+    def peek(self) -> tuple:
+        """
+        Get the (vertex, priority) pair with the smallest priority without removing it.
+        """
+        item, priority = self.heap.peek()
+        return self.vertices[item], priority
+
+    def first(self, count: int) -> list:
+        """
+        Get the count vertices with the smallest priorities, in order.
+        """
+        return [self.vertices[item] for item in self.heap.first(count)]
+
+    def __iter__(self):
+        """
+        When iterated over; yields the queued vertices in heap order
+        """
+        return (self.vertices[item] for item in self.heap)
+
+    def __contains__(self, vertex):
+        """
+        When called with `in`; only vertices still queued count
+        """
+        item = self.ids.get(vertex)
+        return item is not None and item in self.heap
+
+    def __len__(self):
+        """
+        When called in len()
+        """
+        return len(self.heap)
@@ -0,0 +1,117 @@
+"""
+Canonical article titles: a map from redirects and other variant titles
+("USA") to the article they lead to ("United States"), learned from fetched
+pages or loaded from a redirect table dump, and kept next to the link cache
+so every process sharing it resolves titles the same way.
+"""
+
+import sqlite3
+import threading
+
+from link_cache import normalize_title
+from offline_index import iter_sql_rows
+
+# Redirects to redirects are followed this many times at most, which also stops cycles
+MAX_HOPS = 8
+
+
+class RedirectMap:
+    def __init__(self, path: str = "link_cache.sqlite3", table: str = "redirects") -> None:
+        """
+        Initialize the RedirectMap object. The map is read into memory once,
+        so resolving a title is a dictionary lookup; new redirects are
+        written through to the database.
+
+        Args:
+            path: location of the SQLite database, usually the link cache's.
+            table: name of the table
+        """
+        self.path = path
+        self.table = table
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(f"CREATE TABLE IF NOT EXISTS {self.table} (title TEXT PRIMARY KEY, target TEXT NOT NULL)")
+        self.db.commit()
+        self.targets = dict(self.db.execute(f"SELECT title, target FROM {self.table}"))
+
+    def canonical(self, title: str) -> str:
+        """
+        Get the canonical title of an article: its normalized title, followed
+        through the known redirects.
+        """
+        title = normalize_title(title)
+        for _ in range(MAX_HOPS):
+            target = self.targets.get(title)
+            if target is None:
+                break
+            title = target
+        return title
+
+    def add(self, title: str, target: str) -> None:
+        """
+        Record that title redirects to target.
+        """
+        self.add_many([(title, target)])
+
+    def add_many(self, pairs) -> int:
+        """
+        Record several redirects in one transaction. Redirects of a title to
+        itself, or that would close a cycle, are ignored.
+
+        Args:
+            pairs: (title, target) pairs
+
+        Returns:
+            The number of redirects recorded.
+        """
+        added = []
+        with self.lock:
+            for title, target in pairs:
+                title, target = normalize_title(title), normalize_title(target)
+                if title != target and self.targets.get(title) != target and self.canonical(target) != title:
+                    self.targets[title] = target
+                    added.append((title, target))
+            if added:
+                with self.db:
+                    self.db.executemany(
+                        f"INSERT OR REPLACE INTO {self.table} (title, target) VALUES (?, ?)", added
+                    )
+        return len(added)
+
+    def read_dump(self, page_path: str, redirect_path: str, chunk_size: int = 100000) -> int:
+        """
+        Load the redirects between articles (namespace 0) of a redirect table
+        dump, whose rows refer to the redirect pages by page id, resolved
+        with the page table dump.
+
+        Args:
+            page_path: page table SQL dump (.sql or .sql.gz)
+            redirect_path: redirect table SQL dump (.sql or .sql.gz)
+            chunk_size: number of redirects written per transaction
+
+        Returns:
+            The number of redirects recorded.
+        """
+        titles = {row[0]: row[2] for row in iter_sql_rows(page_path) if row[1] == 0}
+        added, chunk = 0, []
+        # (rd_from, rd_namespace, rd_title, rd_interwiki, rd_fragment)
+        for row in iter_sql_rows(redirect_path):
+            if row[1] == 0 and row[0] in titles and not (len(row) > 3 and row[3]):
+                chunk.append((titles[row[0]], row[2]))
+                if len(chunk) >= chunk_size:
+                    added += self.add_many(chunk)
+                    chunk = []
+        return added + self.add_many(chunk)
+
+    def __contains__(self, title: str):
+        """
+        When called with `in`; true for titles known to redirect
+        """
+        return normalize_title(title) in self.targets
+
+    def __len__(self):
+        """
+        When called in len()
+        """
+        return len(self.targets)
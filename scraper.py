@@ -1,25 +1,232 @@
-from bs4 import BeautifulSoup
-import fasttext.util
 import requests
 from graph import Graph
-import fasttext
+from link_cache import LinkCache
+from embeddings import EmbeddingStore
+from heuristic_cache import HeuristicCache
+import instrumentation
+from link_extraction import extract_api_backlinks, extract_api_links, extract_api_redirects, extract_canonical_title, extract_links
+from redirects import RedirectMap
+import os
 import numpy as np
-from scipy.spatial.distance import cosine
 
-fasttext.util.download_model('en', if_exists='ignore')
-print("Loading word embeddings")
-model = fasttext.load_model('cc.en.300.bin')
-print("Done loading word embeddings")
+# Precomputed vectors if WIKIPATH_EMBEDDINGS points at a store; fastText is
+# only loaded once a title missing from the store is looked up
+model = EmbeddingStore(os.environ.get("WIKIPATH_EMBEDDINGS"))
+
+# Heuristics shared by every search in this process; saved to
+# WIKIPATH_HEURISTIC_CACHE on exit by the command line tools if it is set
+heuristic_cache = HeuristicCache(model, os.environ.get("WIKIPATH_HEURISTIC_CACHE"))
+
+WIKI_URL = "https://en.wikipedia.org"
+HEADERS = {"User-Agent": "wikipath (https://github.com/jcuhnoio/wikipath)"}
+# Seconds to wait for Wikipedia, so a stalled request cannot hang a search forever
+REQUEST_TIMEOUT = 30
+
+# Reused across requests so connections to Wikipedia are kept alive
+session = requests.Session()
+session.headers.update(HEADERS)
+
+# Shared by every search and every process pointing at the same file
+link_cache = LinkCache(os.environ.get("WIKIPATH_LINK_CACHE", "link_cache.sqlite3"))
+backlink_cache = LinkCache(link_cache.path, table="backlinks")
+
+# Redirects learned from fetches or loaded from a dump, so every variant of a
+# title is cached, fetched and embedded once, under its canonical title
+redirects = RedirectMap(link_cache.path)
+
+# Offline source of links (e.g. an OfflineIndex); when set, nothing is scraped
+link_source = None
+
+# Ask the MediaWiki API for the links of an article instead of parsing its page
+# (every link of the page, in title order, rather than the body content's)
+links_from_api = os.environ.get("WIKIPATH_LINKS_API") == "1"
+
+
+def use_link_source(source):
+    """
+    Answer every link lookup from an offline source instead of Wikipedia.
+
+    Args:
+        source: an object with links(title) and backlinks(title) methods, such
+            as an OfflineIndex, or None to go back to scraping.
+    """
+    global link_source
+    link_source = source
+
+def use_model(embeddings, heuristic_cache_path=None):
+    """
+    Embed titles with another model, such as a deterministic stand-in for
+    fastText, and start a new shared heuristic cache on it, so nothing
+    computed with the previous model is reused.
+
+    Args:
+        embeddings: an object with get_word_vector and get_word_vectors methods.
+        heuristic_cache_path: .npz file of the new heuristic cache, or None to
+            keep it in memory only.
+    """
+    global model, heuristic_cache
+    model = embeddings
+    heuristic_cache = HeuristicCache(model, heuristic_cache_path)
+
+def canonical_title(article):
+    """
+    Gets the canonical title of an article as far as it is known, without
+    fetching anything.
+    """
+    if link_source is not None:
+        return link_source.canonical(article) if hasattr(link_source, "canonical") else article
+    return redirects.canonical(article)
+
+def resolve_title(article):
+    """
+    Gets the canonical title of an article, fetching the article first if
+    needed so a redirect is found out about. Its links are cached on the way.
+    """
+    if link_source is None:
+        get_links(article)
+    return canonical_title(article)
 
 def get_html(URL):
     """
     Gets html from a URL.
+
+    Raises:
+        requests.HTTPError: if the page could not be served (404, 429, 5xx, ...),
+            so error pages are never cached as articles without links.
     """
-    response = requests.get(URL)
+    response = session.get(URL, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
 
     return response.text
 
 
+def get_links(article):
+    """
+    Gets the titles of all the article links of a wiki page, from the link
+    cache if possible and from Wikipedia otherwise.
+
+    Args:
+        article (string): Title of the article.
+
+    Returns:
+        links (list of strings): Titles of the linked articles.
+    """
+    if link_source is not None:
+        return link_source.links(article)
+
+    article = redirects.canonical(article)
+    links = link_cache.get(article)
+    if links is None:
+        if links_from_api:
+            links = get_api_links(article)
+            link_cache.put(redirects.canonical(article), links)
+        else:
+            with instrumentation.phase("http"):
+                html = get_html(WIKI_URL + '/wiki/' + article.replace(" ", "_"))
+            links = store_page(article, html)
+        instrumentation.count("pages_fetched")
+    else:
+        instrumentation.count("cache_hits")
+    return links
+
+
+def store_page(article, html):
+    """
+    Extracts the links of a fetched wiki page and caches them under the
+    page's canonical title, learning the redirect if the article is one.
+
+    Args:
+        article (string): Title the page was fetched under.
+        html (string): The html of the page.
+
+    Returns:
+        links (list of strings): Titles of the linked articles.
+    """
+    with instrumentation.phase("parse"):
+        links = extract_links(html)
+        canonical = extract_canonical_title(html)
+    if canonical is not None:
+        redirects.add(article, canonical)
+    link_cache.put(redirects.canonical(article), links)
+    return links
+
+
+def get_api_links(article, limit=5000):
+    """
+    Gets the titles of the articles linked from a wiki page with the MediaWiki API.
+
+    Args:
+        article (string): Title of the article.
+        limit (int): Maximum number of links fetched from the API.
+
+    Returns:
+        links (list of strings): Titles of the linked articles.
+    """
+    links = []
+    params = {
+        "action": "query", "prop": "links", "titles": article, "redirects": 1,
+        "plnamespace": 0, "pllimit": "max", "format": "json",
+    }
+    while len(links) < limit:
+        with instrumentation.phase("http"):
+            response = session.get(WIKI_URL + "/w/api.php", params=params, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            data = response.json()
+        redirects.add_many(extract_api_redirects(data))
+        links += extract_api_links(data)
+        if "continue" not in data:
+            break
+        params.update(data["continue"])
+    return links
+
+
+def get_backlinks(article, limit=None):
+    """
+    Gets the titles of the articles linking to a wiki page, from the link
+    cache if possible and from the MediaWiki API otherwise. Like get_links,
+    only articles count, and an article linking through a redirect links to
+    the page itself. The API lists every link in the wikitext, so a few of
+    these may not be body content links; see LinkProvider.confirm_path.
+
+    Args:
+        article (string): Title of the article.
+        limit (int): Maximum number of backlinks fetched from the API, or None
+            for all of them; reaching it is counted as backlinks_truncated.
+
+    Returns:
+        links (list of strings): Titles of the linking articles.
+    """
+    if link_source is not None:
+        return link_source.backlinks(article)
+
+    article = redirects.canonical(article)
+    links = backlink_cache.get(article)
+    if links is not None:
+        instrumentation.count("cache_hits")
+    else:
+        instrumentation.count("pages_fetched")
+        links = []
+        params = {
+            "action": "query", "list": "backlinks", "bltitle": article,
+            "blnamespace": 0, "blredirect": 1, "bllimit": "max", "format": "json",
+        }
+        while limit is None or len(links) < limit:
+            with instrumentation.phase("http"):
+                response = session.get(WIKI_URL + "/w/api.php", params=params, timeout=REQUEST_TIMEOUT)
+                response.raise_for_status()
+                data = response.json()
+            titles, aliases = extract_api_backlinks(data)
+            redirects.add_many((alias, article) for alias in aliases)
+            links += titles
+            if "continue" not in data:
+                break
+            params.update(data["continue"])
+        else:
+            instrumentation.count("backlinks_truncated")
+        backlink_cache.put(article, links)
+    return links
+
+
 def get_links_weight_1(graph: Graph, article):
     """
     Gets all the links in the body content of the wiki page.
@@ -31,24 +238,7 @@ def get_links_weight_1(graph: Graph, article):
     Returns:
         A Graph() object.
     """
-    wiki_url = "https://en.wikipedia.org"
-    html = get_html(wiki_url + "/wiki/" + article)
-    soup = BeautifulSoup(html, "html.parser")
-    container_div = soup.find("div", class_="mw-body-content")
-    anchors = container_div.find_all("a")
-
-    # Apply filters so that it only returns wikipedia links.
-    anchors = [a for a in anchors if not a.get("class")]
-    anchors = [a for a in anchors if a.get("href").startswith("/wiki")]
-    anchors = [a for a in anchors if 'title' in a.attrs]
-    anchors = [a for a in anchors if 'Wikipedia:' not in a.attrs['title']]
-    anchors = [a for a in anchors if 'Template:' not in a.attrs['title']]
-    anchors = [a for a in anchors if 'Special:' not in a.attrs['title']]
-    anchors = [a for a in anchors if 'Talk:' not in a.attrs['title']]
-
-
-    for a in anchors:
-        anchor_title = a.attrs['title']
+    for anchor_title in get_links(article):
         graph.add_edge(article, anchor_title, 1)
     return graph
 
@@ -67,37 +257,35 @@ def get_links_and_weights(graph: Graph, article, end_vector):
     Returns:
         A Graph() object.
     """
+    # Weigh each distinct link once, all in a single vectorized call
+    titles = list(dict.fromkeys(get_links(article)))
+    for anchor_title, weight in zip(titles, weigh_links(titles, end_vector).tolist()):
+        graph.add_edge(article, anchor_title, weight)
 
-    wiki_url = "https://en.wikipedia.org"
-    html = get_html(wiki_url + '/wiki/' + article.replace(" ", "_"))
-    soup = BeautifulSoup(html, "html.parser")
-
-    # Compute title vector once
-    title_vector = model.get_word_vector(article)
+    return graph
 
-    # Retrieve links and filter in a single loop
-    container_div = soup.find("div", class_="mw-body-content")
-    for a in container_div.find_all("a", href=True):
-        if (
-            not a.get("class")  # Exclude links with a class attribute
-            and a['href'].startswith("/wiki")  # Only internal Wikipedia links
-            and 'title' in a.attrs  # Ensure a title attribute exists
-            and not any(prefix in a['title'] for prefix in ["Wikipedia:", "Template:", "Special:", "Talk:", "Portal:"])
-        ):
-            anchor_title = a['title']
-            link_vector = model.get_word_vector(anchor_title)
 
-            # Directly calculate and add the heuristic distance
-            similarity = 1 - cosine(end_vector, link_vector)
-            weight = (1 - similarity) + 1e-5
-            graph.add_edge(article, anchor_title, weight)
+def weigh_links(titles, end_vector):
+    """
+    Computes the weights of links to the given articles: the cosine distance
+    between the embedding of each title and the goal, plus 1e-5. This is also
+    the A* heuristic of each of those articles.
 
-    return graph
+    Args:
+        titles (list of strings): Titles of the linked articles.
+        end_vector (numpy array): Embedding of the goal article.
 
-def find_heuristic(start, end):
-        similarity = 1 - cosine(start, end)
-        heuristic = (1 - similarity) + 1e-5
-        return heuristic
+    Returns:
+        weights (numpy array): One weight per title.
+    """
+    if not titles:
+        return np.zeros(0, dtype=np.float32)
+    vectors = model.get_word_vectors(titles)
+    norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(end_vector)
+    dots = vectors @ end_vector
+    # Zero vectors count as unrelated rather than producing NaN
+    similarity = np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+    return (1 - similarity) + 1e-5
 
 if __name__ == "__main__":
     test_graph = Graph({})
@@ -0,0 +1,256 @@
+"""
+Path query service: a local HTTP/JSON server that keeps the embeddings, the
+discovered links and the heuristic cache warm across requests.
+
+Run with:
+    python3 server.py --port 8080 --workers 4 --index index/
+
+Query with:
+    curl 'localhost:8080/path?start=Albert%20Einstein&end=Kevin%20Bacon&algorithm=astar'
+    curl -d '{"start": "A", "end": "B", "max_nodes": 2000, "timeout": 5}' localhost:8080/path
+
+A query accepts start, end, algorithm (dijkstra, astar or bellman-ford),
+bidirectional, max_nodes and timeout, and for astar epsilon (anytime
+weighted A*) or beam_width (beam search). The response holds the path, its
+cost and suboptimality bound, the number of articles expanded, the elapsed
+time, the search stats and an error, if any. GET /stats reports the state of
+the caches.
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import click
+
+import scraper
+from batch import ALGORITHMS, find_path
+from instrumentation import Budget, SearchStats
+from neighbors import LinkProvider
+from offline_index import OfflineIndex
+
+# Numeric query fields and their types; all of them must be positive
+NUMBER_FIELDS = {"max_nodes": int, "timeout": float, "epsilon": float, "beam_width": int}
+
+
+class PathService:
+    def __init__(self, workers: int = 4, queue_size: int = 16, max_nodes: int = 20000, timeout: float = 60.0) -> None:
+        """
+        Initialize the PathService object, which answers queries on a bounded
+        pool of threads. Every query runs on the same LinkProvider, so links
+        and weights discovered by one query are reused by the next.
+
+        Args:
+            workers: number of queries searched at once.
+            queue_size: number of queries allowed to wait for a worker; more are rejected.
+            max_nodes: default and maximum node budget of a query.
+            timeout: default and maximum number of seconds a query may search.
+        """
+        self.provider = LinkProvider()
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix="search")
+        self.slots = threading.BoundedSemaphore(workers + queue_size)
+        self.max_nodes = max_nodes
+        self.timeout = timeout
+        self.served = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def query(self, params: dict):
+        """
+        Run a query on the pool and wait for it.
+
+        Args:
+            params: the query fields, see the module docstring.
+
+        Returns:
+            The response dictionary, or None if the service is too busy.
+        """
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.rejected += 1
+            return None
+        try:
+            return self.pool.submit(self.solve, params).result()
+        finally:
+            self.slots.release()
+
+    def solve(self, params: dict) -> dict:
+        """
+        Search for one path in a worker thread, within the query's budget.
+        The numeric fields of params must already be converted to numbers.
+        """
+        start, end = params["start"], params["end"]
+        # Clients can only lower the budgets
+        max_nodes = min(params.get("max_nodes", self.max_nodes), self.max_nodes)
+        timeout = min(params.get("timeout", self.timeout), self.timeout)
+        stats = SearchStats(hooks=[Budget(max_nodes, timeout)])
+        search = ALGORITHMS[params.get("algorithm", "astar")]({}, provider=self.provider, stats=stats)
+
+        start_time = time.time()
+        try:
+            path = find_path(
+                search, start, end, bool(params.get("bidirectional", False)),
+                params.get("epsilon"), params.get("beam_width"),
+            )
+            # Set if a budget ran out before a path was found
+            cost, expanded, error = search.cost, search.expanded, search.error
+        except Exception as e:
+            path, cost, expanded, error = [], None, None, repr(e)
+        with self.lock:
+            self.served += 1
+        return {
+            "start": start,
+            "end": end,
+            "path": path,
+            "cost": cost,
+            "bound": getattr(search, "bound", None) if cost is not None else None,
+            "expanded": expanded,
+            "elapsed": time.time() - start_time,
+            "stats": stats.as_dict(),
+            "error": error,
+        }
+
+    def status(self) -> dict:
+        """
+        Get the state of the service and its caches.
+        """
+        heuristics = scraper.heuristic_cache
+        return {
+            "served": self.served,
+            "rejected": self.rejected,
+            "articles_expanded": len(self.provider),
+            "titles_known": len(self.provider.graph),
+            "link_cache": {"hits": scraper.link_cache.hits, "misses": scraper.link_cache.misses},
+            "redirects_known": len(scraper.redirects),
+            "heuristic_cache": {
+                "entries": len(heuristics),
+                "hits": heuristics.hits,
+                "misses": heuristics.misses,
+                "evictions": heuristics.evictions,
+            },
+        }
+
+    def close(self) -> None:
+        """
+        Wait for the running queries and stop the workers.
+        """
+        self.pool.shutdown()
+
+
+class PathRequestHandler(BaseHTTPRequestHandler):
+    # Set by main before the server starts
+    service = None
+
+    def do_GET(self):
+        """
+        Answer GET /path?start=...&end=..., GET /stats and GET /health.
+        """
+        url = urlsplit(self.path)
+        if url.path == "/path":
+            self.answer_query(dict(parse_qsl(url.query)))
+        elif url.path == "/stats":
+            self.send_json(200, self.service.status())
+        elif url.path == "/health":
+            self.send_json(200, {"status": "ok"})
+        else:
+            self.send_json(404, {"error": f"unknown endpoint {url.path}"})
+
+    def do_POST(self):
+        """
+        Answer POST /path with a JSON object of query fields.
+        """
+        if urlsplit(self.path).path != "/path":
+            self.send_json(404, {"error": f"unknown endpoint {self.path}"})
+            return
+        try:
+            params = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        except json.JSONDecodeError as e:
+            self.send_json(400, {"error": f"invalid JSON: {e}"})
+            return
+        self.answer_query(params)
+
+    def answer_query(self, params: dict) -> None:
+        """
+        Validate a query, run it and send the response.
+        """
+        if not isinstance(params, dict) or not params.get("start") or not params.get("end"):
+            self.send_json(400, {"error": "start and end are required"})
+            return
+        if params.get("algorithm", "astar") not in ALGORITHMS:
+            self.send_json(400, {"error": f"algorithm must be one of {', '.join(ALGORITHMS)}"})
+            return
+        if isinstance(params.get("bidirectional"), str):
+            params["bidirectional"] = params["bidirectional"].lower() in ("1", "true", "yes")
+        try:
+            for field, kind in NUMBER_FIELDS.items():
+                if field in params:
+                    value = float(params[field])
+                    # Also rejects NaN, and fractions of the integer fields
+                    if not value > 0 or (kind is int and not value.is_integer()):
+                        raise ValueError(field)
+                    params[field] = kind(value)
+        except (TypeError, ValueError):
+            self.send_json(400, {"error": "max_nodes and beam_width must be positive integers, timeout and epsilon positive numbers"})
+            return
+
+        result = self.service.query(params)
+        if result is None:
+            self.send_json(503, {"error": "too many queries in progress, retry later"})
+        else:
+            self.send_json(200, result)
+
+    def send_json(self, status: int, body: dict) -> None:
+        """
+        Send a JSON response.
+        """
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        """
+        Log requests only in verbose mode.
+        """
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+# Run with: `python3 server.py --port PORT`
+@click.command()
+@click.option('--host', type=str, default='127.0.0.1', help='Address to listen on')
+@click.option('--port', type=int, default=8080, help='Port to listen on')
+@click.option('--workers', type=int, default=4, help='Number of queries searched at once')
+@click.option('--queue-size', type=int, default=16, help='Number of queries allowed to wait for a worker')
+@click.option('--max-nodes', type=int, default=20000, help='Node budget of a query')
+@click.option('--timeout', type=float, default=60.0, help='Seconds a query may search')
+@click.option('--index', type=str, default=None, help='Directory of an offline link index to search instead of scraping')
+@click.option('--verbose', is_flag=True, help='Log every request')
+def main(host, port, workers, queue_size, max_nodes, timeout, index, verbose):
+    if index:
+        scraper.use_link_source(OfflineIndex(index))
+    if scraper.model.table is None:
+        # Load fastText now rather than in the first query
+        scraper.model.get_word_vector("")
+
+    service = PathService(workers, queue_size, max_nodes, timeout)
+    PathRequestHandler.service = service
+    server = ThreadingHTTPServer((host, port), PathRequestHandler)
+    server.verbose = verbose
+    print(f"Serving path queries on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        scraper.heuristic_cache.save()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,496 @@
+"""
+Compact binary snapshots of graphs, so what a crawl or a search discovered
+can be saved and reloaded without refetching it. The writer streams the
+adjacency in blocks as it goes; the reader memory maps the file and decodes
+only the blocks of the vertices asked for, so it serves as a graph right
+away, whatever its size.
+
+Layout, all little endian:
+    header        magic, version, weight and compression codes, counts and section offsets
+    blocks        adjacency records of consecutive vertices, each block compressed on its own
+    title table   title offsets, ids sorted by title and the UTF-8 titles, as in offline_index
+    block table   file offset, length, record and edge count of every block
+    vertex table  block of every vertex's record, -1 for vertices without links
+
+A block holds, before compression, its record count, edge count and the
+byte lengths of three varint sections: the source vertices, their degrees,
+and their sorted targets delta encoded per record; then the raw weights.
+
+Run with:
+    python3 snapshot.py --index index/ --out wiki.snap
+    python3 snapshot.py --snapshot wiki.snap --seed "Kevin Bacon" --max-vertices 300 --out sample.graphml
+"""
+
+import gzip
+import mmap
+import struct
+from array import array
+from collections import OrderedDict
+
+import click
+import networkx as nx
+import numpy as np
+
+from compact_graph import CompactAdjacency
+from graph import sample_subgraph
+from offline_index import OfflineIndex, TitleTable, encode_title_table
+
+MAGIC = b"WPSNAP\x00\x00"
+VERSION = 1
+HEADER = struct.Struct("<8sHBBIQQQQQQQ")
+BLOCK_HEADER = struct.Struct("<IIIII")
+BLOCK_TABLE = np.dtype([("offset", "<u8"), ("length", "<u8"), ("records", "<u4"), ("edges", "<u4")])
+WEIGHTS = {None: 0, "float16": 1, "float32": 2}
+COMPRESSIONS = {None: 0, "gzip": 1, "zstd": 2}
+
+
+def encode_varints(values) -> bytes:
+    """
+    Encode non-negative integers below 2^35 as LEB128 varints: 7 bits per
+    byte, the high bit set on every byte but the last of a value.
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    lengths = np.ones(len(values), dtype=np.int64)
+    for shift in (7, 14, 21, 28):
+        lengths += values >= (1 << shift)
+    starts = np.cumsum(lengths) - lengths
+    out = np.empty(int(lengths.sum()), dtype=np.uint8)
+    for byte in range(5):
+        has_byte = lengths > byte
+        more = (lengths[has_byte] > byte + 1).astype(np.uint8) << 7
+        out[starts[has_byte] + byte] = ((values[has_byte] >> np.uint64(7 * byte)) & np.uint64(0x7F)).astype(np.uint8) | more
+    return out.tobytes()
+
+
+def decode_varints(data: bytes):
+    """
+    Decode the LEB128 varints written by encode_varints.
+
+    Returns:
+        int64 array of the values.
+    """
+    data = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(data < 0x80) + 1
+    starts = np.concatenate([[0], ends[:-1]])
+    lengths = ends - starts
+    values = np.zeros(len(ends), dtype=np.int64)
+    for byte in range(int(lengths.max(initial=0))):
+        has_byte = lengths > byte
+        values[has_byte] |= (data[starts[has_byte] + byte] & 0x7F).astype(np.int64) << (7 * byte)
+    return values
+
+
+def compress(data: bytes, compression: str) -> bytes:
+    """
+    Compress a block. zstd needs the zstandard package.
+    """
+    if compression == "gzip":
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    if compression == "zstd":
+        import zstandard
+
+        return zstandard.ZstdCompressor().compress(data)
+    return data
+
+
+def decompress(data: bytes, compression: str) -> bytes:
+    """
+    Decompress a block written by compress.
+    """
+    if compression == "gzip":
+        return gzip.decompress(data)
+    if compression == "zstd":
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+
+class SnapshotWriter:
+    def __init__(self, path: str, weights: str = "float32", compression: str = "gzip", block_edges: int = 65536) -> None:
+        """
+        Initialize the SnapshotWriter object. Records are buffered until a
+        block holds block_edges edges and then written out, so memory only
+        grows with the number of titles. The header is completed by close.
+
+        Args:
+            path: file to write the snapshot to
+            weights: "float32", "float16", or None to store no weights (every edge weighs 1).
+            compression: "gzip", "zstd", or None.
+            block_edges: number of edges per block; smaller blocks make single lookups cheaper.
+        """
+        if weights not in WEIGHTS:
+            raise ValueError(f"weights must be one of {list(WEIGHTS)}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"compression must be one of {list(COMPRESSIONS)}")
+        self.weights = weights
+        self.compression = compression
+        self.block_edges = block_edges
+        self.ids = {}
+        self.titles = []
+        self.vertex_blocks = []
+        self.blocks = []
+        self.records = []
+        self.buffered_edges = 0
+        self.num_edges = 0
+        self.file = open(path, "wb")
+        self.file.write(bytes(HEADER.size))
+
+    def intern(self, title: str) -> int:
+        """
+        Get the id of a title, adding it if needed.
+        """
+        node = self.ids.get(title)
+        if node is None:
+            node = self.ids[title] = len(self.titles)
+            self.titles.append(title)
+            self.vertex_blocks.append(-1)
+        return node
+
+    def add(self, title: str, neighbors) -> None:
+        """
+        Write the outgoing edges of a vertex.
+
+        Args:
+            title: the vertex
+            neighbors: {neighbor: weight} dict, or a list of neighbors if the snapshot has no weights.
+        """
+        if hasattr(neighbors, "items"):
+            pairs = list(neighbors.items())
+            targets = [self.intern(neighbor) for neighbor, _ in pairs]
+            weights = [weight for _, weight in pairs]
+        else:
+            targets = [self.intern(neighbor) for neighbor in dict.fromkeys(neighbors)]
+            weights = None
+        self.add_ids(self.intern(title), targets, weights)
+
+    def add_ids(self, source: int, targets, weights=None) -> None:
+        """
+        Write the outgoing edges of a vertex given by ids from intern.
+
+        Args:
+            source: id of the vertex
+            targets: ids of its neighbors
+            weights: weights of the edges, or None for weight 1.
+        """
+        if self.vertex_blocks[source] != -1:
+            raise ValueError(f"{self.titles[source]!r} was already written")
+        targets = np.asarray(targets, dtype=np.int64)
+        if weights is None or self.weights is None:
+            self.records.append((source, np.sort(targets), None))
+        else:
+            order = np.argsort(targets, kind="stable")
+            self.records.append((source, targets[order], np.asarray(weights, dtype=np.float32)[order]))
+        self.vertex_blocks[source] = len(self.blocks)
+        self.buffered_edges += len(targets)
+        if self.buffered_edges >= self.block_edges:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write the buffered records as one block.
+        """
+        if not self.records:
+            return
+        sources = [source for source, _, _ in self.records]
+        degrees = np.array([len(targets) for _, targets, _ in self.records], dtype=np.int64)
+        targets = np.concatenate([targets for _, targets, _ in self.records])
+        # Each record's targets are sorted, so the first is kept and the rest become gaps
+        deltas = np.diff(targets, prepend=0)
+        firsts = (np.cumsum(degrees) - degrees)[degrees > 0]
+        deltas[firsts] = targets[firsts]
+        sections = [encode_varints(sources), encode_varints(degrees), encode_varints(deltas)]
+        if self.weights is not None:
+            weights = np.concatenate([
+                np.ones(len(targets), dtype=np.float32) if weights is None else weights
+                for _, targets, weights in self.records
+            ])
+            sections.append(weights.astype(self.weights).tobytes())
+        payload = BLOCK_HEADER.pack(len(sources), len(deltas), *map(len, sections[:3])) + b"".join(sections)
+        data = compress(payload, self.compression)
+
+        self.blocks.append((self.file.tell(), len(data), len(sources), len(deltas)))
+        self.file.write(data)
+        self.num_edges += len(deltas)
+        self.records = []
+        self.buffered_edges = 0
+
+    def close(self) -> None:
+        """
+        Write the last block, the tables and the header, and close the file.
+        """
+        self.flush()
+        titles, title_offsets, title_order = encode_title_table(self.titles)
+        titles_offset = self.align()
+        self.file.write(title_offsets.astype("<i8").tobytes())
+        self.file.write(title_order.astype("<i4").tobytes())
+        self.file.write(titles.tobytes())
+        blocks_offset = self.align()
+        self.file.write(np.array(self.blocks, dtype=BLOCK_TABLE).tobytes())
+        vertex_blocks_offset = self.align()
+        self.file.write(np.array(self.vertex_blocks, dtype="<i4").tobytes())
+
+        self.file.seek(0)
+        self.file.write(HEADER.pack(
+            MAGIC, VERSION, WEIGHTS[self.weights], COMPRESSIONS[self.compression], 0,
+            len(self.titles), self.num_edges, len(self.blocks),
+            titles_offset, len(titles), blocks_offset, vertex_blocks_offset,
+        ))
+        self.file.close()
+
+    def align(self) -> int:
+        """
+        Pad the file to a multiple of 8 bytes, so the tables can be viewed as arrays in place.
+        """
+        position = self.file.tell()
+        self.file.write(bytes(-position % 8))
+        return position + -position % 8
+
+    def __enter__(self):
+        """
+        When used in a with statement
+        """
+        return self
+
+    def __exit__(self, *exc_info):
+        """
+        When leaving a with statement; the snapshot is completed even on errors
+        """
+        self.close()
+
+
+class GraphSnapshot:
+    def __init__(self, path: str, max_blocks: int = 64) -> None:
+        """
+        Initialize the GraphSnapshot object, a read-only dict-of-dicts graph
+        backed by a memory-mapped snapshot file. Opening it reads only the
+        header; decoded blocks are kept in least recently used order.
+
+        Args:
+            path: file written by a SnapshotWriter
+            max_blocks: number of decoded blocks kept in memory
+        """
+        self.file = open(path, "rb")
+        self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic, version, weights, compression, _, num_vertices, self.num_edges, num_blocks,
+            titles_offset, titles_length, blocks_offset, vertex_blocks_offset,
+        ) = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a graph snapshot")
+        if version != VERSION:
+            raise ValueError(f"{path} is a version {version} snapshot, expected version {VERSION}")
+        self.weights = {code: name for name, code in WEIGHTS.items()}[weights]
+        self.compression = {code: name for name, code in COMPRESSIONS.items()}[compression]
+
+        def view(dtype, count, offset):
+            return np.frombuffer(self.buffer, dtype=dtype, count=count, offset=offset)
+
+        title_offsets = view("<i8", num_vertices + 1, titles_offset)
+        title_order = view("<i4", num_vertices, titles_offset + 8 * (num_vertices + 1))
+        titles = view(np.uint8, titles_length, titles_offset + 12 * num_vertices + 8)
+        self.table = TitleTable(arrays=(titles, title_offsets, title_order))
+        self.blocks = view(BLOCK_TABLE, num_blocks, blocks_offset)
+        self.vertex_blocks = view("<i4", num_vertices, vertex_blocks_offset)
+        self.max_blocks = max_blocks
+        self.decoded = OrderedDict()
+
+    def title(self, node: int) -> str:
+        """
+        Get the title of a vertex id.
+        """
+        return self.table.title(node)
+
+    def id(self, title: str):
+        """
+        Get the id of a title.
+
+        Returns:
+            The id, or None if the title is not in the snapshot.
+        """
+        return self.table.id(title)
+
+    def block(self, number: int) -> tuple:
+        """
+        Get a block from the decoded blocks, decoding it if needed.
+        """
+        block = self.decoded.get(number)
+        if block is not None:
+            self.decoded.move_to_end(number)
+            return block
+        block = self.decoded[number] = self.decode(number)
+        if len(self.decoded) > self.max_blocks:
+            self.decoded.popitem(last=False)
+        return block
+
+    def decode(self, number: int) -> tuple:
+        """
+        Decode a block.
+
+        Returns:
+            The ({source: (start, end)} spans, targets, weights) of its records.
+        """
+        offset, length = int(self.blocks[number]["offset"]), int(self.blocks[number]["length"])
+        payload = decompress(self.buffer[offset:offset + length], self.compression)
+        records, edges, *lengths = BLOCK_HEADER.unpack_from(payload, 0)
+        position = BLOCK_HEADER.size
+        sections = []
+        for length in lengths:
+            sections.append(decode_varints(payload[position:position + length]))
+            position += length
+        sources, degrees, deltas = sections
+
+        ends = np.cumsum(degrees)
+        starts = ends - degrees
+        # Undo the gaps within each record: running sum minus the sum before the record
+        totals = np.cumsum(deltas)
+        before = np.concatenate([[0], totals])[starts]
+        targets = totals - np.repeat(before, degrees)
+        if self.weights is None:
+            weights = np.ones(edges, dtype=np.float32)
+        else:
+            weights = np.frombuffer(payload, dtype=self.weights, count=edges, offset=position)
+        spans = dict(zip(sources.tolist(), zip(starts.tolist(), ends.tolist())))
+        return spans, targets, weights
+
+    def neighbor_ids(self, node: int) -> tuple:
+        """
+        Get the ids and weights of the neighbors of a vertex id, sorted by id.
+        """
+        number = int(self.vertex_blocks[node])
+        if number < 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        spans, targets, weights = self.block(number)
+        start, end = spans[node]
+        return targets[start:end], weights[start:end]
+
+    def iter_edges(self):
+        """
+        Iterate over the edges a block at a time, without keeping the blocks.
+
+        Yields:
+            (sources, targets, weights) arrays of the edges of one block.
+        """
+        for number in range(len(self.blocks)):
+            spans, targets, weights = self.decode(number)
+            sources = np.repeat(list(spans), [end - start for start, end in spans.values()])
+            yield sources, targets, weights
+
+    def to_adjacency(self) -> CompactAdjacency:
+        """
+        Load the whole graph into a CompactAdjacency, e.g. to extend it with a new crawl.
+        """
+        adjacency = CompactAdjacency()
+        for node in range(len(self)):
+            adjacency.intern(self.title(node))
+        for number in range(len(self.blocks)):
+            spans, targets, weights = self.decode(number)
+            targets, weights = targets.astype(np.int32), weights.astype(np.float32)
+            # Ids are kept, so each vertex's arrays are copied in whole
+            for source, (start, end) in spans.items():
+                adjacency.targets[source] = array("i", targets[start:end].tobytes())
+                adjacency.weights[source] = array("f", weights[start:end].tobytes())
+        return adjacency
+
+    def items(self):
+        """
+        Iterate over (title, neighbors) pairs of the vertices with links, like dict.items().
+        """
+        for node in range(len(self)):
+            if self.vertex_blocks[node] >= 0:
+                title = self.title(node)
+                yield title, self[title]
+
+    def close(self) -> None:
+        """
+        Release the file.
+        """
+        self.decoded.clear()
+        self.table = self.blocks = self.vertex_blocks = None
+        self.buffer.close()
+        self.file.close()
+
+    def __getitem__(self, title: str):
+        """
+        When called as snapshot[title]; a dict of the neighbors and their weights
+        """
+        node = self.id(title)
+        if node is None:
+            raise KeyError(title)
+        targets, weights = self.neighbor_ids(node)
+        return dict(zip(map(self.title, targets.tolist()), weights.tolist()))
+
+    def __contains__(self, title: str):
+        """
+        When called with `in`
+        """
+        return self.id(title) is not None
+
+    def __iter__(self):
+        """
+        When called in for loop
+        """
+        return (self.title(node) for node in range(len(self)))
+
+    def __len__(self):
+        """
+        When called in len()
+        """
+        return len(self.vertex_blocks)
+
+
+def write_snapshot(path: str, graph_dict, weights: str = "float32", compression: str = "gzip") -> None:
+    """
+    Write a dict-of-dicts graph, such as a Graph's graph or a CompactAdjacency, as a snapshot.
+    """
+    with SnapshotWriter(path, weights, compression) as writer:
+        for vertex, neighbors in graph_dict.items():
+            writer.add(vertex, neighbors)
+
+
+def write_provider_snapshot(path: str, provider, compression: str = "gzip") -> None:
+    """
+    Write the links a LinkProvider has fetched so far as a snapshot without
+    weights, since the link weights depend on the goal of each query.
+    """
+    with SnapshotWriter(path, None, compression) as writer:
+        # Its title ids are reused as they are, so the links need no lookups
+        graph = provider.graph
+        for title in list(graph.titles):
+            writer.intern(title)
+        for node in range(len(writer.titles)):
+            links = graph.neighbor_ids(node)
+            if links is not None:
+                writer.add_ids(node, provider.resolve(links))
+
+
+# Run with: `python3 snapshot.py --index DIR --out FILE` or `python3 snapshot.py --snapshot FILE --seed TITLE --out FILE.graphml`
+@click.command()
+@click.option('--index', type=str, default=None, help='Directory of an offline link index to write as a snapshot')
+@click.option('--snapshot', type=str, default=None, help='Snapshot to export a sample of for visualization')
+@click.option('--compression', type=click.Choice(['gzip', 'zstd', 'none']), default='gzip', help='Compression of the blocks')
+@click.option('--seed', type=str, multiple=True, help='Title the sample is grown from; may be repeated')
+@click.option('--max-vertices', type=int, default=200, help='Number of vertices in the sample')
+@click.option('--out', type=str, help='Snapshot file to write, or GraphML file for the sample')
+def main(index, snapshot, compression, seed, max_vertices, out):
+    if index:
+        offline_index = OfflineIndex(index)
+        with SnapshotWriter(out, None, None if compression == "none" else compression) as writer:
+            for node in range(len(offline_index)):
+                writer.intern(offline_index.title(node))
+            for node in range(len(offline_index)):
+                writer.add_ids(node, offline_index.neighbor_ids(node))
+        print(f"{len(offline_index)} articles, {writer.num_edges} links written to {out}")
+    else:
+        graph = GraphSnapshot(snapshot)
+        sample = sample_subgraph(graph, list(seed) or None, max_vertices)
+        G = nx.DiGraph()
+        G.add_nodes_from(sample)
+        G.add_weighted_edges_from(
+            (vertex, neighbor, weight) for vertex, neighbors in sample.items() for neighbor, weight in neighbors.items()
+        )
+        nx.write_graphml(G, out)
+        print(f"{G.number_of_nodes()} articles, {G.number_of_edges()} links written to {out}")
+
+if __name__ == "__main__":
+    main()
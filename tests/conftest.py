@@ -0,0 +1,91 @@
+"""
+Shared fixtures. The modules live at the top of the repository and scraper
+opens its caches on import, so both are set up before any test imports them.
+"""
+
+import http.server
+import os
+import sys
+import tempfile
+import threading
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Keep the link cache of the working copy out of the tests
+os.environ["WIKIPATH_LINK_CACHE"] = os.path.join(tempfile.mkdtemp(), "link_cache.sqlite3")
+
+
+def wiki_page(title: str, links: list) -> str:
+    """
+    Render a minimal article the way Wikipedia lays it out: a canonical link
+    in the head and the article links inside the mw-body-content div, next to
+    navigation links outside of it that must be ignored.
+    """
+    anchors = "".join(f'<p><a href="/wiki/{link.replace(" ", "_")}" title="{link}">{link}</a></p>' for link in links)
+    return (
+        f'<html><head><link rel="canonical" href="https://en.wikipedia.org/wiki/{title.replace(" ", "_")}"></head>'
+        f'<body><div id="mw-navigation"><a href="/wiki/Main_Page" title="Main Page">Main page</a></div>'
+        f'<div id="bodyContent" class="vector-body mw-body-content"><div class="mw-parser-output">{anchors}'
+        f'<a href="/wiki/Help:Contents" class="mw-redirect" title="Help:Contents">help</a></div></div></body></html>'
+    )
+
+
+class StubWiki:
+    def __init__(self) -> None:
+        """
+        Initialize the StubWiki object, a local HTTP server answering /wiki/TITLE
+        with canned article pages.
+        """
+        # title: links, or the status code to answer with instead of a page
+        self.pages = {}
+        # alias: title of the article its page is served as
+        self.redirects = {}
+        self.headers = {}
+        self.requests = []
+        stub = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                title = self.path.split("/wiki/", 1)[-1].replace("_", " ")
+                stub.requests.append(title)
+                article = stub.redirects.get(title, title)
+                page = stub.pages.get(article, 404)
+                status, body = (page, "<html>error</html>") if isinstance(page, int) else (200, wiki_page(article, page))
+                data = body.encode()
+                self.send_response(status)
+                for name, value in stub.headers.get(title, {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_wiki(tmp_path, monkeypatch):
+    """
+    A StubWiki that scraper fetches from, with a fresh link cache and redirect map.
+    """
+    import scraper
+    from link_cache import LinkCache
+    from redirects import RedirectMap
+
+    wiki = StubWiki()
+    path = str(tmp_path / "link_cache.sqlite3")
+    monkeypatch.setattr(scraper, "WIKI_URL", wiki.url)
+    monkeypatch.setattr(scraper, "link_cache", LinkCache(path))
+    monkeypatch.setattr(scraper, "redirects", RedirectMap(path))
+    yield wiki
+    wiki.close()
@@ -0,0 +1,9 @@
+-- MySQL dump of a tiny synthetic linktarget table
+DROP TABLE IF EXISTS `linktarget`;
+CREATE TABLE `linktarget` (
+  `lt_id` bigint(20) unsigned NOT NULL AUTO_INCREMENT,
+  `lt_namespace` int(11) NOT NULL,
+  `lt_title` varbinary(255) NOT NULL,
+  PRIMARY KEY (`lt_id`)
+);
+INSERT INTO `linktarget` VALUES (10,0,'Beta'),(11,0,'Gamma_ray'),(12,0,'USA'),(13,0,'Delta'),(14,2,'Example_user'),(15,0,'Missing_page'),(16,0,'Alpha'),(17,0,'O\'Brien');
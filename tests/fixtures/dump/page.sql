@@ -0,0 +1,12 @@
+-- MySQL dump of a tiny synthetic page table
+DROP TABLE IF EXISTS `page`;
+CREATE TABLE `page` (
+  `page_id` int(8) unsigned NOT NULL AUTO_INCREMENT,
+  `page_namespace` int(11) NOT NULL DEFAULT 0,
+  `page_title` varbinary(255) NOT NULL DEFAULT '',
+  `page_is_redirect` tinyint(1) unsigned NOT NULL DEFAULT 0,
+  `page_len` int(8) unsigned NOT NULL DEFAULT 0,
+  PRIMARY KEY (`page_id`)
+);
+INSERT INTO `page` VALUES (1,0,'Alpha',0,120),(2,0,'Beta',0,80),(3,0,'Gamma_ray',0,95),(4,0,'Delta',0,60);
+INSERT INTO `page` VALUES (5,0,'USA',1,20),(6,1,'Alpha',0,10),(7,0,'O\'Brien',0,40);
@@ -0,0 +1,10 @@
+-- MySQL dump of a tiny synthetic pagelinks table, in the layout before MediaWiki 1.43
+DROP TABLE IF EXISTS `pagelinks`;
+CREATE TABLE `pagelinks` (
+  `pl_from` int(8) unsigned NOT NULL DEFAULT 0,
+  `pl_namespace` int(11) NOT NULL DEFAULT 0,
+  `pl_title` varbinary(255) NOT NULL DEFAULT '',
+  `pl_from_namespace` int(11) NOT NULL DEFAULT 0
+);
+INSERT INTO `pagelinks` VALUES (1,0,'Beta',0),(1,0,'Gamma_ray',0),(1,0,'USA',0),(1,0,'Delta',0),(1,2,'Example_user',0);
+INSERT INTO `pagelinks` VALUES (2,0,'Gamma_ray',0),(2,0,'Missing_page',0),(3,0,'Alpha',0),(4,0,'O\'Brien',0),(5,0,'Delta',0),(6,0,'Beta',1);
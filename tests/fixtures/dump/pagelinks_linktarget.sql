@@ -0,0 +1,9 @@
+-- MySQL dump of the same pagelinks table in the layout since MediaWiki 1.43
+DROP TABLE IF EXISTS `pagelinks`;
+CREATE TABLE `pagelinks` (
+  `pl_from` int(8) unsigned NOT NULL DEFAULT 0,
+  `pl_from_namespace` int(11) NOT NULL DEFAULT 0,
+  `pl_target_id` bigint(20) unsigned NOT NULL
+);
+INSERT INTO `pagelinks` VALUES (1,0,10),(1,0,11),(1,0,12),(1,0,13),(1,0,14);
+INSERT INTO `pagelinks` VALUES (2,0,11),(2,0,15),(3,0,16),(4,0,17),(5,0,13),(6,1,10);
@@ -0,0 +1,101 @@
+import random
+
+import pytest
+
+from a_star import AStar
+from anytime import anytime_weighted_astar, beam_search
+from dijkstra import Dijkstra
+from instrumentation import Budget, SearchStats
+from neighbors import GraphProvider
+
+# The direct edge is found first, the path through A is cheaper
+SHORTCUT = {"S": {"A": 1, "G": 10}, "A": {"G": 1}, "G": {}}
+
+
+def random_graph(rng, size=30, degree=3):
+    graph = {f"V{i}": {} for i in range(size)}
+    for vertex in graph:
+        for neighbor in rng.sample(sorted(graph), degree):
+            if neighbor != vertex:
+                graph[vertex][neighbor] = rng.randint(1, 20)
+    return graph
+
+
+def expand(provider, goal):
+    neighbors = provider.for_goal(goal)
+    return neighbors.neighbors, neighbors.heuristic
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_anytime_and_beam_costs_match_dijkstra(seed):
+    rng = random.Random(seed)
+    graph = random_graph(rng)
+    provider = GraphProvider(graph)
+    start, goal = rng.sample(sorted(graph), 2)
+    search = Dijkstra(graph, provider=provider)
+    path = search.find_shortest_path(start, goal)
+    optimal = search.cost if path else float("inf")
+
+    neighbors, heuristic = expand(provider, goal)
+    path, cost, bound, _ = anytime_weighted_astar(start, goal, neighbors, heuristic, epsilon=3.0)
+    # Run to the end, the path is proven optimal
+    assert cost == optimal
+    if path:
+        assert bound == 1.0
+        assert sum(graph[u][v] for u, v in zip(path, path[1:])) == cost
+
+    path, cost, bound, _ = beam_search(start, goal, neighbors, heuristic, width=2)
+    # A narrow beam may miss the optimal path, but the bound accounts for it
+    assert cost >= optimal
+    if path:
+        assert cost / bound <= optimal + 1e-9
+        assert sum(graph[u][v] for u, v in zip(path, path[1:])) == cost
+
+
+def test_anytime_bound_covers_the_vertex_the_budget_stops_at():
+    provider = GraphProvider(SHORTCUT)
+    neighbors, heuristic = expand(provider, "G")
+    stats = SearchStats([Budget(max_nodes=1)])
+
+    with stats.run():
+        path, cost, bound, expanded = anytime_weighted_astar("S", "G", neighbors, heuristic, stats=stats)
+
+    assert path == ["S", "G"]
+    assert cost == 10
+    # A is still to be expanded at g + h = 1, so the optimal cost is only known to be at least 1
+    assert bound == pytest.approx(10)
+    assert expanded == 1
+
+
+def test_anytime_improves_the_first_path_without_a_budget():
+    search = AStar(SHORTCUT)
+    path = search.find_path_anytime("S", "G")
+
+    assert path == ["S", "A", "G"]
+    assert search.cost == 2
+    assert search.bound == 1.0
+
+
+def test_beam_bound_covers_dropped_vertices():
+    graph = {"S": {"A": 1, "B": 2}, "A": {"G": 10}, "B": {"G": 1}, "G": {}}
+    search = AStar(graph)
+    path = search.find_path_beam("S", "G", width=1)
+
+    # B is dropped from the first layer in favour of A
+    assert path == ["S", "A", "G"]
+    assert search.cost == 11
+    assert search.bound == pytest.approx(11 / 2)
+
+
+@pytest.mark.parametrize("bidirectional", [False, True])
+def test_exhausted_budget_ends_the_search_with_an_error(bidirectional):
+    search = AStar(SHORTCUT, stats=SearchStats([Budget(max_nodes=1)]))
+    path = search.find_path_bidirectional("S", "G") if bidirectional else search.find_path("S", "G")
+
+    assert path is None
+    assert search.cost is None
+    assert search.error == "node budget of 1 exceeded"
+
+    search.stats.hooks = []
+    assert search.find_path("S", "G") == ["S", "A", "G"]
+    assert search.error is None
@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from compact_graph import CompactAdjacency
+
+
+def test_lookup_matches_a_dict_of_dicts():
+    rng = random.Random(0)
+    titles = [f"T{i}" for i in range(50)]
+    reference = {title: {} for title in titles}
+    adjacency = CompactAdjacency()
+    for _ in range(2000):
+        source, target = rng.choice(titles), rng.choice(titles)
+        weight = float(rng.randint(1, 100))
+        reference[source][target] = weight
+        adjacency.add_edge(source, target, weight)
+        # Looked up while edges are still being added, so the sorted positions are rebuilt
+        if rng.random() < 0.1:
+            assert adjacency[source][target] == weight
+
+    for source in titles:
+        for target in titles:
+            if target in reference[source]:
+                assert adjacency[source][target] == reference[source][target]
+            else:
+                with pytest.raises(KeyError):
+                    adjacency[source][target]
+    assert adjacency.copy() == reference
+
+
+def test_lookup_after_replacing_the_edges_of_a_vertex():
+    adjacency = CompactAdjacency({"A": {"C": 3, "B": 2}})
+    assert adjacency["A"]["B"] == 2
+
+    adjacency["A"] = {"D": 4}
+    assert adjacency["A"]["D"] == 4
+    with pytest.raises(KeyError):
+        adjacency["A"]["B"]
+    with pytest.raises(KeyError):
+        adjacency["A"]["Unknown"]
+
+
+def test_lookup_without_weights():
+    adjacency = CompactAdjacency(weighted=False)
+    source = adjacency.intern("A")
+    adjacency.set_neighbor_ids(source, [adjacency.intern(title) for title in ["D", "B", "C"]])
+
+    assert adjacency["A"]["C"] == 1
+    assert adjacency.position(source, adjacency.ids["B"]) == 1
+    assert adjacency.position(source, source) is None
+    assert adjacency.position(adjacency.ids["B"], source) is None
+    assert dict(adjacency["A"].items()) == {"D": 1, "B": 1, "C": 1}
@@ -0,0 +1,70 @@
+import pytest
+
+import scraper
+from crawler import Crawler
+
+
+def make_crawler(seeds, **options):
+    # crawl closes the prefetcher when it stops
+    options.setdefault("batch_size", 4)
+    return Crawler(seeds, rate=0, **options)
+
+
+def test_crawl_follows_links_to_max_depth(stub_wiki):
+    stub_wiki.pages = {"Alpha": ["Beta", "Gamma"], "Beta": ["Delta"], "Gamma": ["Alpha"], "Delta": ["Epsilon"]}
+    crawler = make_crawler(["Alpha"], max_depth=2)
+
+    assert crawler.crawl() == 4
+    assert crawler.failed == 0
+    assert sorted(stub_wiki.requests) == ["Alpha", "Beta", "Delta", "Gamma"]
+    assert scraper.link_cache.get("Delta") == ["Epsilon"]
+
+
+@pytest.mark.parametrize("status", [404, 500, 502])
+def test_crawl_retries_error_pages_and_counts_them_failed(stub_wiki, status):
+    stub_wiki.pages = {"Alpha": ["Broken"], "Broken": status}
+    crawler = make_crawler(["Alpha"], retries=2)
+
+    assert crawler.crawl() == 1
+    assert crawler.crawled == 1
+    assert crawler.failed == 1
+    # Fetched once and retried twice, and never cached as an article without links
+    assert stub_wiki.requests.count("Broken") == 3
+    assert scraper.link_cache.get("Broken") is None
+
+
+def test_crawl_resumes_a_page_that_failed_once(stub_wiki, tmp_path):
+    checkpoint = str(tmp_path / "crawl.json")
+    stub_wiki.pages = {"Flaky": 500, "Alpha": ["Flaky"]}
+    # Flaky fails and goes back to the end of the frontier, after Alpha
+    crawler = make_crawler(["Flaky", "Alpha"], checkpoint=checkpoint, max_pages=1, batch_size=1)
+    assert crawler.crawl() == 1
+    assert scraper.link_cache.get("Flaky") is None
+
+    stub_wiki.pages["Flaky"] = ["Alpha"]
+    crawler = make_crawler([], checkpoint=checkpoint)
+    assert crawler.crawl() == 1
+
+    assert crawler.crawled == 2
+    assert crawler.failed == 0
+    assert scraper.link_cache.get("Flaky") == ["Alpha"]
+
+
+def test_crawl_skips_a_redirect_to_a_queued_article(stub_wiki):
+    stub_wiki.pages = {"Start": ["Alias", "Alpha"], "Alpha": ["Beta"], "Beta": []}
+    stub_wiki.redirects = {"Alias": "Alpha"}
+    crawler = make_crawler(["Start"], batch_size=1)
+
+    assert crawler.crawl() == 3
+    # Alpha was known to be the article of Alias by the time it came up, so it came from the cache
+    assert stub_wiki.requests == ["Start", "Alias", "Beta"]
+    assert crawler.failed == 0
+
+
+def test_crawl_drops_queued_redirects_found_out_about_since(stub_wiki):
+    stub_wiki.pages = {"Alpha": ["Beta"], "Beta": []}
+    crawler = make_crawler(["Alias", "Alpha"])
+    scraper.redirects.add("Alias", "Alpha")
+
+    assert crawler.crawl() == 2
+    assert sorted(stub_wiki.requests) == ["Alpha", "Beta"]
@@ -0,0 +1,102 @@
+import time
+
+import pytest
+import requests
+
+import scraper
+from fetcher import Prefetcher
+from priority_queue import VertexQueue
+
+
+@pytest.fixture
+def prefetcher(stub_wiki):
+    prefetcher = Prefetcher(width=4, concurrency=4, rate=0, base_url=stub_wiki.url)
+    yield prefetcher
+    prefetcher.close()
+
+
+def test_prefetch_caches_links(stub_wiki, prefetcher):
+    stub_wiki.pages = {"Alpha": ["Beta", "Gamma"], "Beta": ["Gamma"], "Gamma": []}
+    prefetcher.prefetch(["Alpha", "Beta", "Gamma"])
+
+    assert sorted(stub_wiki.requests) == ["Alpha", "Beta", "Gamma"]
+    assert scraper.link_cache.get("Alpha") == ["Beta", "Gamma"]
+    assert scraper.link_cache.get("Beta") == ["Gamma"]
+    assert scraper.link_cache.get("Gamma") == []
+    # The search then finds every page in the cache
+    assert scraper.get_links("Alpha") == ["Beta", "Gamma"]
+    assert len(stub_wiki.requests) == 3
+
+
+def test_prefetch_skips_fetched_and_cached(stub_wiki, prefetcher):
+    stub_wiki.pages = {"Alpha": ["Beta"], "Beta": []}
+    scraper.link_cache.put("Beta", [])
+    prefetcher.prefetch(["Alpha", "Beta"])
+    prefetcher.prefetch(["Alpha"])
+    prefetcher.prefetch_queue("Alpha", VertexQueue())
+
+    assert stub_wiki.requests == ["Alpha"]
+
+
+class RecordingQueue(VertexQueue):
+    def first(self, count: int) -> list:
+        self.asked = count
+        return super().first(count)
+
+
+def test_prefetch_queue_fetches_the_next_entries_of_an_uncached_node(stub_wiki, prefetcher):
+    stub_wiki.pages = {"Alpha": [], "Beta": [], "Gamma": [], "Delta": [], "Epsilon": []}
+    queue = RecordingQueue()
+    for priority, title in enumerate(["Beta", "Gamma", "Delta", "Epsilon"]):
+        queue.push(title, priority)
+    prefetcher.prefetch_queue("Alpha", queue)
+
+    assert queue.asked == 3
+    assert sorted(stub_wiki.requests) == ["Alpha", "Beta", "Delta", "Gamma"]
+
+
+def test_prefetch_queue_leaves_the_queue_alone_for_a_cached_node(stub_wiki, prefetcher):
+    stub_wiki.pages = {"Beta": []}
+    scraper.link_cache.put("Alpha", [])
+    queue = RecordingQueue()
+    queue.push("Beta", 1)
+    prefetcher.prefetch_queue("Alpha", queue)
+    prefetcher.prefetch_queue("Alpha", queue)
+
+    assert not hasattr(queue, "asked")
+    assert stub_wiki.requests == []
+
+
+@pytest.mark.parametrize("status", [404, 500, 502, 504])
+def test_prefetch_never_caches_error_pages(stub_wiki, prefetcher, status):
+    stub_wiki.pages = {"Alpha": ["Beta"], "Broken": status}
+    prefetcher.prefetch(["Alpha", "Broken"])
+
+    assert scraper.link_cache.get("Alpha") == ["Beta"]
+    assert scraper.link_cache.get("Broken") is None
+    # Left for the synchronous path, which reports the error
+    assert "Broken" not in prefetcher.fetched
+    with pytest.raises(requests.HTTPError):
+        scraper.get_links("Broken")
+    assert scraper.link_cache.get("Broken") is None
+
+
+def test_prefetch_backs_off_when_throttled(stub_wiki, prefetcher):
+    stub_wiki.pages = {"Busy": 429}
+    stub_wiki.headers = {"Busy": {"Retry-After": "30"}}
+    prefetcher.prefetch(["Busy"])
+
+    assert scraper.link_cache.get("Busy") is None
+    assert "Busy" not in prefetcher.fetched
+    limiter = next(iter(prefetcher.limiters.values()))
+    assert limiter.next_time > time.monotonic() + 20
+
+
+def test_prefetch_learns_redirects(stub_wiki, prefetcher):
+    stub_wiki.pages = {"Gamma": ["Alpha"]}
+    stub_wiki.redirects = {"Alias": "Gamma"}
+    prefetcher.prefetch(["Alias"])
+
+    assert scraper.redirects.canonical("Alias") == "Gamma"
+    assert scraper.get_links("Alias") == ["Alpha"]
+    assert stub_wiki.requests == ["Alias"]
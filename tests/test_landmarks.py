@@ -0,0 +1,86 @@
+import os
+from collections import deque
+
+import pytest
+
+from a_star import AStar
+from dijkstra import Dijkstra
+from landmarks import LandmarkHeuristic, Landmarks, build_landmarks, graph_matrices, index_matrices
+from neighbors import GraphProvider, IndexProvider
+from offline_index import IndexBuilder, OfflineIndex
+
+DUMP = os.path.join(os.path.dirname(__file__), "fixtures", "dump")
+
+# Two components; C and D only reach each other
+GRAPH = {"A": {"B": 2, "C": 7}, "B": {"A": 1, "C": 3}, "C": {"D": 1}, "D": {"C": 2}, "E": {"F": 4}, "F": {"E": 4}}
+
+
+@pytest.fixture
+def index(tmp_path):
+    builder = IndexBuilder()
+    page_ids = builder.read_page_dump(os.path.join(DUMP, "page.sql"))
+    builder.read_pagelinks_dump(os.path.join(DUMP, "pagelinks.sql"), page_ids)
+    builder.read_redirect_dump(os.path.join(DUMP, "redirect.sql"), page_ids)
+    builder.write(str(tmp_path / "index"))
+    return OfflineIndex(str(tmp_path / "index"))
+
+
+def hops(index, start):
+    distances = {start: 0}
+    queue = deque([start])
+    while queue:
+        title = queue.popleft()
+        for link in index.links(title):
+            if link not in distances:
+                distances[link] = distances[title] + 1
+                queue.append(link)
+    return distances
+
+
+def test_landmarks_are_distinct_beyond_the_first_component(index, tmp_path):
+    forward, backward = index_matrices(index)
+    # As many landmarks as articles, most of which no round trip reaches
+    landmarks = build_landmarks(forward, backward, str(tmp_path / "landmarks"), count=len(index), unweighted=True)
+
+    assert sorted(landmarks) == list(range(len(index)))
+    assert len(Landmarks(str(tmp_path / "landmarks"))) == len(index)
+
+
+@pytest.mark.parametrize("count", [1, 3, 7])
+def test_landmark_heuristic_is_admissible_on_an_index(index, tmp_path, count):
+    forward, backward = index_matrices(index)
+    build_landmarks(forward, backward, str(tmp_path / "landmarks"), count=count, unweighted=True)
+    heuristic = LandmarkHeuristic(Landmarks(str(tmp_path / "landmarks")), index.id)
+    titles = [index.title(node) for node in range(len(index))]
+
+    for start in titles:
+        distances = hops(index, start)
+        for goal in titles:
+            if goal in distances:
+                assert heuristic(start, goal) <= distances[goal]
+            else:
+                assert heuristic(start, goal) >= 0
+
+    provider = IndexProvider(index, heuristic)
+    search = AStar({}, provider=provider)
+    assert search.find_path("Alpha", "O'Brien") == ["Alpha", "Delta", "O'Brien"]
+    assert search.cost == 2
+
+
+def test_landmark_heuristic_keeps_weighted_paths_shortest(tmp_path):
+    forward, backward, vertices = graph_matrices(GRAPH)
+    landmarks = build_landmarks(forward, backward, str(tmp_path / "landmarks"), count=len(vertices))
+    assert len(set(landmarks)) == len(vertices)
+    ids = {vertex: node for node, vertex in enumerate(vertices)}
+    provider = GraphProvider(GRAPH, LandmarkHeuristic(Landmarks(str(tmp_path / "landmarks")), ids.get))
+
+    for start in GRAPH:
+        for goal in GRAPH:
+            search = Dijkstra(GRAPH)
+            path = search.find_shortest_path(start, goal)
+            heuristic = provider.heuristic(start, goal)
+            if path:
+                assert heuristic <= search.cost + 1e-6
+            a_star = AStar(GRAPH, provider=provider)
+            a_star.find_path(start, goal)
+            assert a_star.cost == (search.cost if path else None)
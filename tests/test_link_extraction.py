@@ -0,0 +1,116 @@
+import glob
+import os
+
+import pytest
+
+import link_extraction
+from link_extraction import (
+    EXCLUDED_PREFIXES,
+    extract_api_backlinks,
+    extract_api_links,
+    extract_api_redirects,
+    extract_canonical_title,
+    extract_links,
+)
+
+PAGES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "fixtures", "pages", "*.html")))
+
+
+def read(page: str) -> str:
+    with open(page, encoding="utf-8") as f:
+        return f.read()
+
+
+def extract_links_soup(html: str) -> list:
+    """
+    The BeautifulSoup extraction extract_links replaced.
+    """
+    BeautifulSoup = pytest.importorskip("bs4").BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    container_div = soup.find("div", class_="mw-body-content")
+    if container_div is None:
+        return []
+
+    links = []
+    for a in container_div.find_all("a", href=True):
+        if (
+            not a.get("class")
+            and a['href'].startswith("/wiki")
+            and 'title' in a.attrs
+            and not any(prefix in a['title'] for prefix in EXCLUDED_PREFIXES)
+        ):
+            links.append(a['title'])
+    return links
+
+
+@pytest.mark.parametrize("page", PAGES, ids=os.path.basename)
+def test_matches_beautifulsoup(page):
+    html = read(page)
+    assert extract_links(html) == extract_links_soup(html)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 100, 4096])
+@pytest.mark.parametrize("page", PAGES, ids=os.path.basename)
+def test_chunk_boundaries(page, chunk_size, monkeypatch):
+    html = read(page)
+    expected = extract_links(html)
+    monkeypatch.setattr(link_extraction, "CHUNK_SIZE", chunk_size)
+    assert extract_links(html) == expected
+
+
+def test_body_content_only():
+    links = extract_links(read(PAGES[0]))
+    assert links[:3] == ["San Diego Comic-Con", "Philadelphia", "Pennsylvania"]
+    assert "Kevin Bacon filmography" in links
+    # Navigation, files, red links, external links and excluded namespaces
+    for title in ("Main Page", "Visit the main page [z]", "Bacon Brothers discography (page does not exist)",
+                  "Golden Globe Award", "Template:Six Degrees", "Talk:Kevin Bacon", "Wikipedia:About"):
+        assert title not in links
+
+
+def test_entities_and_malformed_markup():
+    links = extract_links(read(os.path.join(os.path.dirname(PAGES[0]), "united_states.html")))
+    assert links[0] == "USA (disambiguation)"
+    for title in ("São Paulo", "Dōgen", "AT&T", '"Weird Al" Yankovic', "Empty class article", "American Civil War"):
+        assert title in links
+    for title in ("USA", "Script link", "Commented out", "Anchor without href", "USA.gov", "Talk:United States"):
+        assert title not in links
+
+
+def test_without_body_content():
+    assert extract_links("<html><body><a href='/wiki/A' title='A'>A</a></body></html>") == []
+    assert extract_links("") == []
+
+
+def test_canonical_title():
+    assert extract_canonical_title(read(PAGES[0])) == "Kevin Bacon"
+    assert extract_canonical_title('<link rel="canonical" href="https://en.wikipedia.org/wiki/S%C3%A3o_Paulo">') == "São Paulo"
+    assert extract_canonical_title("<html></html>") is None
+
+
+def test_api_links():
+    data = {"query": {"pages": {"736": {"pageid": 736, "ns": 0, "title": "Albert Einstein", "links": [
+        {"ns": 0, "title": "Annalen der Physik"}, {"ns": 10, "title": "Template:Physics"},
+        {"ns": 0, "title": "Wikipedia:Manual of Style"}, {"ns": 0, "title": "Zurich"},
+    ]}}}}
+    assert extract_api_links(data) == ["Annalen der Physik", "Zurich"]
+    # formatversion=2 lists the pages instead of keying them by id
+    data["query"]["pages"] = list(data["query"]["pages"].values())
+    assert extract_api_links(data) == ["Annalen der Physik", "Zurich"]
+    assert extract_api_links({"batchcomplete": ""}) == []
+
+
+def test_api_redirects():
+    data = {"query": {"redirects": [{"from": "USA", "to": "United States"}]}}
+    assert extract_api_redirects(data) == [("USA", "United States")]
+
+
+def test_api_backlinks():
+    data = {"query": {"backlinks": [
+        {"pageid": 1, "ns": 0, "title": "Canada"},
+        {"pageid": 2, "ns": 0, "title": "USA", "redirect": "", "redirlinks": [
+            {"pageid": 3, "ns": 0, "title": "Mexico"}, {"pageid": 4, "ns": 0, "title": "Wikipedia:Sandbox"},
+        ]},
+    ]}}
+    assert extract_api_backlinks(data) == (["Canada", "Mexico"], ["USA"])
@@ -0,0 +1,115 @@
+import random
+
+import pytest
+
+from dijkstra import Dijkstra
+from graph import TEST_GRAPH
+from multi_target import many_to_one, one_to_many
+from neighbors import GraphProvider
+
+
+class BacklinkProvider(GraphProvider):
+    """
+    A GraphProvider whose predecessors also hold backlinks that are not
+    links, like the API's, and drops them once a path is found to follow one.
+    """
+
+    def __init__(self, graph_dict, wrong_backlinks) -> None:
+        super().__init__(graph_dict)
+        self.reverse = {}
+        for source, neighbors in graph_dict.items():
+            for target, weight in neighbors.items():
+                self.reverse.setdefault(target, []).append((source, weight))
+        for source, target, weight in wrong_backlinks:
+            self.reverse.setdefault(target, []).append((source, weight))
+        self.confirmed = 0
+
+    def confirm_path(self, path: list) -> bool:
+        self.confirmed += 1
+        confirmed = True
+        for source, target in zip(path, path[1:]):
+            if target not in self.graph.get(source, {}):
+                self.reverse[target] = [pair for pair in self.reverse[target] if pair[0] != source]
+                confirmed = False
+        return confirmed
+
+
+def shortest(graph, start, goal):
+    search = Dijkstra(graph)
+    path = search.find_shortest_path(start, goal)
+    return path, search.cost if path else float("inf")
+
+
+def path_cost(graph, path):
+    return sum(graph[u][v] for u, v in zip(path, path[1:]))
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_one_to_many_matches_dijkstra_per_pair(seed):
+    rng = random.Random(seed)
+    vertices = sorted(TEST_GRAPH)
+    start = rng.choice(vertices)
+    goals = rng.sample(vertices, 5)
+    neighbors = GraphProvider(TEST_GRAPH).for_goals(goals)
+
+    paths, costs, _ = one_to_many(start, goals, neighbors.neighbors)
+
+    for goal in goals:
+        path, cost = shortest(TEST_GRAPH, start, goal)
+        assert costs[goal] == pytest.approx(cost)
+        assert bool(paths[goal]) == bool(path)
+        if path:
+            assert paths[goal][0] == start and paths[goal][-1] == goal
+            assert path_cost(TEST_GRAPH, paths[goal]) == pytest.approx(cost)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_one_to_many_nearest_settles_only_the_nearest_goal(seed):
+    rng = random.Random(seed)
+    vertices = sorted(TEST_GRAPH)
+    start = rng.choice(vertices)
+    goals = rng.sample(vertices, 5)
+    neighbors = GraphProvider(TEST_GRAPH).for_goals(goals)
+
+    paths, costs, _ = one_to_many(start, goals, neighbors.neighbors, nearest=True)
+
+    nearest = min(shortest(TEST_GRAPH, start, goal)[1] for goal in goals)
+    found = [goal for goal in goals if paths[goal]]
+    assert len(found) == (1 if nearest < float("inf") else 0)
+    for goal in found:
+        assert costs[goal] == pytest.approx(nearest)
+        assert path_cost(TEST_GRAPH, paths[goal]) == pytest.approx(nearest)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_many_to_one_matches_dijkstra_per_pair(seed):
+    rng = random.Random(seed)
+    vertices = sorted(TEST_GRAPH)
+    starts = rng.sample(vertices, 5)
+    goal = rng.choice(vertices)
+    neighbors = GraphProvider(TEST_GRAPH).for_goal(goal)
+
+    paths, costs, _ = many_to_one(starts, goal, neighbors.predecessors)
+
+    for start in starts:
+        path, cost = shortest(TEST_GRAPH, start, goal)
+        assert costs[start] == pytest.approx(cost)
+        if path:
+            assert paths[start][0] == start and paths[start][-1] == goal
+            assert path_cost(TEST_GRAPH, paths[start]) == pytest.approx(cost)
+        else:
+            assert paths[start] == []
+
+
+def test_paths_to_a_goal_are_searched_again_until_they_only_follow_links():
+    graph = {"A": {"C": 5}, "B": {"C": 5}, "C": {"G": 1}, "G": {}}
+    # Backlinks claim A and B link to G directly
+    provider = BacklinkProvider(graph, [("A", "G", 1), ("B", "G", 1)])
+    search = Dijkstra(graph, provider=provider)
+
+    paths = search.find_shortest_paths_to(["A", "B"], "G")
+
+    assert paths == {"A": ["A", "C", "G"], "B": ["B", "C", "G"]}
+    assert search.costs == {"A": 6, "B": 6}
+    # Both wrong backlinks were dropped after the first search
+    assert provider.confirmed == 4
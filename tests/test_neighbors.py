@@ -0,0 +1,35 @@
+import pytest
+
+from benchmark import HashEmbeddings
+from dijkstra import Dijkstra
+from heuristic_cache import HeuristicCache
+from neighbors import LinkProvider
+
+
+@pytest.fixture
+def provider(stub_wiki):
+    # Alias is a redirect to Target that nothing knows about until its page is fetched
+    stub_wiki.pages = {"Start": ["Alias", "Beta"], "Target": ["Goal"], "Beta": ["Gamma"], "Gamma": ["Goal"], "Goal": []}
+    stub_wiki.redirects = {"Alias": "Target"}
+    return LinkProvider(HeuristicCache(HashEmbeddings(16)))
+
+
+def test_redirect_found_at_expansion_leads_to_its_article(provider):
+    assert provider.links("Start") == ["Alias", "Beta"]
+    assert provider.links("Alias") == ["Target"]
+    # From now on the links stored to it and its title lead to the article
+    assert provider.links("Start") == ["Target", "Beta"]
+    assert provider.article("Alias") == "Target"
+    assert provider.links("Target") == ["Goal"]
+    assert provider.canonical_path(["Start", "Alias", "Target", "Goal"]) == ["Start", "Target", "Goal"]
+
+
+def test_redirect_found_at_expansion_adds_no_step(provider):
+    search = Dijkstra({}, provider=provider)
+    path = search.find_shortest_path("Start", "Goal")
+
+    assert path == ["Start", "Target", "Goal"]
+    # The step from the redirect to its article is free
+    weights = provider.for_goal("Goal")
+    assert search.cost == pytest.approx(sum(weights.weigh(["Alias", "Goal"])))
+    assert weights.neighbors("Alias") == [("Target", 0)]
@@ -0,0 +1,97 @@
+import gzip
+import os
+
+import numpy as np
+import pytest
+
+from offline_index import IndexBuilder, OfflineIndex, iter_sql_rows
+
+DUMP = os.path.join(os.path.dirname(__file__), "fixtures", "dump")
+
+TITLES = ["Alpha", "Beta", "Gamma ray", "Delta", "USA", "O'Brien", "Missing page"]
+
+
+def build(directory, pagelinks="pagelinks.sql", linktarget=None, redirect=True):
+    builder = IndexBuilder()
+    page_ids = builder.read_page_dump(os.path.join(DUMP, "page.sql"))
+    builder.read_pagelinks_dump(
+        os.path.join(DUMP, pagelinks), page_ids, linktarget and os.path.join(DUMP, linktarget)
+    )
+    if redirect:
+        builder.read_redirect_dump(os.path.join(DUMP, "redirect.sql"), page_ids)
+    builder.write(str(directory))
+    return OfflineIndex(str(directory))
+
+
+@pytest.fixture
+def index(tmp_path):
+    return build(tmp_path)
+
+
+def test_iter_sql_rows_unescapes():
+    rows = list(iter_sql_rows(os.path.join(DUMP, "page.sql")))
+    assert rows[0] == (1, 0, "Alpha", 0, 120)
+    assert rows[-1] == (7, 0, "O'Brien", 0, 40)
+    assert len(rows) == 7
+
+
+def test_csr_arrays(index):
+    assert [index.title(node) for node in range(len(index))] == TITLES
+    # Alpha's link to the redirect USA points at Delta; USA's own link to Delta is dropped
+    assert index.offsets.tolist() == [0, 4, 6, 7, 8, 8, 8, 8]
+    assert index.targets.tolist() == [1, 2, 3, 3, 2, 6, 0, 5]
+    assert index.in_offsets.tolist() == [0, 1, 2, 4, 6, 6, 7, 8]
+    assert index.in_sources.tolist() == [2, 0, 0, 1, 0, 0, 3, 1]
+    assert isinstance(index.targets, np.memmap)
+    assert index.targets.dtype == np.int32
+
+
+def test_links_and_backlinks(index):
+    assert index.links("Alpha") == ["Beta", "Gamma ray", "Delta"]
+    assert index.links("Beta") == ["Gamma ray", "Missing page"]
+    assert index.links("Missing page") == []
+    assert index.backlinks("Delta") == ["Alpha"]
+    assert index.backlinks("Gamma ray") == ["Alpha", "Beta"]
+    assert index.backlinks("O'Brien") == ["Delta"]
+    assert index.links("Nowhere") == [] and index.backlinks("Nowhere") == []
+
+
+def test_id_lookup(index):
+    assert index.id("Alpha") == 0
+    assert index.id("gamma_ray") == 2
+    assert index.id("O'Brien") == 5
+    assert index.id("USA") == 3
+    assert index.canonical("USA") == "Delta"
+    assert index.id("Talk:Alpha") is None
+    assert "Beta" in index and "Nowhere" not in index
+    assert len(index) == 7
+
+
+def test_linktarget_layout_matches(tmp_path):
+    old = build(tmp_path / "old")
+    new = build(tmp_path / "new", "pagelinks_linktarget.sql", "linktarget.sql")
+    for name in ("offsets", "targets", "in_offsets", "in_sources"):
+        assert getattr(new, name).tolist() == getattr(old, name).tolist()
+    assert [new.title(node) for node in range(len(new))] == TITLES
+
+
+def test_without_redirects(tmp_path):
+    index = build(tmp_path, redirect=False)
+    assert index.canonical_ids is None
+    assert index.id("USA") == 4
+    assert index.links("Alpha") == ["Beta", "Gamma ray", "USA", "Delta"]
+    assert index.links("USA") == ["Delta"]
+
+
+def test_link_list(tmp_path):
+    path = tmp_path / "links.tsv.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write("Alpha\tBeta\nAlpha\tGamma_ray\nBeta\tAlpha\nmalformed line\n")
+    builder = IndexBuilder()
+    builder.read_link_list(str(path))
+    builder.write(str(tmp_path / "index"))
+    index = OfflineIndex(str(tmp_path / "index"))
+
+    assert index.links("Alpha") == ["Beta", "Gamma ray"]
+    assert index.backlinks("Alpha") == ["Beta"]
+    assert index.offsets.tolist() == [0, 2, 3, 3]
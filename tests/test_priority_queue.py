@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+from priority_queue import IndexedHeap, VertexQueue
+
+
+def test_push_reports_insert_decrease_and_no_change():
+    heap = IndexedHeap()
+
+    assert heap.push(3, 5.0) is True
+    assert heap.push(3, 2.0) is False
+    assert heap.push(3, 2.0) is None
+    assert heap.push(3, 4.0) is None
+    assert heap.priority(3) == 2.0
+    assert len(heap) == 1
+
+
+def test_decrease_key_moves_the_item_up():
+    heap = IndexedHeap()
+    for item, priority in enumerate([5.0, 3.0, 8.0, 6.0]):
+        heap.push(item, priority)
+
+    heap.push(2, 1.0)
+
+    assert heap.peek() == (2, 1.0)
+    assert [heap.pop() for _ in range(4)] == [(2, 1.0), (1, 3.0), (0, 5.0), (3, 6.0)]
+    assert 2 not in heap
+    with pytest.raises(KeyError):
+        heap.priority(2)
+
+
+def test_ties_go_to_the_smaller_item():
+    heap = IndexedHeap()
+    for item in [4, 1, 3, 0, 2]:
+        heap.push(item, 1.0)
+
+    assert [heap.pop()[0] for _ in range(5)] == [0, 1, 2, 3, 4]
+
+
+def test_vertex_ties_go_to_the_first_pushed():
+    queue = VertexQueue()
+    for vertex in ["Gamma", "Alpha", "Beta"]:
+        queue.push(vertex, 1.0)
+
+    assert [queue.pop()[0] for _ in range(3)] == ["Gamma", "Alpha", "Beta"]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_pops_and_first_match_a_sorted_reference(seed):
+    rng = random.Random(seed)
+    heap = IndexedHeap()
+    reference = {}
+    for _ in range(500):
+        if reference and rng.random() < 0.3:
+            item, priority = heap.pop()
+            assert (priority, item) == min((p, i) for i, p in reference.items())
+            del reference[item]
+        else:
+            item, priority = rng.randrange(100), float(rng.randint(0, 50))
+            heap.push(item, priority)
+            reference[item] = min(priority, reference.get(item, priority))
+
+        count = rng.randint(0, 12)
+        expected = [item for _, item in sorted((p, i) for i, p in reference.items())[:count]]
+        assert heap.first(count) == expected
+        assert sorted(heap) == sorted(reference)
+
+
+def test_vertex_queue_iterates_over_what_is_still_queued():
+    queue = VertexQueue()
+    for vertex, priority in [("A", 3.0), ("B", 1.0), ("C", 2.0), ("D", 4.0)]:
+        queue.push(vertex, priority)
+
+    assert queue.pop() == ("B", 1.0)
+    assert queue.first(2) == ["C", "A"]
+    assert sorted(queue) == ["A", "C", "D"]
+    assert "B" not in queue
+    # A popped vertex is queued again under its id
+    assert queue.push("B", 0.5) is True
+    assert queue.first(10) == ["B", "C", "A", "D"]
@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from a_star import AStar
+from dijkstra import Dijkstra
+from graph import TEST_GRAPH
+from neighbors import GraphProvider
+from snapshot import GraphSnapshot, SnapshotWriter, decode_varints, encode_varints, write_snapshot
+
+
+def random_graph(rng, size=40):
+    titles = [f"Article {i}" for i in range(size)] + ["Ünïcode", "O'Brien"]
+    graph = {}
+    for title in titles:
+        # Some vertices only appear as targets and have no record of their own
+        if rng.random() < 0.8:
+            graph[title] = {target: float(rng.randint(1, 9)) for target in rng.sample(titles, rng.randint(0, 8))}
+    return graph
+
+
+def test_varints_round_trip():
+    values = [0, 1, 127, 128, 300, 2 ** 21, 2 ** 28 - 1, 2 ** 35 - 1]
+    assert decode_varints(encode_varints(values)).tolist() == values
+
+
+@pytest.mark.parametrize("compression", ["gzip", None])
+@pytest.mark.parametrize("weights", ["float32", "float16", None])
+@pytest.mark.parametrize("block_edges", [1, 7, 65536])
+def test_round_trip(tmp_path, compression, weights, block_edges):
+    graph = random_graph(random.Random(block_edges))
+    path = str(tmp_path / "graph.snap")
+    with SnapshotWriter(path, weights, compression, block_edges) as writer:
+        for title, neighbors in graph.items():
+            writer.add(title, neighbors if weights else list(neighbors))
+
+    snapshot = GraphSnapshot(path, max_blocks=2)
+    expected = {
+        title: {target: (weight if weights else 1.0) for target, weight in neighbors.items()}
+        for title, neighbors in graph.items()
+    }
+    assert snapshot.weights == weights and snapshot.compression == compression
+    assert dict(snapshot.items()) == expected
+    assert snapshot.num_edges == sum(map(len, graph.values()))
+    assert sum(len(sources) for sources, _, _ in snapshot.iter_edges()) == snapshot.num_edges
+    for title in snapshot:
+        assert snapshot[title] == expected.get(title, {})
+    assert "Missing" not in snapshot
+    with pytest.raises(KeyError):
+        snapshot["Missing"]
+    assert {title: dict(neighbors.items()) for title, neighbors in snapshot.to_adjacency().items() if neighbors} == {
+        title: neighbors for title, neighbors in expected.items() if neighbors
+    }
+    snapshot.close()
+
+
+def test_vertex_is_written_once(tmp_path):
+    with SnapshotWriter(str(tmp_path / "graph.snap")) as writer:
+        writer.add("A", {"B": 1})
+        with pytest.raises(ValueError):
+            writer.add("A", {"C": 1})
+
+
+def test_snapshot_serves_searches_like_the_graph(tmp_path):
+    path = str(tmp_path / "test_graph.snap")
+    write_snapshot(path, TEST_GRAPH)
+    snapshot = GraphSnapshot(path)
+    provider = GraphProvider(snapshot)
+    vertices = sorted(TEST_GRAPH)
+
+    # Weights are stored as float32, so paths of nearly equal cost may swap
+    for start in vertices:
+        for goal in vertices:
+            expected = Dijkstra(TEST_GRAPH)
+            expected_path = expected.find_shortest_path(start, goal)
+            search = Dijkstra({}, provider=provider)
+            path = search.find_shortest_path(start, goal)
+            assert bool(path) == bool(expected_path)
+            assert search.cost == pytest.approx(expected.cost)
+            assert sum(TEST_GRAPH[u][v] for u, v in zip(path, path[1:])) == pytest.approx(expected.cost or 0)
+            search.find_shortest_path_bidirectional(start, goal)
+            assert search.cost == pytest.approx(expected.cost)
+            a_star = AStar({}, provider=provider)
+            a_star.find_path(start, goal)
+            assert a_star.cost == pytest.approx(expected.cost)
+    snapshot.close()